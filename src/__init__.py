@@ -10,3 +10,12 @@ APP_AUTHORS: List[str] = [
 
 ERROR_DB_CONN: str = "Error connecting to {}"
 ERROR_DB_QUERYING: str = "Error querying {}"
+
+PAGE_SIZE: int = 100
+
+SUMMARY_LABELS: dict[str, str] = {
+    "oa_doi_count": "OpenAlex Papers with DOIs",
+    "oa_oaid_count": "OpenAlex Papers",
+    "oa_citation_count": "OpenAlex Citations",
+    "oapm_arxiv_pm_papers_in_oa": "PeaTMOSS arXiv Papers in OpenAlex",
+}
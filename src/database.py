@@ -0,0 +1,519 @@
+import re
+from pathlib import Path
+from sqlite3 import Connection as SQLite3Connection
+from typing import IO, Any, List, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+import streamlit as st
+from pandas import DataFrame
+from sqlalchemy import Connection, Engine, TextClause, create_engine, event, text
+from sqlalchemy.pool import PoolProxiedConnection
+
+from src.stats import (
+    CITATION_COUNTS_TABLE,
+    FTS_TABLE,
+    FTS_TOKEN_PATTERN,
+    PM_PAPERS_TABLE,
+    SQL_STANDARDIZED_DOI,
+    readSummaryStatistics,
+)
+from src.stats.graph import OAID_PATTERN
+
+# Applied to every pooled connection. The database is opened with mode=ro, so
+# only TEMP tables can be written to
+DB_PRAGMAS: List[str] = [
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+]
+
+DOI_INPUT_TABLE: str = "_doi_input"
+
+# https://openalex.org/W2741809807, https://openalex.org/works/W2741809807, etc.
+OAID_URL_PATTERN: re.Pattern = re.compile(
+    pattern=rf"^(?:https?://(?:api\.)?openalex\.org/(?:works/)?)?({OAID_PATTERN})$",
+    flags=re.IGNORECASE,
+)
+
+# https://doi.org/, http://dx.doi.org/, doi:, etc.
+DOI_PREFIX_PATTERN: re.Pattern = re.compile(
+    pattern=r"^(?:(?:https?://)?(?:dx\.)?doi\.org/|doi:\s*)",
+    flags=re.IGNORECASE,
+)
+
+
+def _setPragmas(dbapiConnection: SQLite3Connection, _: Any) -> None:
+    """
+    _setPragmas Tune a new sqlite3.Connection for read-only queries
+
+    :param dbapiConnection: The sqlite3.Connection created by the connection pool
+    :type dbapiConnection: SQLite3Connection
+    """
+    pragma: str
+    for pragma in DB_PRAGMAS:
+        dbapiConnection.execute(pragma)
+
+
+@st.cache_resource(show_spinner=False)
+def getEngine(dbPath: str) -> Engine:
+    """
+    getEngine Return the read-only SQLAlchemy Engine of a SQLite3 database
+
+    Engines are cached per path, so every rerun and session shares one connection pool
+
+    :param dbPath: Filepath to a SQLite3 database
+    :type dbPath: str
+    :return: A SQLAlchemy Engine
+    :rtype: Engine
+    """
+    engine: Engine = create_engine(
+        url=f"sqlite:///file:{quote(string=str(Path(dbPath)))}?mode=ro&uri=true",
+    )
+    event.listen(engine, "connect", _setPragmas)
+    return engine
+
+
+def getModifiedTime(dbPath: str) -> int:
+    """
+    getModifiedTime Return the last time that a SQLite3 database or its write-ahead log was written to
+
+    :param dbPath: Filepath to a SQLite3 database
+    :type dbPath: str
+    :return: The modification time in nanoseconds
+    :rtype: int
+    """
+    filepaths: List[Path] = [Path(dbPath), Path(f"{dbPath}-wal")]
+    return max(
+        filepath.stat().st_mtime_ns for filepath in filepaths if filepath.exists()
+    )
+
+
+@st.cache_data(show_spinner=False)
+def getSummaryStatistics(dbPath: str, modifiedTime: int) -> dict[str, int]:
+    """
+    getSummaryStatistics Return the up to date statistics stored by `prepare.py summary` in an OpenAlex database
+
+    Statistics are cached per path and modification time, so reruns do not query the database until it is written to
+
+    :param dbPath: Filepath to a SQLite3 database
+    :type dbPath: str
+    :param modifiedTime: The modification time returned by getModifiedTime, which only keys the cache
+    :type modifiedTime: int
+    :return: A mapping of statistic names to values
+    :rtype: dict[str, int]
+    """
+    rawConn: PoolProxiedConnection = getEngine(dbPath=dbPath).raw_connection()
+    try:
+        return readSummaryStatistics(db=rawConn.driver_connection)
+    finally:
+        rawConn.close()
+
+
+def normalizeDOI(doi: str) -> str:
+    """
+    normalizeDOI Remove the resolver prefix of a DOI, its surrounding whitespace, and make it lower case
+
+    :param doi: A DOI such as "https://doi.org/10.48550/arXiv.2404.14619" or "10.48550/arXiv.2404.14619"
+    :type doi: str
+    :return: A DOI such as "10.48550/arxiv.2404.14619"
+    :rtype: str
+    """
+    return DOI_PREFIX_PATTERN.sub(repl="", string=doi.strip()).strip().lower()
+
+
+def listColumns(engine: Engine, table: str) -> List[str]:
+    """
+    listColumns Return the column names of a table
+
+    :param engine: An Engine returned by `getEngine`
+    :type engine: Engine
+    :param table: The name of the table
+    :type table: str
+    :return: A list of column names in table order
+    :rtype: List[str]
+    """
+    conn: Connection
+    with engine.connect() as conn:
+        return [
+            row[1]
+            for row in conn.execute(
+                text(text="SELECT * FROM pragma_table_info(:table)"),
+                {"table": table},
+            ).fetchall()
+        ]
+
+
+def searchWorksByDOI(
+    engine: Engine,
+    doi: str,
+    columns: List[str],
+    prefix: bool = False,
+    after: Tuple[str, int] | None = None,
+    pageSize: int = 100,
+) -> Tuple[DataFrame, Tuple[str, int] | None]:
+    """
+    searchWorksByDOI Return one page of the works with, or starting with, a DOI
+
+    Pages are ordered by the normalized DOI and id of each work and continue after the last work of the previous page (keyset pagination), so every page is one range search of the idx_works_standardized_doi index created by `prepare.py indexes` regardless of how deep it is
+
+    :param engine: An Engine returned by `getEngine`
+    :type engine: Engine
+    :param doi: A DOI with or without a resolver prefix
+    :type doi: str
+    :param columns: The columns of the works table to return
+    :type columns: List[str]
+    :param prefix: Match every DOI that starts with `doi`, defaults to False
+    :type prefix: bool, optional
+    :param after: The cursor returned with the previous page, defaults to None
+    :type after: Tuple[str, int] | None, optional
+    :param pageSize: The maximum number of works per page, defaults to 100
+    :type pageSize: int, optional
+    :return: A tuple of the page and the cursor of the next page, which is None on the last page
+    :rtype: Tuple[DataFrame, Tuple[str, int] | None]
+    """
+    # Column names cannot be bound as parameters
+    worksColumns: List[str] = listColumns(engine=engine, table="works")
+    assert set(columns).issubset(worksColumns)
+
+    normalizedDOI: str = normalizeDOI(doi=doi)
+
+    # Every normalized DOI that starts with, or is equal to, normalizedDOI sorts
+    # before upperBound
+    upperBound: str = (
+        normalizedDOI[:-1] + chr(ord(normalizedDOI[-1]) + 1)
+        if prefix and normalizedDOI != ""
+        else normalizedDOI + "\0"
+    )
+
+    afterDOI: str
+    afterID: int
+    afterDOI, afterID = after if after is not None else (normalizedDOI, -1)
+
+    projection: str = ", ".join([f'works."{column}"' for column in columns])
+    query: TextClause = text(
+        text=f"""
+            SELECT {SQL_STANDARDIZED_DOI} AS _cursor_doi, works.id AS _cursor_id, {projection}
+            FROM works
+            WHERE {SQL_STANDARDIZED_DOI} >= :afterDOI
+                AND {SQL_STANDARDIZED_DOI} < :upperBound
+                AND ({SQL_STANDARDIZED_DOI}, works.id) > (:afterDOI, :afterID)
+            ORDER BY {SQL_STANDARDIZED_DOI}, works.id
+            LIMIT :limit
+        """
+    )
+
+    conn: Connection
+    with engine.connect() as conn:
+        df: DataFrame = pd.read_sql_query(
+            sql=query,
+            con=conn,
+            params={
+                "afterDOI": afterDOI,
+                "afterID": afterID,
+                "upperBound": upperBound,
+                # One extra row tells whether there is a next page
+                "limit": pageSize + 1,
+            },
+        )
+
+    nextCursor: Tuple[str, int] | None = None
+    if df.shape[0] > pageSize:
+        df = df.iloc[:pageSize]
+        nextCursor = (df["_cursor_doi"].iloc[-1], int(df["_cursor_id"].iloc[-1]))
+
+    return (df.drop(columns=["_cursor_doi", "_cursor_id"]), nextCursor)
+
+
+def parseDOIList(dois: str) -> List[str]:
+    """
+    parseDOIList Split pasted text into DOIs on whitespace, commas, and semicolons
+
+    :param dois: Text with one or more DOIs
+    :type dois: str
+    :return: A list of DOIs
+    :rtype: List[str]
+    """
+    return [doi for doi in re.split(pattern=r"[\s,;]+", string=dois) if doi != ""]
+
+
+def readDOICSV(csvFile: IO) -> List[str]:
+    """
+    readDOICSV Read the DOIs of an uploaded CSV file
+
+    The column named "doi" (in any case) is used if there is one, otherwise the first column
+
+    :param csvFile: A CSV file object
+    :type csvFile: IO
+    :return: A list of DOIs
+    :rtype: List[str]
+    """
+    df: DataFrame = pd.read_csv(filepath_or_buffer=csvFile, dtype=str)
+
+    columns: dict[str, str] = {column.lower(): column for column in df.columns}
+    column: str = columns.get("doi", df.columns[0])
+
+    return df[column].dropna().tolist()
+
+
+def resolveDOIs(engine: Engine, dois: List[str]) -> DataFrame:
+    """
+    resolveDOIs Return the works of many DOIs with one join
+
+    The normalized DOIs are loaded into a TEMP table of the connection and joined against the idx_works_standardized_doi index created by `prepare.py indexes`
+
+    :param engine: An Engine returned by `getEngine`
+    :type engine: Engine
+    :param dois: A list of DOIs with or without resolver prefixes
+    :type dois: List[str]
+    :return: A pandas.DataFrame of the normalized DOI (`query_doi`) and matching works row of each DOI, with NULL works columns for DOIs that are not in the database
+    :rtype: DataFrame
+    """
+    normalizedDOIs: List[str] = [
+        doi
+        for doi in dict.fromkeys([normalizeDOI(doi=doi) for doi in dois])
+        if doi != ""
+    ]
+
+    query: TextClause = text(
+        text=f"""
+            SELECT {DOI_INPUT_TABLE}.query_doi, works.*
+            FROM {DOI_INPUT_TABLE}
+            LEFT JOIN works ON {SQL_STANDARDIZED_DOI} = {DOI_INPUT_TABLE}.query_doi
+            ORDER BY {DOI_INPUT_TABLE}.rowid
+        """
+    )
+
+    conn: Connection
+    with engine.connect() as conn:
+        # query_doi is untyped as TEXT affinity would be applied to the
+        # expression side of the join and keep SQLite from using its index
+        conn.execute(
+            text(
+                text=f"CREATE TEMP TABLE IF NOT EXISTS {DOI_INPUT_TABLE} (query_doi PRIMARY KEY)"
+            )
+        )
+
+        try:
+            if len(normalizedDOIs) > 0:
+                conn.execute(
+                    text(
+                        text=f"INSERT INTO {DOI_INPUT_TABLE} (query_doi) VALUES (:doi)"
+                    ),
+                    [{"doi": doi} for doi in normalizedDOIs],
+                )
+
+            return pd.read_sql_query(sql=query, con=conn)
+        finally:
+            # TEMP tables outlive the checkout of a pooled connection
+            conn.execute(text(text=f"DELETE FROM {DOI_INPUT_TABLE}"))
+            conn.commit()
+
+
+def _tableExists(conn: Connection, table: str) -> bool:
+    """
+    _tableExists Return whether a table exists within the main database
+
+    :param conn: A SQLAlchemy Connection
+    :type conn: Connection
+    :param table: The name of the table
+    :type table: str
+    :return: True if the table exists
+    :rtype: bool
+    """
+    query: TextClause = text(
+        text="SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = :table"
+    )
+    return conn.execute(query, {"table": table}).scalar_one() > 0
+
+
+def resolveWork(engine: Engine, work: str) -> str | None:
+    """
+    resolveWork Return the OpenAlex ID of a work given its OpenAlex ID or DOI
+
+    :param engine: An Engine returned by `getEngine`
+    :type engine: Engine
+    :param work: An OpenAlex ID or URL, or a DOI with or without a resolver prefix
+    :type work: str
+    :return: The OpenAlex ID, or None if the work is not in the works table
+    :rtype: str | None
+    """
+    match: re.Match | None = OAID_URL_PATTERN.match(string=work.strip())
+
+    query: TextClause
+    params: dict[str, str]
+    if match is not None:
+        query = text(text="SELECT oa_id FROM works WHERE oa_id = :oaID LIMIT 1")
+        params = {"oaID": match.group(1).upper()}
+    else:
+        query = text(
+            text=f"SELECT oa_id FROM works WHERE {SQL_STANDARDIZED_DOI} = :doi AND oa_id IS NOT NULL LIMIT 1"
+        )
+        params = {"doi": normalizeDOI(doi=work)}
+
+    conn: Connection
+    with engine.connect() as conn:
+        return conn.execute(query, params).scalar_one_or_none()
+
+
+def describeCitations(engine: Engine, oaID: str) -> Tuple[int, str | None, bool]:
+    """
+    describeCitations Return the citation count of a work and whether it is a PeaTMOSS paper
+
+    Both are read from the tables written by `prepare.py citations` when they exist. Otherwise the citations are counted with the idx_cites_reference index
+
+    :param engine: An Engine returned by `getEngine`
+    :type engine: Engine
+    :param oaID: An OpenAlex ID
+    :type oaID: str
+    :return: A tuple of the number of citations, the title of the PeaTMOSS paper the work was matched to (or None), and whether the precomputed tables were used
+    :rtype: Tuple[int, str | None, bool]
+    """
+    conn: Connection
+    with engine.connect() as conn:
+        precomputed: bool = _tableExists(
+            conn=conn, table=CITATION_COUNTS_TABLE
+        ) and _tableExists(conn=conn, table=PM_PAPERS_TABLE)
+
+        if not precomputed:
+            count: int = conn.execute(
+                text(text="SELECT COUNT(*) FROM cites WHERE reference = :oaID"),
+                {"oaID": oaID},
+            ).scalar_one()
+            return (count, None, False)
+
+        count = (
+            conn.execute(
+                text(
+                    text=f"SELECT count FROM {CITATION_COUNTS_TABLE} WHERE reference = :oaID"
+                ),
+                {"oaID": oaID},
+            ).scalar_one_or_none()
+            or 0
+        )
+        pmTitle: str | None = conn.execute(
+            text(text=f"SELECT pm_title FROM {PM_PAPERS_TABLE} WHERE oa_id = :oaID"),
+            {"oaID": oaID},
+        ).scalar_one_or_none()
+
+    return (count, pmTitle, True)
+
+
+def fetchCitingWorks(
+    engine: Engine,
+    oaID: str,
+    after: int | None = None,
+    pageSize: int = 100,
+) -> Tuple[DataFrame, int | None]:
+    """
+    fetchCitingWorks Return one page of the works that cite a work, in cites table order
+
+    Pages continue after the cites rowid of the last citation of the previous page, so every page is one range search of the idx_cites_reference index, and the DOI and title of each citing work are point lookups of idx_works_oa_id
+
+    :param engine: An Engine returned by `getEngine`
+    :type engine: Engine
+    :param oaID: The OpenAlex ID of the cited work
+    :type oaID: str
+    :param after: The cursor returned with the previous page, defaults to None
+    :type after: int | None, optional
+    :param pageSize: The maximum number of citing works per page, defaults to 100
+    :type pageSize: int, optional
+    :return: A tuple of the page and the cursor of the next page, which is None on the last page
+    :rtype: Tuple[DataFrame, int | None]
+    """
+    query: TextClause = text(
+        text="""
+            SELECT
+                cites.rowid AS _cursor_id,
+                cites.work AS oa_id,
+                (SELECT doi FROM works WHERE works.oa_id = cites.work LIMIT 1) AS doi,
+                (SELECT title FROM works WHERE works.oa_id = cites.work LIMIT 1) AS title
+            FROM cites
+            WHERE cites.reference = :oaID AND cites.rowid > :after
+            ORDER BY cites.rowid
+            LIMIT :limit
+        """
+    )
+
+    conn: Connection
+    with engine.connect() as conn:
+        df: DataFrame = pd.read_sql_query(
+            sql=query,
+            con=conn,
+            params={
+                "oaID": oaID,
+                "after": after if after is not None else -1,
+                # One extra row tells whether there is a next page
+                "limit": pageSize + 1,
+            },
+        )
+
+    nextCursor: int | None = None
+    if df.shape[0] > pageSize:
+        df = df.iloc[:pageSize]
+        nextCursor = int(df["_cursor_id"].iloc[-1])
+
+    return (df.drop(columns=["_cursor_id"]), nextCursor)
+
+
+def buildTitleQuery(query: str) -> str | None:
+    """
+    buildTitleQuery Convert free text into an FTS5 query of work titles
+
+    Every token is quoted so that FTS5 operators in the text are searched for literally, and the last token is a prefix so that results appear while a word is still being typed
+
+    :param query: Free text such as "attention is all you ne"
+    :type query: str
+    :return: An FTS5 query such as 'title : ("attention" "is" "all" "you" "ne"*)', or None if the text has no tokens
+    :rtype: str | None
+    """
+    tokens: List[str] = FTS_TOKEN_PATTERN.findall(string=query)
+    if len(tokens) == 0:
+        return None
+
+    phrases: List[str] = [f'"{token}"' for token in tokens]
+    phrases[-1] = f"{phrases[-1]}*"
+    return f"title : ({' '.join(phrases)})"
+
+
+def searchTitles(engine: Engine, query: str, limit: int = 100) -> DataFrame | None:
+    """
+    searchTitles Return the works whose titles contain every word of a query, best matches first
+
+    Works are ranked by the BM25 score of the FTS5 index written by `prepare.py fts`
+
+    :param engine: An Engine returned by `getEngine`
+    :type engine: Engine
+    :param query: Free text to search titles for
+    :type query: str
+    :param limit: The maximum number of works to return, defaults to 100
+    :type limit: int, optional
+    :return: A pandas.DataFrame of the OpenAlex ID, DOI, and title of matching works, or None if the database does not have the index
+    :rtype: DataFrame | None
+    """
+    ftsQuery: str | None = buildTitleQuery(query=query)
+
+    sqlQuery: TextClause = text(
+        text=f"""
+            SELECT works.oa_id, works.doi, works.title
+            FROM {FTS_TABLE}
+            JOIN works ON works.rowid = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :query
+            ORDER BY {FTS_TABLE}.rank
+            LIMIT :limit
+        """
+    )
+
+    conn: Connection
+    with engine.connect() as conn:
+        if not _tableExists(conn=conn, table=FTS_TABLE):
+            return None
+
+        if ftsQuery is None:
+            return DataFrame(columns=["oa_id", "doi", "title"])
+
+        return pd.read_sql_query(
+            sql=sqlQuery,
+            con=conn,
+            params={"query": ftsQuery, "limit": limit},
+        )
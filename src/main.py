@@ -1,11 +1,12 @@
 import sqlite3
 from pathlib import Path
-from typing import Literal
+from time import perf_counter
+from typing import List, Literal
 
-import pandas as pd
 import streamlit as st
+from humanize import intcomma
 from pandas import DataFrame
-from sqlalchemy import Connection, Engine, TextClause, create_engine, text
+from sqlalchemy import Connection, Engine, create_engine, text
 from sqlalchemy.exc import DatabaseError, OperationalError
 from streamlit.delta_generator import DeltaGenerator
 
@@ -15,9 +16,26 @@ from src import (
     APP_TITLE,
     ERROR_DB_CONN,
     ERROR_DB_QUERYING,
+    PAGE_SIZE,
+    SUMMARY_LABELS,
 )
 from src.components import USER_HOME
 from src.components.filepicker import tk_FilePicker
+from src.database import (
+    describeCitations,
+    fetchCitingWorks,
+    getEngine,
+    getModifiedTime,
+    getSummaryStatistics,
+    listColumns,
+    normalizeDOI,
+    parseDOIList,
+    readDOICSV,
+    resolveDOIs,
+    resolveWork,
+    searchTitles,
+    searchWorksByDOI,
+)
 
 
 def updateFilePathInputLabel() -> None:
@@ -32,9 +50,7 @@ def validateDBPath() -> None:
     dbFilepath: str = st.session_state["db_filepath_label"]
 
     try:
-        engine: Engine = create_engine(
-            url=f'sqlite:///{st.session_state["db_filepath_label"]}',
-        )
+        engine: Engine = getEngine(dbPath=str(dbFilepath))
     except OperationalError:
         st.error(ERROR_DB_CONN.format(dbFilepath), icon="🚨")
         return
@@ -68,6 +84,7 @@ def validateDBPath() -> None:
     else:
         st.session_state["db_valid"] = True
         st.session_state["db_conn"] = engine
+        st.session_state["db_path"] = str(dbFilepath)
 
     try:
         conn.close()
@@ -75,10 +92,37 @@ def validateDBPath() -> None:
         return
 
 
+def fetchDOIPage() -> None:
+    doi: str
+    prefix: bool
+    columns: List[str]
+    doi, prefix, columns = st.session_state["doi_query_params"]
+
+    dbConn: Engine = st.session_state["db_conn"]
+
+    startTime: float = perf_counter()
+    df: DataFrame
+    df, st.session_state["doi_query_next"] = searchWorksByDOI(
+        engine=dbConn,
+        doi=doi,
+        columns=columns,
+        prefix=prefix,
+        after=st.session_state["doi_query_cursors"][-1],
+        pageSize=PAGE_SIZE,
+    )
+    st.session_state["doi_query_time"] = perf_counter() - startTime
+
+    if df.empty:
+        st.warning(body="Query returned no results", icon="👻")
+        st.session_state["doi_query_result"] = None
+    else:
+        st.session_state["doi_query_result"] = df
+
+
 def searchDatabase():
     doi: str | None = st.session_state["doi_search_bar"]
 
-    if doi is None:
+    if doi is None or normalizeDOI(doi=doi) == "":
         st.error(
             body=ERROR_DB_QUERYING.format(st.session_state["db_filepath_label"]),
             icon="🚨",
@@ -86,23 +130,248 @@ def searchDatabase():
         st.session_state["doi_query_result"] = None
         return
 
-    sqlQuery: str = f'SELECT * FROM works WHERE doi = "{doi}";'
+    if len(st.session_state["doi_search_columns"]) == 0:
+        st.warning(body="Select at least one column", icon="👻")
+        st.session_state["doi_query_result"] = None
+        return
+
+    # Only the query and the cursor of every page up to the current page are
+    # kept between reruns, not the rows of previous pages
+    st.session_state["doi_query_params"] = (
+        doi,
+        st.session_state["doi_search_mode"] == "Prefix",
+        st.session_state["doi_search_columns"],
+    )
+    st.session_state["doi_query_cursors"] = [None]
+    fetchDOIPage()
+
+
+def nextDOIPage() -> None:
+    st.session_state["doi_query_cursors"].append(st.session_state["doi_query_next"])
+    fetchDOIPage()
+
+
+def previousDOIPage() -> None:
+    st.session_state["doi_query_cursors"].pop()
+    fetchDOIPage()
 
-    if doi is None:
-        st.error(ERROR_DB_QUERYING.format(doi), icon="🚨")
+
+def fetchCitationPage() -> None:
+    dbConn: Engine = st.session_state["db_conn"]
+
+    startTime: float = perf_counter()
+    df: DataFrame
+    df, st.session_state["citation_query_next"] = fetchCitingWorks(
+        engine=dbConn,
+        oaID=st.session_state["citation_query_work"],
+        after=st.session_state["citation_query_cursors"][-1],
+        pageSize=PAGE_SIZE,
+    )
+    st.session_state["citation_query_page_time"] = perf_counter() - startTime
+
+    st.session_state["citation_query_result"] = df
+
+
+def exploreCitations() -> None:
+    work: str | None = st.session_state["citation_search_bar"]
+
+    st.session_state["citation_query_work"] = None
+    if work is None or work.strip() == "":
+        st.error(
+            body=ERROR_DB_QUERYING.format(st.session_state["db_filepath_label"]),
+            icon="🚨",
+        )
         return
 
     dbConn: Engine = st.session_state["db_conn"]
-    df: DataFrame = pd.read_sql_query(
-        sql=sqlQuery,
-        con=dbConn,
+
+    startTime: float = perf_counter()
+    oaID: str | None = resolveWork(engine=dbConn, work=work)
+    if oaID is None:
+        st.warning(body="Query returned no results", icon="👻")
+        return
+
+    (
+        st.session_state["citation_query_count"],
+        st.session_state["citation_query_pm_title"],
+        st.session_state["citation_query_precomputed"],
+    ) = describeCitations(engine=dbConn, oaID=oaID)
+    st.session_state["citation_query_time"] = perf_counter() - startTime
+
+    st.session_state["citation_query_work"] = oaID
+    st.session_state["citation_query_cursors"] = [None]
+    fetchCitationPage()
+
+
+def nextCitationPage() -> None:
+    st.session_state["citation_query_cursors"].append(
+        st.session_state["citation_query_next"]
+    )
+    fetchCitationPage()
+
+
+def previousCitationPage() -> None:
+    st.session_state["citation_query_cursors"].pop()
+    fetchCitationPage()
+
+
+def showCitationExplorer() -> None:
+    column1: DeltaGenerator
+    column2: DeltaGenerator
+    column1, column2 = st.columns(spec=2)
+    column1.metric(
+        label="Citations",
+        value=intcomma(value=st.session_state["citation_query_count"]),
+    )
+    column2.metric(
+        label="PeaTMOSS Paper",
+        value="Yes" if st.session_state["citation_query_pm_title"] else "No",
+        help=st.session_state["citation_query_pm_title"],
+    )
+
+    if not st.session_state["citation_query_precomputed"]:
+        st.info(
+            body="Run `src/stats/prepare.py citations` on this database to flag PeaTMOSS papers and precompute citation counts",
+            icon="ℹ️",
+        )
+
+    st.dataframe(st.session_state["citation_query_result"], hide_index=True)
+    st.caption(
+        body=f'{st.session_state["citation_query_work"]} resolved and counted in {st.session_state["citation_query_time"] * 1000:.1f} ms, page {len(st.session_state["citation_query_cursors"])} of citing works found in {st.session_state["citation_query_page_time"] * 1000:.1f} ms'
     )
 
+    column1, column2 = st.columns(spec=2, gap="large")
+    with column1:
+        st.button(
+            label="Previous Page",
+            key="citation_previous_page",
+            use_container_width=True,
+            on_click=previousCitationPage,
+            disabled=len(st.session_state["citation_query_cursors"]) == 1,
+        )
+    with column2:
+        st.button(
+            label="Next Page",
+            key="citation_next_page",
+            use_container_width=True,
+            on_click=nextCitationPage,
+            disabled=st.session_state["citation_query_next"] is None,
+        )
+
+
+def searchTitleIndex() -> None:
+    query: str | None = st.session_state["title_search_bar"]
+
+    st.session_state["title_query_result"] = None
+    if query is None or query.strip() == "":
+        st.error(
+            body=ERROR_DB_QUERYING.format(st.session_state["db_filepath_label"]),
+            icon="🚨",
+        )
+        return
+
+    startTime: float = perf_counter()
+    df: DataFrame | None = searchTitles(
+        engine=st.session_state["db_conn"],
+        query=query,
+        limit=PAGE_SIZE,
+    )
+    st.session_state["title_query_time"] = perf_counter() - startTime
+
+    if df is None:
+        st.info(
+            body="Run `src/stats/prepare.py fts` on this database to build the full-text index of work titles",
+            icon="ℹ️",
+        )
+        return
+
     if df.empty:
         st.warning(body="Query returned no results", icon="👻")
-        st.session_state["doi_query_result"] = None
-    else:
-        st.session_state["doi_query_result"] = df
+        return
+
+    st.session_state["title_query_result"] = df
+
+
+def bulkSearchDatabase() -> None:
+    dois: List[str] = parseDOIList(dois=st.session_state["bulk_doi_text"] or "")
+
+    if st.session_state.get("bulk_doi_file") is not None:
+        try:
+            dois.extend(readDOICSV(csvFile=st.session_state["bulk_doi_file"]))
+        except (ValueError, IndexError):
+            st.error(body="Could not read DOIs from the uploaded CSV", icon="🚨")
+            st.session_state["bulk_doi_result"] = None
+            return
+
+    if len(dois) == 0:
+        st.warning(body="Paste DOIs or upload a CSV file of DOIs", icon="👻")
+        st.session_state["bulk_doi_result"] = None
+        return
+
+    dbConn: Engine = st.session_state["db_conn"]
+
+    startTime: float = perf_counter()
+    df: DataFrame = resolveDOIs(engine=dbConn, dois=dois)
+    st.session_state["bulk_doi_time"] = perf_counter() - startTime
+
+    st.session_state["bulk_doi_result"] = df
+    st.session_state["bulk_doi_page"] = 1
+
+
+def showBulkSearchResults() -> None:
+    df: DataFrame = st.session_state["bulk_doi_result"]
+    resolvedCount: int = int(df["oa_id"].notna().sum())
+
+    st.caption(
+        body=f"Resolved {intcomma(value=resolvedCount)} of {intcomma(value=df['query_doi'].nunique())} DOIs in {st.session_state['bulk_doi_time'] * 1000:.1f} ms"
+    )
+
+    pageCount: int = max(1, -(-df.shape[0] // PAGE_SIZE))
+    page: int = st.number_input(
+        label=f"Page (of {pageCount})",
+        min_value=1,
+        max_value=pageCount,
+        key="bulk_doi_page",
+    )
+
+    st.dataframe(
+        df.iloc[(page - 1) * PAGE_SIZE : page * PAGE_SIZE],
+        hide_index=True,
+    )
+    st.download_button(
+        label="Download CSV",
+        data=df.to_csv(index=False),
+        file_name="doi_search.csv",
+        mime="text/csv",
+    )
+
+
+def showSummaryStatistics() -> None:
+    summary: dict[str, int] = {}
+
+    dbPath: str = st.session_state["db_path"]
+    try:
+        summary = getSummaryStatistics(
+            dbPath=dbPath,
+            modifiedTime=getModifiedTime(dbPath=dbPath),
+        )
+    except sqlite3.OperationalError:
+        pass
+
+    if len(summary) == 0:
+        st.info(
+            body="Run `src/stats/prepare.py summary` on this database to show its statistics",
+            icon="ℹ️",
+        )
+        return
+
+    columns: List[DeltaGenerator] = st.columns(spec=len(summary))
+
+    column: DeltaGenerator
+    name: str
+    value: int
+    for column, (name, value) in zip(columns, summary.items()):
+        column.metric(label=SUMMARY_LABELS.get(name, name), value=intcomma(value=value))
 
 
 def configApp() -> None:
@@ -126,10 +395,36 @@ def createSessionState() -> None:
         st.session_state["db_valid"] = False
     if "db_conn" not in st.session_state:
         st.session_state["db_conn"] = create_engine(url="sqlite:///:memory:")
+    if "db_path" not in st.session_state:
+        st.session_state["db_path"] = None
     if "doi_query" not in st.session_state:
         st.session_state["doi_query"] = "10.48550/arXiv.2404.14619"
     if "doi_query_result" not in st.session_state:
         st.session_state["doi_query_result"] = None
+    if "doi_query_time" not in st.session_state:
+        st.session_state["doi_query_time"] = 0.0
+    if "doi_query_params" not in st.session_state:
+        st.session_state["doi_query_params"] = None
+    if "doi_query_cursors" not in st.session_state:
+        st.session_state["doi_query_cursors"] = [None]
+    if "doi_query_next" not in st.session_state:
+        st.session_state["doi_query_next"] = None
+    if "citation_query_work" not in st.session_state:
+        st.session_state["citation_query_work"] = None
+    if "citation_query_cursors" not in st.session_state:
+        st.session_state["citation_query_cursors"] = [None]
+    if "citation_query_next" not in st.session_state:
+        st.session_state["citation_query_next"] = None
+    if "title_query_result" not in st.session_state:
+        st.session_state["title_query_result"] = None
+    if "title_query_time" not in st.session_state:
+        st.session_state["title_query_time"] = 0.0
+    if "bulk_doi_result" not in st.session_state:
+        st.session_state["bulk_doi_result"] = None
+    if "bulk_doi_time" not in st.session_state:
+        st.session_state["bulk_doi_time"] = 0.0
+    if "bulk_doi_page" not in st.session_state:
+        st.session_state["bulk_doi_page"] = 1
 
 
 def main() -> None:
@@ -170,6 +465,12 @@ def main() -> None:
     if st.session_state["db_valid"]:
         st.divider()
 
+        st.markdown(body="## Dataset Summary")
+        st.markdown(body="> Statistics precomputed within the database")
+        showSummaryStatistics()
+
+        st.divider()
+
         st.markdown(body="## DOI Search")
         st.markdown(body="> Search for DOIs captured within our database")
         with st.form(key="doi-search", clear_on_submit=False, border=True):
@@ -180,13 +481,116 @@ def main() -> None:
                 help='Input can be in the form of \
 "https://doi.org/10.48550/arXiv.2404.14619" or "10.48550/arXiv.2404.14619"',
             )
+            st.radio(
+                label="Match",
+                options=["Exact", "Prefix"],
+                key="doi_search_mode",
+                horizontal=True,
+                help='"Prefix" matches every DOI that starts with the input, such as "10.48550/arXiv.2404"',
+            )
+            worksColumns: List[str] = listColumns(
+                engine=st.session_state["db_conn"],
+                table="works",
+            )
+            st.multiselect(
+                label="Columns",
+                options=worksColumns,
+                default=worksColumns,
+                key="doi_search_columns",
+            )
             st.form_submit_button(
                 label="Search",
                 on_click=searchDatabase,
             )
 
         if st.session_state["doi_query_result"] is not None:
-            st.dataframe(st.session_state["doi_query_result"])
+            st.dataframe(st.session_state["doi_query_result"], hide_index=True)
+            st.caption(
+                body=f'Page {len(st.session_state["doi_query_cursors"])} found in {st.session_state["doi_query_time"] * 1000:.1f} ms'
+            )
+
+            column1, column2 = st.columns(spec=2, gap="large")
+            with column1:
+                st.button(
+                    label="Previous Page",
+                    key="doi_previous_page",
+                    use_container_width=True,
+                    on_click=previousDOIPage,
+                    disabled=len(st.session_state["doi_query_cursors"]) == 1,
+                )
+            with column2:
+                st.button(
+                    label="Next Page",
+                    key="doi_next_page",
+                    use_container_width=True,
+                    on_click=nextDOIPage,
+                    disabled=st.session_state["doi_query_next"] is None,
+                )
+
+        st.divider()
+
+        st.markdown(body="## Citation Explorer")
+        st.markdown(body="> Explore the works that cite a work")
+        with st.form(key="citation-explorer", clear_on_submit=False, border=True):
+            st.text_input(
+                label="DOI or OpenAlex ID",
+                key="citation_search_bar",
+                help='Input can be in the form of "10.48550/arXiv.2404.14619", \
+"https://doi.org/10.48550/arXiv.2404.14619", "W2741809807", or \
+"https://openalex.org/W2741809807"',
+            )
+            st.form_submit_button(
+                label="Explore",
+                on_click=exploreCitations,
+            )
+
+        if st.session_state["citation_query_work"] is not None:
+            showCitationExplorer()
+
+        st.divider()
+
+        st.markdown(body="## Title Search")
+        st.markdown(body="> Search for works by the words in their titles")
+        with st.form(key="title-search", clear_on_submit=False, border=True):
+            st.text_input(
+                label="Title Search Bar",
+                key="title_search_bar",
+                help='Works whose titles contain every word are returned, best matches first. The last word can be incomplete, such as "attention is all you ne"',
+            )
+            st.form_submit_button(
+                label="Search",
+                on_click=searchTitleIndex,
+            )
+
+        if st.session_state["title_query_result"] is not None:
+            st.dataframe(st.session_state["title_query_result"], hide_index=True)
+            st.caption(
+                body=f'{st.session_state["title_query_result"].shape[0]} best matches found in {st.session_state["title_query_time"] * 1000:.1f} ms'
+            )
+
+        st.divider()
+
+        st.markdown(body="## Bulk DOI Search")
+        st.markdown(body="> Search for many DOIs at once")
+        with st.form(key="bulk-doi-search", clear_on_submit=False, border=True):
+            st.text_area(
+                label="DOIs",
+                key="bulk_doi_text",
+                help="DOIs separated by new lines, spaces, commas, or semicolons",
+            )
+            st.file_uploader(
+                label="CSV of DOIs",
+                type=["csv"],
+                key="bulk_doi_file",
+                help='The "doi" column is used if there is one, otherwise the first column',
+            )
+            st.form_submit_button(
+                label="Search",
+                on_click=bulkSearchDatabase,
+            )
+
+        if st.session_state["bulk_doi_result"] is not None:
+            showBulkSearchResults()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,45 @@
+import re
+from pathlib import Path
 from sqlite3 import Connection, Cursor
-from typing import Any, Iterable, List
+from typing import Any, Iterable, List, Tuple
 
-OA_DOI_COUNT: int = 7885681
-OA_OAID_COUNT: int = 13435534
-OA_CITATION_COUNT: int = 113563323
-OAPM_ARXIV_PM_PAPERS_IN_OA: int = 14
+from pandas import Series
+
+# SQL function registered by registerSQLFunctions(). SQLite's LOWER() and TRIM()
+# only handle ASCII, which would not match stats._standardizeText()
+SQL_STANDARDIZE_FUNCTION: str = "standardize"
+
+# SQL equivalent of stats._standardizeText(). It is evaluated per row, so it is
+# never part of the schema, which every SQLite client must be able to read
+SQL_STANDARDIZED_TITLE: str = f"{SQL_STANDARDIZE_FUNCTION}(title)"
+
+# Standardized titles of the works table keyed by rowid, materialized within the
+# OpenAlex database by prepare.py so that titles are matched with a plain index
+STANDARDIZED_TITLES_TABLE: str = "_standardized_titles"
+
+# SQL equivalent of database.normalizeDOI() for DOIs without a resolver prefix;
+# must match the expression index created by prepare.py
+SQL_STANDARDIZED_DOI: str = "LOWER(TRIM(doi, char(32, 9, 10, 11, 12, 13)))"
+
+# Order of citation counts, equivalent to sortCitationCounts(); ties are ordered by
+# OpenAlex ID so that every way of counting selects the same most cited papers
+SQL_CITATION_COUNT_ORDER: str = "count DESC, reference ASC"
+
+# Dataset-level aggregates materialized within the OpenAlex database by prepare.py,
+# stored with the largest rowid of the tables that they were computed from
+SUMMARY_TABLE: str = "_ptm_stats"
+SUMMARY_MARKER_COLUMNS: List[str] = ["works_max_rowid", "cites_max_rowid"]
+
+# Per-work citation counts and the works that are PeaTMOSS papers, materialized
+# within the OpenAlex database by prepare.py for the Streamlit app
+CITATION_COUNTS_TABLE: str = "_citation_counts"
+PM_PAPERS_TABLE: str = "_pm_papers"
+
+# External content FTS5 index of the works table built by prepare.py
+FTS_TABLE: str = "works_fts"
+
+# Tokens of the FTS5 unicode61 tokenizer, used to build queries against FTS_TABLE
+FTS_TOKEN_PATTERN: re.Pattern = re.compile(pattern=r"\w+")
 
 NATURE_SUBJECTS: List[str] = [
     "Physics",
@@ -92,3 +127,161 @@ def runOneValueSQLQuery(db: Connection, query: str) -> Iterable[Any]:
     """
     cursor: Cursor = db.execute(query)
     return cursor.fetchone()
+
+
+def standardizeSQLText(text: Any) -> str | None:
+    """
+    standardizeSQLText Remove surrounding whitespace and make text lower case, as stats._standardizeText does
+
+    Registered as the SQL_STANDARDIZE_FUNCTION of a connection by registerSQLFunctions
+
+    :param text: A SQLite3 value
+    :type text: Any
+    :return: The standardized text, or None if `text` is NULL
+    :rtype: str | None
+    """
+    if text is None:
+        return None
+
+    return str(text).strip().lower()
+
+
+def registerSQLFunctions(db: Connection) -> None:
+    """
+    registerSQLFunctions Register the SQL functions that the queries of the stats scripts call
+
+    :param db: An sqlite3.Connection object
+    :type db: Connection
+    """
+    db.create_function(
+        SQL_STANDARDIZE_FUNCTION,
+        1,
+        standardizeSQLText,
+        deterministic=True,
+    )
+
+
+def sortCitationCounts(counts: Series) -> Series:
+    """
+    sortCitationCounts Order citation counts by count, and ties by OpenAlex ID
+
+    :param counts: A pandas.Series of the number of citations per OpenAlex ID
+    :type counts: Series
+    :return: The sorted pandas.Series
+    :rtype: Series
+    """
+    return counts.sort_index(kind="stable").sort_values(ascending=False, kind="stable")
+
+
+def getDBPath(db: Connection) -> Path:
+    """
+    getDBPath Return the filepath of the main database of a sqlite3.Connection object
+
+    :param db: An sqlite3.Connection object
+    :type db: Connection
+    :return: Filepath to the SQLite3 database
+    :rtype: Path
+    """
+    return Path(runOneValueSQLQuery(db=db, query="PRAGMA database_list")[2])
+
+
+def getTableMaxRowID(db: Connection, table: str) -> int:
+    """
+    getTableMaxRowID Return the largest rowid of a table
+
+    MAX(rowid) does not scan the table, so it is used as an estimate of the number of rows for progress displays. It overestimates the row count of tables that rows were deleted from
+
+    :param db: An sqlite3.Connection object
+    :type db: Connection
+    :param table: The name of the table
+    :type table: str
+    :return: The largest rowid of the table, or 0 if it is empty
+    :rtype: int
+    """
+    return runOneValueSQLQuery(db=db, query=f"SELECT MAX(rowid) FROM {table}")[0] or 0
+
+
+def standardizedTitlesAreFresh(db: Connection) -> bool:
+    """
+    standardizedTitlesAreFresh Return whether STANDARDIZED_TITLES_TABLE has the title of every work of an OpenAlex database
+
+    Only works that were added after the table was filled are detected, by comparing the largest rowid of both tables. Titles that were updated in place are not; rebuild the table by dropping it and re-running `prepare.py indexes`
+
+    :param db: An sqlite3.Connection object to an OpenAlex database
+    :type db: Connection
+    :return: True if the table exists and no works were added since it was filled
+    :rtype: bool
+    """
+    query: str = "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?"
+    if db.execute(query, (STANDARDIZED_TITLES_TABLE,)).fetchone()[0] == 0:
+        return False
+
+    return getTableMaxRowID(db=db, table=STANDARDIZED_TITLES_TABLE) == getTableMaxRowID(
+        db=db, table="works"
+    )
+
+
+def getTableRowCount(db: Connection, table: str) -> int:
+    """
+    getTableRowCount Return the number of rows of a table
+
+    SQLite counts the rows of the smallest index of the table, so this is cheaper once `prepare.py indexes` has been ran
+
+    :param db: An sqlite3.Connection object
+    :type db: Connection
+    :param table: The name of the table
+    :type table: str
+    :return: The number of rows of the table
+    :rtype: int
+    """
+    return runOneValueSQLQuery(db=db, query=f"SELECT COUNT(*) FROM {table}")[0]
+
+
+def summaryTableIsCurrent(db: Connection) -> bool:
+    """
+    summaryTableIsCurrent Return whether the summary table of an OpenAlex database exists and has the columns of this version
+
+    :param db: An sqlite3.Connection object to an OpenAlex database
+    :type db: Connection
+    :return: False if the table does not exist or was created by an older version
+    :rtype: bool
+    """
+    columns: List[str] = [
+        row[1] for row in db.execute(f"PRAGMA table_info({SUMMARY_TABLE})").fetchall()
+    ]
+    return all(column in columns for column in SUMMARY_MARKER_COLUMNS)
+
+
+def getSummaryMarkers(db: Connection) -> Tuple[int, int]:
+    """
+    getSummaryMarkers Return the largest rowid of the works and cites tables of an OpenAlex database
+
+    Summary statistics are stored with these markers. They do not scan the tables, so statistics are checked for freshness on every read
+
+    :param db: An sqlite3.Connection object to an OpenAlex database
+    :type db: Connection
+    :return: The largest rowid of the works and cites tables
+    :rtype: Tuple[int, int]
+    """
+    return (
+        getTableMaxRowID(db=db, table="works"),
+        getTableMaxRowID(db=db, table="cites"),
+    )
+
+
+def readSummaryStatistics(db: Connection) -> dict[str, int]:
+    """
+    readSummaryStatistics Return the up to date statistics of the summary table of an OpenAlex database
+
+    Statistics computed before rows were added to the works or cites tables, or before their last rows were removed, are not returned. Rows that were removed from within the tables or updated in place are not detected; recompute the statistics with `prepare.py summary --refresh` after changing rows
+
+    :param db: An sqlite3.Connection object to an OpenAlex database
+    :type db: Connection
+    :return: A mapping of statistic names to values
+    :rtype: dict[str, int]
+    """
+    if not summaryTableIsCurrent(db=db):
+        return {}
+
+    query: str = f"SELECT name, value FROM {SUMMARY_TABLE} WHERE works_max_rowid = ? AND cites_max_rowid = ?"
+    return dict(db.execute(query, getSummaryMarkers(db=db)).fetchall())
@@ -1,17 +1,389 @@
+import json
+import re
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from itertools import islice
 from os import listdir
 from pathlib import Path
-from typing import List
+from time import perf_counter
+from typing import Iterator, List, Tuple
 
 import click
 from langchain_community.llms.ollama import Ollama
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables.base import RunnableSequence
-from pandas import DataFrame
+from langchain_core.runnables.base import Runnable, RunnableSequence
 from progress.bar import Bar
-from pyfs import isDirectory, resolvePath
+from pyfs import isDirectory, isFile, resolvePath
 
 from src.stats import NATURE_SUBJECTS
+from src.stats.checkpoint import ClassificationCheckpoint
+from src.stats.prefilter import CentroidClassifier
+
+SYSTEM_PROMPT: str = f"Classify the following text as one of the following classes and return only the classification: {','.join(NATURE_SUBJECTS)}"
+PACKED_SYSTEM_PROMPT: str = f"Classify each of the following numbered texts as one of the following classes and return only a numbered list of the classifications in the same order: {','.join(NATURE_SUBJECTS)}"
+
+# A "1. Physics" style line of a packed response
+PACKED_LINE_PATTERN: re.Pattern = re.compile(pattern=r"^\s*(\d+)\s*[.):-]\s*(.+?)\s*$")
+
+
+def createChain(
+    model: str,
+    baseURL: str,
+    retries: int,
+    systemPrompt: str = SYSTEM_PROMPT,
+) -> Runnable:
+    """
+    createChain Create the chain that classifies abstracts as one of NATURE_SUBJECTS
+
+    Failed requests are retried with exponential backoff and jitter
+
+    :param model: The name of the Ollama model
+    :type model: str
+    :param baseURL: The URL of the Ollama server
+    :type baseURL: str
+    :param retries: The number of times to retry a failed request
+    :type retries: int
+    :param systemPrompt: The system prompt, defaults to SYSTEM_PROMPT
+    :type systemPrompt: str, optional
+    :return: A chain that takes {"input": text} and returns the response of the model
+    :rtype: Runnable
+    """
+    output_parser = StrOutputParser()
+    chatPrompt: ChatPromptTemplate = ChatPromptTemplate.from_messages(
+        [("system", systemPrompt), ("user", "{input}")]
+    )
+
+    llm: Ollama = Ollama(model=model, base_url=baseURL)
+
+    chain: RunnableSequence = chatPrompt | llm | output_parser
+
+    return chain.with_retry(
+        stop_after_attempt=retries + 1,
+        wait_exponential_jitter=True,
+    )
+
+
+def streamAbstracts(filepaths: List[Path]) -> Iterator[Tuple[str, int, str]]:
+    """
+    streamAbstracts Read abstract files one line at a time
+
+    Files may have any number of lines
+
+    :param filepaths: Paths to `PTM.abstracts` files with one abstract per line
+    :type filepaths: List[Path]
+    :return: A generator of records
+    :rtype: Iterator[Tuple[str, int, str]]
+    :yield: A (PTM, line number, lower cased abstract) tuple
+    :rtype: Iterator[Tuple[str, int, str]]
+    """
+    filepath: Path
+    for filepath in filepaths:
+        with open(file=filepath, mode="r") as fp:
+            lineNumber: int
+            abstract: str
+            for lineNumber, abstract in enumerate(fp):
+                yield (filepath.stem, lineNumber, abstract.strip().lower())
+
+
+def countAbstracts(filepaths: List[Path]) -> int:
+    """
+    countAbstracts Count the lines of abstract files without reading them into memory
+
+    :param filepaths: Paths to `PTM.abstracts` files with one abstract per line
+    :type filepaths: List[Path]
+    :return: The number of abstracts
+    :rtype: int
+    """
+    count: int = 0
+
+    filepath: Path
+    for filepath in filepaths:
+        with open(file=filepath, mode="r") as fp:
+            count += sum(1 for _ in fp)
+
+    return count
+
+
+def batchRecords(
+    records: Iterator[Tuple[str, int, str]],
+    batchSize: int,
+) -> Iterator[List[Tuple[str, int, str]]]:
+    """
+    batchRecords Group a stream of records into lists
+
+    :param records: A generator of records
+    :type records: Iterator[Tuple[str, int, str]]
+    :param batchSize: The maximum number of records per list
+    :type batchSize: int
+    :return: A generator of lists of records
+    :rtype: Iterator[List[Tuple[str, int, str]]]
+    :yield: A list of at most `batchSize` records
+    :rtype: Iterator[List[Tuple[str, int, str]]]
+    """
+    while batch := list(islice(records, batchSize)):
+        yield batch
+
+
+def packAbstracts(abstracts: List[str]) -> str:
+    """
+    packAbstracts Join abstracts into one numbered list for PACKED_SYSTEM_PROMPT
+
+    :param abstracts: A list of abstracts
+    :type abstracts: List[str]
+    :return: One abstract per line, numbered from 1
+    :rtype: str
+    """
+    return "\n".join(
+        [f"{idx}. {abstract}" for idx, abstract in enumerate(abstracts, start=1)]
+    )
+
+
+def parsePackedClassifications(response: str, count: int) -> List[str] | None:
+    """
+    parsePackedClassifications Parse the numbered or JSON list of classifications of packed abstracts
+
+    :param response: The response of the model to a PACKED_SYSTEM_PROMPT request
+    :type response: str
+    :param count: The number of abstracts in the request
+    :type count: int
+    :return: One of NATURE_SUBJECTS per abstract, or None if the response does not have exactly one per abstract
+    :rtype: List[str] | None
+    """
+    subjects: dict[str, str] = {subject.lower(): subject for subject in NATURE_SUBJECTS}
+
+    labels: List[str]
+    try:
+        labels = json.loads(response)
+        assert isinstance(labels, list)
+        numbers: List[int] = list(range(1, len(labels) + 1))
+    except (json.JSONDecodeError, AssertionError):
+        matches: List[re.Match] = [
+            match
+            for line in response.splitlines()
+            if (match := PACKED_LINE_PATTERN.match(line)) is not None
+        ]
+        labels = [match.group(2) for match in matches]
+        numbers = [int(match.group(1)) for match in matches]
+
+    if numbers != list(range(1, count + 1)):
+        return None
+
+    classifications: List[str | None] = [
+        subjects.get(str(label).strip(" \"'*.").lower()) for label in labels
+    ]
+    if None in classifications:
+        return None
+
+    return classifications
+
+
+def classifyPackedAbstracts(
+    chain: Runnable,
+    packedChain: Runnable | None,
+    abstracts: List[str],
+) -> List[str]:
+    """
+    classifyPackedAbstracts Classify several abstracts with one request
+
+    If the response cannot be parsed, each abstract is classified with its own request
+
+    :param chain: A chain created by `createChain`
+    :type chain: Runnable
+    :param packedChain: A chain created by `createChain` with PACKED_SYSTEM_PROMPT, or None to classify each abstract with its own request
+    :type packedChain: Runnable | None
+    :param abstracts: The abstracts to classify
+    :type abstracts: List[str]
+    :return: A list of classifications
+    :rtype: List[str]
+    """
+    if packedChain is not None and len(abstracts) > 1:
+        classifications: List[str] | None = parsePackedClassifications(
+            response=packedChain.invoke({"input": packAbstracts(abstracts=abstracts)}),
+            count=len(abstracts),
+        )
+        if classifications is not None:
+            return classifications
+
+    return [chain.invoke({"input": abstract}) for abstract in abstracts]
+
+
+def classifyAbstracts(
+    chain: Runnable,
+    abstracts: List[str],
+    executor: ThreadPoolExecutor,
+    checkpoint: ClassificationCheckpoint,
+    bar: Bar,
+    prefilter: CentroidClassifier | None = None,
+    threshold: float = 0.1,
+    packedChain: Runnable | None = None,
+    packSize: int = 1,
+) -> Tuple[List[str], int]:
+    """
+    classifyAbstracts Classify abstracts with the workers of `executor`
+
+    Classifications are returned in the same order as `abstracts`. Only abstracts that are not in `checkpoint` are sent to the model, once per duplicate, and each classification is added to `checkpoint` as soon as it is returned. If `prefilter` is confident about an abstract, its classification is used instead of the model's and is not added to `checkpoint`. With `packedChain`, up to `packSize` abstracts are classified per request
+
+    :param chain: A chain created by `createChain`
+    :type chain: Runnable
+    :param abstracts: The abstracts to classify
+    :type abstracts: List[str]
+    :param executor: A thread pool with one worker per request in flight
+    :type executor: ThreadPoolExecutor
+    :param checkpoint: The checkpoint of previously classified abstracts
+    :type checkpoint: ClassificationCheckpoint
+    :param bar: A progress bar to advance once per abstract
+    :type bar: Bar
+    :param prefilter: A pre-classifier to label confident abstracts without the model, defaults to None
+    :type prefilter: CentroidClassifier | None, optional
+    :param threshold: The minimum similarity margin for `prefilter` to label an abstract, defaults to 0.1
+    :type threshold: float, optional
+    :param packedChain: A chain created by `createChain` with PACKED_SYSTEM_PROMPT, defaults to None
+    :type packedChain: Runnable | None, optional
+    :param packSize: The number of abstracts per request to `packedChain`, defaults to 1
+    :type packSize: int, optional
+    :return: A tuple of the list of classifications and the number of abstracts labelled by `prefilter`
+    :rtype: Tuple[List[str], int]
+    """
+    pendingAbstracts: dict[str, str] = {
+        checkpoint.key(abstract=abstract): abstract
+        for abstract in abstracts
+        if checkpoint.get(abstract=abstract) is None
+    }
+
+    prefiltered: dict[str, str] = {}
+    if prefilter is not None:
+        keys: List[str] = list(pendingAbstracts.keys())
+        predictions: List[str | None] = prefilter.predict(
+            abstracts=list(pendingAbstracts.values()),
+            threshold=threshold,
+        )
+
+        key: str
+        prediction: str | None
+        for key, prediction in zip(keys, predictions):
+            if prediction is not None:
+                prefiltered[key] = prediction
+                del pendingAbstracts[key]
+
+    abstractsToClassify: List[str] = list(pendingAbstracts.values())
+    futures: dict[Future, List[str]] = {
+        executor.submit(
+            classifyPackedAbstracts,
+            chain=chain,
+            packedChain=packedChain,
+            abstracts=pack,
+        ): pack
+        for pack in [
+            abstractsToClassify[idx : idx + packSize]
+            for idx in range(0, len(abstractsToClassify), packSize)
+        ]
+    }
+
+    try:
+        future: Future
+        for future in as_completed(futures):
+            abstract: str
+            classification: str
+            for abstract, classification in zip(futures[future], future.result()):
+                checkpoint.put(abstract=abstract, classification=classification)
+
+            bar.next(n=len(futures[future]))
+    except BaseException:
+        # Do not send the queued requests once a request has failed or the run
+        # was interrupted
+        executor.shutdown(cancel_futures=True)
+        raise
+
+    bar.next(n=len(abstracts) - len(abstractsToClassify))
+    return (
+        [
+            prefiltered.get(checkpoint.key(abstract=abstract))
+            or checkpoint.get(abstract=abstract)
+            for abstract in abstracts
+        ],
+        len(prefiltered),
+    )
+
+
+def _seekPTMRecords(recordsPath: Path) -> dict[str, int]:
+    """
+    _seekPTMRecords Return the byte offset of the first record of every PTM of a classification records file
+
+    :param recordsPath: Path to the JSON lines file of classification records
+    :type recordsPath: Path
+    :return: A mapping of PTMs, in the order they first appear, to the offset of their first record
+    :rtype: dict[str, int]
+    """
+    offsets: dict[str, int] = {}
+    offset: int = 0
+
+    with open(file=recordsPath, mode="rb") as fp:
+        line: bytes
+        for line in fp:
+            offsets.setdefault(json.loads(line)["ptm"], offset)
+            offset += len(line)
+
+    return offsets
+
+
+def writeClassificationTable(recordsPath: Path, jsonPath: Path) -> None:
+    """
+    writeClassificationTable Convert the classification records to a JSON table of line numbers by PTM
+
+    PTMs with fewer abstracts than others have null classifications for the missing lines. The records of a PTM must be contiguous and in line order, as main writes them, so the table is written one line at a time from the next record of every PTM, and memory grows with the number of PTMs rather than abstracts
+
+    :param recordsPath: Path to the JSON lines file of classification records
+    :type recordsPath: Path
+    :param jsonPath: Path to write the JSON table to
+    :type jsonPath: Path
+    """
+    offsets: dict[str, int] = _seekPTMRecords(recordsPath=recordsPath)
+    if len(offsets) == 0:
+        return
+
+    ptms: List[str] = list(offsets)
+    nextRecords: dict[str, dict[str, str | int]] = {}
+
+    with (
+        open(file=recordsPath, mode="rb") as recordsFP,
+        open(file=jsonPath, mode="w") as jsonFP,
+    ):
+
+        def advance(ptm: str) -> None:
+            recordsFP.seek(offsets[ptm])
+            line: bytes = recordsFP.readline()
+            offsets[ptm] = recordsFP.tell()
+
+            record: dict[str, str | int] | None = json.loads(line) if line else None
+            if record is None or record["ptm"] != ptm:
+                nextRecords.pop(ptm, None)
+            else:
+                nextRecords[ptm] = record
+
+        ptm: str
+        for ptm in ptms:
+            advance(ptm=ptm)
+
+        jsonFP.write("{")
+        separator: str = "\n"
+        while len(nextRecords) > 0:
+            lineNumber: int = min(record["line"] for record in nextRecords.values())
+            row: dict[str, str | None] = {ptm: None for ptm in ptms}
+
+            for ptm in [
+                ptm
+                for ptm, record in nextRecords.items()
+                if record["line"] == lineNumber
+            ]:
+                row[ptm] = nextRecords[ptm]["classification"]
+                advance(ptm=ptm)
+
+            # Strip the braces of a one line table to nest it as json.dump would
+            jsonFP.write(separator)
+            jsonFP.write(json.dumps(obj={str(lineNumber): row}, indent=4)[2:-2])
+            separator = ",\n"
+
+        jsonFP.write("\n}")
 
 
 @click.command()
@@ -35,58 +407,211 @@ from src.stats import NATURE_SUBJECTS
     default=Path("../../data/json"),
     show_default=True,
 )
-def main(abstractDirectory: Path, jsonDirectory: Path) -> None:
+@click.option(
+    "-m",
+    "--model",
+    "model",
+    required=False,
+    type=str,
+    help="Ollama model to classify abstracts with",
+    default="gemma",
+    show_default=True,
+)
+@click.option(
+    "-u",
+    "--base-url",
+    "baseURL",
+    required=False,
+    type=str,
+    help="URL of the Ollama server",
+    default="http://localhost:11434",
+    show_default=True,
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    "concurrency",
+    required=False,
+    type=click.IntRange(min=1),
+    help="Maximum number of requests to the Ollama server in flight",
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "-r",
+    "--retries",
+    "retries",
+    required=False,
+    type=click.IntRange(min=0),
+    help="Number of times to retry a failed request with exponential backoff",
+    default=3,
+    show_default=True,
+)
+@click.option(
+    "-k",
+    "--checkpoint",
+    "checkpointPath",
+    required=False,
+    type=Path,
+    help="Path to the JSON lines log of classified abstracts to resume from",
+    default=Path("../../data/cache/ai_checkpoint.jsonl"),
+    show_default=True,
+)
+@click.option(
+    "--no-checkpoint",
+    "noCheckpoint",
+    is_flag=True,
+    help="Classify every abstract instead of reading from and writing to the checkpoint",
+)
+@click.option(
+    "-b",
+    "--batch-size",
+    "batchSize",
+    required=False,
+    type=click.IntRange(min=1),
+    help="Number of abstracts to read and classify at a time",
+    default=1000,
+    show_default=True,
+)
+@click.option(
+    "-p",
+    "--prefilter",
+    "prefilterPath",
+    required=False,
+    type=Path,
+    help="Path to a classifier trained by prefilter.py to label confident abstracts without the model",
+    default=None,
+)
+@click.option(
+    "-t",
+    "--threshold",
+    "threshold",
+    required=False,
+    type=click.FloatRange(min=0),
+    help="Minimum similarity margin for the pre-classifier to label an abstract",
+    default=0.1,
+    show_default=True,
+)
+@click.option(
+    "-n",
+    "--pack-size",
+    "packSize",
+    required=False,
+    type=click.IntRange(min=1),
+    help="Number of abstracts to classify per request",
+    default=1,
+    show_default=True,
+)
+def main(
+    abstractDirectory: Path,
+    jsonDirectory: Path,
+    model: str,
+    baseURL: str,
+    concurrency: int,
+    retries: int,
+    checkpointPath: Path,
+    noCheckpoint: bool,
+    batchSize: int,
+    prefilterPath: Path | None,
+    threshold: float,
+    packSize: int,
+) -> None:
     absAbstractDirectory: Path = resolvePath(path=abstractDirectory)
     absJSONDirectory: Path = resolvePath(path=jsonDirectory)
 
     assert isDirectory(path=absAbstractDirectory)
     assert isDirectory(path=absJSONDirectory)
 
-    fileData: dict[str, List[str]] = {}
-    data: dict[str, List[str]] = {}
+    prefilter: CentroidClassifier | None = None
+    if prefilterPath is not None:
+        absPrefilterPath: Path = resolvePath(path=prefilterPath)
+        assert isFile(path=absPrefilterPath)
+        prefilter = CentroidClassifier.load(path=absPrefilterPath)
 
-    systemPrompt: str = f"Classify the following text as one of the following classes and return only the classification: {','.join(NATURE_SUBJECTS)}"
+    recordsPath: Path = Path(absJSONDirectory, "ai_nature_classes.jsonl")
 
-    output_parser = StrOutputParser()
-    chatPrompt: ChatPromptTemplate = ChatPromptTemplate.from_messages(
-        [("system", systemPrompt), ("user", "{input}")]
+    chain: Runnable = createChain(model=model, baseURL=baseURL, retries=retries)
+    packedChain: Runnable | None = None
+    if packSize > 1:
+        packedChain = createChain(
+            model=model,
+            baseURL=baseURL,
+            retries=retries,
+            systemPrompt=PACKED_SYSTEM_PROMPT,
+        )
+    checkpoint: ClassificationCheckpoint = ClassificationCheckpoint(
+        path=None if noCheckpoint else resolvePath(path=checkpointPath),
+        model=model,
+        systemPrompt=SYSTEM_PROMPT,
     )
-
-    llm: Ollama = Ollama(model="gemma")
-
-    chain: RunnableSequence = chatPrompt | llm | output_parser
+    checkpointSize: int = len(checkpoint)
 
     filepaths: List[Path] = [
         Path(absAbstractDirectory, fp) for fp in listdir(path=absAbstractDirectory)
     ]
+    abstractCount: int = countAbstracts(filepaths=filepaths)
+
+    prefilteredCount: int = 0
+
+    startTime: float = perf_counter()
+
+    with (
+        open(file=recordsPath, mode="w") as recordsFP,
+        ThreadPoolExecutor(max_workers=concurrency) as executor,
+        Bar("Analyzing abstracts...", max=abstractCount) as bar,
+    ):
+        batch: List[Tuple[str, int, str]]
+        for batch in batchRecords(
+            records=streamAbstracts(filepaths=filepaths),
+            batchSize=batchSize,
+        ):
+            classifications: List[str]
+            batchPrefilteredCount: int
+            classifications, batchPrefilteredCount = classifyAbstracts(
+                chain=chain,
+                abstracts=[record[2] for record in batch],
+                executor=executor,
+                checkpoint=checkpoint,
+                bar=bar,
+                prefilter=prefilter,
+                threshold=threshold,
+                packedChain=packedChain,
+                packSize=packSize,
+            )
+            prefilteredCount += batchPrefilteredCount
+
+            ptm: str
+            lineNumber: int
+            classification: str
+            for (ptm, lineNumber, _), classification in zip(batch, classifications):
+                record: dict[str, str | int] = {
+                    "ptm": ptm,
+                    "line": lineNumber,
+                    "classification": classification,
+                }
+                recordsFP.write(f"{json.dumps(record)}\n")
+
+            recordsFP.flush()
+
+    classificationTime: float = perf_counter() - startTime
+    classifiedCount: int = len(checkpoint) - checkpointSize
+    checkpoint.close()
+
+    print(
+        f"Classified {classifiedCount} abstracts in {classificationTime:.2f} seconds",
+        f"({classifiedCount / classificationTime:.2f} abstracts/second),",
+        f"reused {abstractCount - classifiedCount - prefilteredCount} classifications",
+    )
+
+    if prefilter is not None:
+        print(
+            f"The pre-classifier labelled {prefilteredCount} abstracts,",
+            f"saving {prefilteredCount} LLM calls",
+        )
 
-    with Bar("Reading abstract files into a DataFrame...", max=len(filepaths)) as bar:
-        filepath: Path
-        for filepath in filepaths:
-            ptm: str = filepath.stem
-
-            with open(file=filepath, mode="r") as fp:
-                fileData[ptm] = [
-                    abstract.strip().lower() for abstract in fp.readlines()
-                ]
-                fp.close()
-
-            bar.next()
-
-    df: DataFrame = DataFrame(data=fileData)
-    ptms: List[str] = df.columns.to_list()
-
-    ptm: str
-    for ptm in ptms:
-        data[ptm] = []
-        with Bar(f"Analyzing {ptm} abstracts...", max=df[ptm].shape[0]) as bar:
-            for abstract in df[ptm]:
-                data[ptm].append(chain.invoke({"input": abstract}))
-                bar.next()
-
-    DataFrame(data=data).T.to_json(
-        path_or_buf=Path(absJSONDirectory, "ai_nature_classes.json"),
-        indent=4,
+    writeClassificationTable(
+        recordsPath=recordsPath,
+        jsonPath=Path(absJSONDirectory, "ai_nature_classes.json"),
     )
 
 
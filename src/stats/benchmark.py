@@ -0,0 +1,1640 @@
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from functools import partial
+from inspect import signature
+from itertools import islice
+from math import ceil
+from os import chdir, cpu_count, devnull, listdir
+from pathlib import Path
+from resource import RUSAGE_SELF, getrusage
+from sqlite3 import Connection
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable, List, Tuple
+
+import click
+import numpy
+import pandas
+from humanize import intcomma, naturalsize
+from langchain_core.runnables.base import Runnable
+from pandas import DataFrame, Series
+from pyfs import isDirectory, isFile, resolvePath
+from sqlalchemy import Engine
+
+from src.database import (
+    describeCitations,
+    fetchCitingWorks,
+    getEngine,
+    resolveWork,
+    searchTitles,
+)
+from src.stats import FTS_TOKEN_PATTERN, getTableMaxRowID, getTableRowCount
+from src.stats.ai import (
+    PACKED_SYSTEM_PROMPT,
+    SYSTEM_PROMPT,
+    createChain,
+    packAbstracts,
+    parsePackedClassifications,
+    streamAbstracts,
+)
+from src.stats.graph import CitationGraph, decodeOAIDs
+from src.stats.parquet import ParquetDB
+from src.stats.plot import main as plotMain
+from src.stats.prepare import OA_INDEXES, PM_INDEXES, createFTSIndex, createIndexes
+from src.stats.stats import (
+    PYARROW_STRING,
+    _convertToArXivDOI,
+    _convertToArXivDOISeries,
+    _createDFFromSQL,
+    _createDFGeneratorFromSQL,
+    _extractNetLoc,
+    _extractNetLocSeries,
+    _standardizeText,
+    _standardizeTextSeries,
+    connectToDB,
+    oa_CountCitations,
+    oa_CountPapersByDOI,
+    oa_CountPapersByOAID,
+    oa_GetDOIsOfWorks,
+    oapm_CountCitationsOfArXivPMPapers,
+    oapm_CountCitationsOfArXivPMPapersInFTS,
+    oapm_CountCitationsOfArXivPMPapersInSQL,
+    oapm_CountPMArXivPapersInOA,
+    oapm_GetDOIsOfOAWorksThatCitePM,
+    pm_CountPapersByID,
+    pm_CountPapersPerJournal,
+    pm_IdentifyPapersPublishedInArXiv,
+)
+from src.stats.synthetic import defaultPaperCount, generateDatabases
+
+PLOT_PIPELINE: str = "plot.py"
+
+# Runs faster than this are too noisy to flag rows/sec regressions of
+MIN_COMPARABLE_SECONDS: float = 0.05
+
+# The functions that the suite times, and the tables they read
+SUITE_FUNCTIONS: dict[str, Tuple[Callable[..., Any], List[str]]] = {
+    "oa_CountPapersByDOI": (oa_CountPapersByDOI, ["works"]),
+    "oa_CountPapersByOAID": (oa_CountPapersByOAID, ["works"]),
+    "oa_CountCitations": (oa_CountCitations, ["cites"]),
+    "pm_CountPapersByID": (pm_CountPapersByID, ["model_to_paper"]),
+    "pm_CountPapersPerJournal": (pm_CountPapersPerJournal, ["paper"]),
+    "pm_IdentifyPapersPublishedInArXiv": (
+        pm_IdentifyPapersPublishedInArXiv,
+        ["paper"],
+    ),
+    "oapm_CountPMArXivPapersInOA": (oapm_CountPMArXivPapersInOA, ["paper", "works"]),
+    "oapm_CountCitationsOfArXivPMPapers": (
+        oapm_CountCitationsOfArXivPMPapers,
+        ["paper", "works", "cites"],
+    ),
+    "oapm_CountCitationsOfArXivPMPapersInSQL": (
+        oapm_CountCitationsOfArXivPMPapersInSQL,
+        ["paper", "works", "cites"],
+    ),
+    "oapm_CountCitationsOfArXivPMPapersInFTS": (
+        oapm_CountCitationsOfArXivPMPapersInFTS,
+        ["paper", "works", "cites"],
+    ),
+    "oapm_GetDOIsOfOAWorksThatCitePM": (
+        oapm_GetDOIsOfOAWorksThatCitePM,
+        ["cites", "works"],
+    ),
+    PLOT_PIPELINE: (plotMain.main, ["paper", "model_to_paper", "works", "cites"]),
+}
+
+
+def _timeFunction(function: Callable[..., Any], **kwargs) -> Tuple[Any, float]:
+    """
+    _timeFunction Call a function and return its result and wall time
+
+    :param function: The function to call
+    :type function: Callable[..., Any]
+    :return: A tuple of the function result and the number of seconds it took
+    :rtype: Tuple[Any, float]
+    """
+    startTime: float = perf_counter()
+    result: Any = function(**kwargs)
+    return (result, perf_counter() - startTime)
+
+
+def _seriesAreEqual(a: Series, b: Series) -> bool:
+    """
+    _seriesAreEqual Compare two value count Series, including their order
+
+    The order is compared as the most cited PeaTMOSS papers are selected by position
+
+    :param a: A pandas.Series
+    :type a: Series
+    :param b: A pandas.Series
+    :type b: Series
+    :return: True if both Series contain the same values and index in the same order
+    :rtype: bool
+    """
+    return a.equals(other=b)
+
+
+def _resultsAreEqual(a: Any, b: Any) -> bool:
+    """
+    _resultsAreEqual Compare two results of the same stats function exactly, including the order of Series and DataFrames
+
+    :param a: A result
+    :type a: Any
+    :param b: A result
+    :type b: Any
+    :return: True if both results are equal
+    :rtype: bool
+    """
+    if isinstance(a, Series):
+        return _seriesAreEqual(a=a, b=b)
+    elif isinstance(a, DataFrame):
+        return a.equals(other=b)
+
+    return a == b
+
+
+def _expandCitationsInSQL(
+    db: Connection,
+    oaID: str,
+    hops: int,
+    batchSize: int = 999,
+) -> List[set[str]]:
+    """
+    _expandCitationsInSQL Breadth-first search the works that transitively cite a work with one query per batch of frontier works
+
+    The SQLite equivalent of CitationGraph.expandCitations
+
+    :param db: An sqlite3.Connection object of an OpenAlex database
+    :type db: Connection
+    :param oaID: An OpenAlex ID
+    :type oaID: str
+    :param hops: The number of citation hops to follow
+    :type hops: int
+    :param batchSize: The number of frontier works per query, defaults to 999
+    :type batchSize: int, optional
+    :return: A list of the sets of OpenAlex IDs first reached at each hop
+    :rtype: List[set[str]]
+    """
+    levels: List[set[str]] = []
+    visited: set[str] = {oaID}
+    frontier: List[str] = [oaID]
+
+    for _ in range(hops):
+        citers: set[str] = set()
+
+        idx: int
+        for idx in range(0, len(frontier), batchSize):
+            batch: List[str] = frontier[idx : idx + batchSize]
+            placeholders: str = ", ".join(["?"] * len(batch))
+            query: str = f"SELECT work FROM cites WHERE reference IN ({placeholders})"
+            citers.update([row[0] for row in db.execute(query, batch).fetchall()])
+
+        citers.discard(None)
+        citers -= visited
+        visited |= citers
+
+        levels.append(citers)
+        frontier = sorted(citers)
+
+    return levels
+
+
+def _estimateTokens(text: str) -> int:
+    """
+    _estimateTokens Estimate the number of tokens of a text as one per four characters
+
+    :param text: A prompt or response
+    :type text: str
+    :return: The estimated number of tokens
+    :rtype: int
+    """
+    return ceil(len(text) / 4)
+
+
+def _classifyPackWithUsage(
+    chain: Runnable,
+    packedChain: Runnable,
+    abstracts: List[str],
+) -> Tuple[List[str], int, int]:
+    """
+    _classifyPackWithUsage Classify abstracts like ai.classifyPackedAbstracts while estimating the tokens sent and received
+
+    :param chain: A chain created by `ai.createChain`
+    :type chain: Runnable
+    :param packedChain: A chain created by `ai.createChain` with PACKED_SYSTEM_PROMPT
+    :type packedChain: Runnable
+    :param abstracts: The abstracts to classify
+    :type abstracts: List[str]
+    :return: A tuple of the classifications, the estimated number of tokens, and the number of requests
+    :rtype: Tuple[List[str], int, int]
+    """
+    tokens: int = 0
+    requests: int = 0
+
+    if len(abstracts) > 1:
+        packedAbstracts: str = packAbstracts(abstracts=abstracts)
+        response: str = packedChain.invoke({"input": packedAbstracts})
+        tokens += _estimateTokens(
+            text=PACKED_SYSTEM_PROMPT + packedAbstracts + response
+        )
+        requests += 1
+
+        classifications: List[str] | None = parsePackedClassifications(
+            response=response,
+            count=len(abstracts),
+        )
+        if classifications is not None:
+            return (classifications, tokens, requests)
+
+    singleClassifications: List[str] = []
+
+    abstract: str
+    for abstract in abstracts:
+        response = chain.invoke({"input": abstract})
+        tokens += _estimateTokens(text=SYSTEM_PROMPT + abstract + response)
+        requests += 1
+        singleClassifications.append(response.strip())
+
+    return (singleClassifications, tokens, requests)
+
+
+def _applyToChunks(
+    chunks: List[Series],
+    chunkFunction: Callable[[Series], Series],
+) -> List[Series]:
+    """
+    _applyToChunks Apply a vectorized function to every chunk
+
+    :param chunks: A list of pandas.Series chunks
+    :type chunks: List[Series]
+    :param chunkFunction: A function that takes and returns a pandas.Series
+    :type chunkFunction: Callable[[Series], Series]
+    :return: A list of the results per chunk
+    :rtype: List[Series]
+    """
+    return [chunkFunction(chunk) for chunk in chunks]
+
+
+def _applyToRows(
+    chunks: List[Series],
+    rowFunction: Callable[[str], str],
+) -> List[Series]:
+    """
+    _applyToRows Apply a scalar function to every row of every chunk
+
+    :param chunks: A list of pandas.Series chunks
+    :type chunks: List[Series]
+    :param rowFunction: A function that takes and returns a str
+    :type rowFunction: Callable[[str], str]
+    :return: A list of the results per chunk
+    :rtype: List[Series]
+    """
+    return [chunk.apply(rowFunction) for chunk in chunks]
+
+
+def _suiteArguments(
+    function: Callable[..., Any],
+    pmDB: Connection,
+    oaDB: Connection,
+    directory: Path,
+) -> dict[str, Any]:
+    """
+    _suiteArguments Return the keyword arguments to call a function of SUITE_FUNCTIONS with
+
+    :param function: A function of SUITE_FUNCTIONS other than the plot.py pipeline
+    :type function: Callable[..., Any]
+    :param pmDB: A sqlite3.Connection of a PeaTMOSS database
+    :type pmDB: Connection
+    :param oaDB: A sqlite3.Connection of an OpenAlex database
+    :type oaDB: Connection
+    :param directory: A temporary directory for the function to write to
+    :type directory: Path
+    :return: The keyword arguments that `function` takes
+    :rtype: dict[str, Any]
+    """
+    parameters: List[str] = list(signature(function).parameters.keys())
+
+    arguments: dict[str, Any] = {
+        "pmDB": pmDB,
+        "oaDB": oaDB,
+        "jsonOutputPath": directory,
+    }
+    if "pmCitationCounts" in parameters:
+        arguments["pmCitationCounts"] = oapm_CountCitationsOfArXivPMPapersInSQL(
+            pmDB=pmDB,
+            oaDB=oaDB,
+        )
+
+    return {key: value for key, value in arguments.items() if key in parameters}
+
+
+def _runSuiteFunction(
+    name: str,
+    pmPath: Path,
+    oaPath: Path,
+    aiClassificationPath: Path,
+) -> Tuple[float, int]:
+    """
+    _runSuiteFunction Time one function of SUITE_FUNCTIONS and measure the peak memory of the process
+
+    Meant to be ran in a fresh worker process per call, as the peak resident set size of a process never decreases. Its output is discarded
+
+    :param name: A key of SUITE_FUNCTIONS
+    :type name: str
+    :param pmPath: Path to a PeaTMOSS database
+    :type pmPath: Path
+    :param oaPath: Path to an OpenAlex database
+    :type oaPath: Path
+    :param aiClassificationPath: Path to the JSON file of AI classes that plot.py reads
+    :type aiClassificationPath: Path
+    :return: A tuple of the seconds the function took and the peak resident set size in bytes
+    :rtype: Tuple[float, int]
+    """
+    function: Callable[..., Any] = SUITE_FUNCTIONS[name][0]
+
+    with TemporaryDirectory() as directory, open(file=devnull, mode="w") as fp:
+        kwargs: dict[str, Any]
+        if name == PLOT_PIPELINE:
+            # plot.py writes its figures to ../../data/figs of the working directory
+            workingDirectory: Path = Path(directory, "src", "stats")
+            workingDirectory.mkdir(parents=True)
+            Path(directory, "data", "figs").mkdir(parents=True)
+            chdir(workingDirectory)
+
+            kwargs = {
+                "args": [
+                    "-p",
+                    str(pmPath),
+                    "-o",
+                    str(oaPath),
+                    "-i",
+                    str(aiClassificationPath),
+                    "--no-cache",
+                ],
+                "standalone_mode": False,
+            }
+        else:
+            kwargs = _suiteArguments(
+                function=function,
+                pmDB=connectToDB(dbPath=pmPath),
+                oaDB=connectToDB(dbPath=oaPath),
+                directory=Path(directory),
+            )
+
+        with redirect_stdout(fp), redirect_stderr(fp):
+            _, seconds = _timeFunction(function=function, **kwargs)
+
+    # Linux reports the peak resident set size in kilobytes
+    return (seconds, getrusage(RUSAGE_SELF).ru_maxrss * 1024)
+
+
+def _findRegressions(
+    results: dict[str, dict[str, dict[str, float]]],
+    baseline: dict[str, dict[str, dict[str, float]]],
+    tolerance: float,
+) -> List[str]:
+    """
+    _findRegressions Compare suite results to a baseline of the same shape
+
+    :param results: Results of the suite by number of works and function
+    :type results: dict[str, dict[str, dict[str, float]]]
+    :param baseline: Stored results of the suite by number of works and function
+    :type baseline: dict[str, dict[str, dict[str, float]]]
+    :param tolerance: The fraction that rows per second may fall, or peak memory may grow, before it is a regression
+    :type tolerance: float
+    :return: A list of descriptions of regressions
+    :rtype: List[str]
+    """
+    regressions: List[str] = []
+
+    scale: str
+    functions: dict[str, dict[str, float]]
+    for scale, functions in results.items():
+        name: str
+        result: dict[str, float]
+        for name, result in functions.items():
+            previous: dict[str, float] | None = baseline.get(scale, {}).get(name)
+            if previous is None:
+                continue
+
+            comparable: bool = (
+                max(result["seconds"], previous["seconds"]) >= MIN_COMPARABLE_SECONDS
+            )
+            if comparable and result["rowsPerSecond"] < previous["rowsPerSecond"] * (
+                1 - tolerance
+            ):
+                regressions.append(
+                    f"{scale} works, {name}: rows/sec fell from "
+                    f"{intcomma(value=int(previous['rowsPerSecond']))} to "
+                    f"{intcomma(value=int(result['rowsPerSecond']))}"
+                )
+            if result["peakBytes"] > previous["peakBytes"] * (1 + tolerance):
+                regressions.append(
+                    f"{scale} works, {name}: peak memory grew from "
+                    f"{naturalsize(value=previous['peakBytes'])} to "
+                    f"{naturalsize(value=result['peakBytes'])}"
+                )
+
+    return regressions
+
+
+@click.group()
+def cli() -> None:
+    pass
+
+
+@cli.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+def citations(pmPath: Path, oaPath: Path) -> None:
+    """
+    Compare the pandas and SQLite citation counts
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    assert isFile(path=absPMPath)
+    assert isFile(path=absOAPath)
+
+    pmDB: Connection = connectToDB(dbPath=absPMPath)
+    oaDB: Connection = connectToDB(dbPath=absOAPath)
+
+    pandasResult: Series
+    pandasTime: float
+    pandasResult, pandasTime = _timeFunction(
+        function=oapm_CountCitationsOfArXivPMPapers,
+        pmDB=pmDB,
+        oaDB=oaDB,
+    )
+
+    sqlResult: Series
+    sqlTime: float
+    sqlResult, sqlTime = _timeFunction(
+        function=oapm_CountCitationsOfArXivPMPapersInSQL,
+        pmDB=pmDB,
+        oaDB=oaDB,
+    )
+
+    print(f"pandas: {pandasTime:.3f} seconds")
+    print(f"sql: {sqlTime:.3f} seconds ({pandasTime / sqlTime:.1f}x)")
+    print("Results are equal:", _seriesAreEqual(a=pandasResult, b=sqlResult))
+
+
+@cli.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+@click.option(
+    "-w",
+    "--workers",
+    "maxWorkers",
+    type=click.IntRange(min=1),
+    help="Maximum number of processes to benchmark",
+    required=False,
+    default=cpu_count(),
+    show_default=True,
+)
+def workers(pmPath: Path, oaPath: Path, maxWorkers: int) -> None:
+    """
+    Benchmark the parallel table scans from 1 to N workers
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    assert isFile(path=absPMPath)
+    assert isFile(path=absOAPath)
+
+    pmDB: Connection = connectToDB(dbPath=absPMPath)
+    oaDB: Connection = connectToDB(dbPath=absOAPath)
+
+    workerCounts: List[int] = sorted(
+        {
+            2**power
+            for power in range(maxWorkers.bit_length())
+            if 2**power <= maxWorkers
+        }
+        | {maxWorkers}
+    )
+
+    functions: dict[str, Callable[..., Any]] = {
+        "oa_CountPapersByDOI": partial(
+            oa_CountPapersByDOI,
+            oaDB=oaDB,
+        ),
+        "oapm_CountPMArXivPapersInOA": partial(
+            oapm_CountPMArXivPapersInOA,
+            pmDB=pmDB,
+            oaDB=oaDB,
+        ),
+        "oapm_CountCitationsOfArXivPMPapers": partial(
+            oapm_CountCitationsOfArXivPMPapers,
+            pmDB=pmDB,
+            oaDB=oaDB,
+        ),
+    }
+
+    name: str
+    function: Callable[..., Any]
+    for name, function in functions.items():
+        baseline: Any
+        baselineTime: float
+        baseline, baselineTime = _timeFunction(function=function, workers=1)
+        print(f"{name} (1 worker): {baselineTime:.3f} seconds")
+
+        workerCount: int
+        for workerCount in workerCounts[1:]:
+            result: Any
+            resultTime: float
+            result, resultTime = _timeFunction(function=function, workers=workerCount)
+            print(
+                f"{name} ({workerCount} workers): {resultTime:.3f} seconds",
+                f"({baselineTime / resultTime:.1f}x),",
+                "results are equal:",
+                _resultsAreEqual(a=baseline, b=result),
+            )
+
+
+@cli.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+@click.option(
+    "-n",
+    "--chunks",
+    "chunkCount",
+    type=click.IntRange(min=1),
+    help="Number of 10,000 row chunks of OpenAlex works to benchmark",
+    required=False,
+    default=10,
+    show_default=True,
+)
+def normalization(pmPath: Path, oaPath: Path, chunkCount: int) -> None:
+    """
+    Compare scalar and vectorized text normalization
+    """
+    chunkSize: int = 10000
+
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    assert isFile(path=absPMPath)
+    assert isFile(path=absOAPath)
+
+    pmDB: Connection = connectToDB(dbPath=absPMPath)
+    oaDB: Connection = connectToDB(dbPath=absOAPath)
+
+    worksDF: DataFrame = pandas.concat(
+        objs=_createDFGeneratorFromSQL(
+            db=oaDB,
+            query="SELECT title FROM works WHERE title IS NOT NULL LIMIT ?",
+            chunkSize=chunkSize,
+            params=(chunkCount * chunkSize,),
+        ),
+        ignore_index=True,
+    )
+    pmDF: DataFrame = _createDFFromSQL(
+        db=pmDB,
+        query="SELECT url FROM paper WHERE url IS NOT NULL",
+    )
+
+    helpers: List[Tuple[str, Series, Callable[[str], str], Callable]] = [
+        (
+            "_standardizeText",
+            worksDF["title"],
+            _standardizeText,
+            _standardizeTextSeries,
+        ),
+        (
+            "_convertToArXivDOI",
+            pmDF["url"],
+            _convertToArXivDOI,
+            _convertToArXivDOISeries,
+        ),
+        ("_extractNetLoc", pmDF["url"], _extractNetLoc, _extractNetLocSeries),
+    ]
+
+    name: str
+    data: Series
+    scalarFunction: Callable[[str], str]
+    vectorizedFunction: Callable[[Series], Series]
+    for name, data, scalarFunction, vectorizedFunction in helpers:
+        objectChunks: List[Series] = [
+            data.iloc[idx : idx + chunkSize].astype(dtype=object)
+            for idx in range(0, data.shape[0], chunkSize)
+        ]
+        arrowChunks: List[Series] = [
+            chunk.astype(dtype=PYARROW_STRING) for chunk in objectChunks
+        ]
+
+        scalarResults: List[Series]
+        scalarTime: float
+        scalarResults, scalarTime = _timeFunction(
+            function=_applyToRows,
+            chunks=objectChunks,
+            rowFunction=scalarFunction,
+        )
+
+        vectorizedResults: List[Series]
+        vectorizedTime: float
+        vectorizedResults, vectorizedTime = _timeFunction(
+            function=_applyToChunks,
+            chunks=arrowChunks,
+            chunkFunction=vectorizedFunction,
+        )
+
+        resultsAreEqual: bool = all(
+            [
+                scalarResult.tolist() == vectorizedResult.tolist()
+                for scalarResult, vectorizedResult in zip(
+                    scalarResults, vectorizedResults
+                )
+            ]
+        )
+
+        print(
+            f"{name}: {data.shape[0] / scalarTime:,.0f} rows/second scalar,",
+            f"{data.shape[0] / vectorizedTime:,.0f} rows/second vectorized",
+            f"({scalarTime / vectorizedTime:.1f}x), results are equal:",
+            resultsAreEqual,
+        )
+
+
+@cli.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+@click.option(
+    "-d",
+    "--parquet-dir",
+    "parquetPath",
+    type=Path,
+    help="Path to the Parquet files written by prepare.py parquet",
+    required=False,
+    default=Path("../../data/parquet"),
+    show_default=True,
+)
+def backends(pmPath: Path, oaPath: Path, parquetPath: Path) -> None:
+    """
+    Compare the SQLite and Parquet OpenAlex backends
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+    absParquetPath: Path = resolvePath(path=parquetPath)
+
+    assert isFile(path=absPMPath)
+    assert isFile(path=absOAPath)
+    assert isDirectory(path=absParquetPath)
+
+    pmDB: Connection = connectToDB(dbPath=absPMPath)
+    oaDBs: dict[str, Connection | ParquetDB] = {
+        "sqlite": connectToDB(dbPath=absOAPath),
+        "parquet": ParquetDB(directory=absParquetPath),
+    }
+
+    functions: dict[str, Callable[..., Any]] = {
+        "oa_CountPapersByDOI": oa_CountPapersByDOI,
+        "oa_CountPapersByOAID": oa_CountPapersByOAID,
+        "oa_CountCitations": oa_CountCitations,
+        "oapm_CountPMArXivPapersInOA": partial(
+            oapm_CountPMArXivPapersInOA,
+            pmDB=pmDB,
+        ),
+        "oapm_CountCitationsOfArXivPMPapers": partial(
+            oapm_CountCitationsOfArXivPMPapers,
+            pmDB=pmDB,
+        ),
+    }
+
+    results: dict[str, Any] = {}
+
+    name: str
+    function: Callable[..., Any]
+    for name, function in functions.items():
+        sqliteResult: Any
+        sqliteTime: float
+        sqliteResult, sqliteTime = _timeFunction(
+            function=function,
+            oaDB=oaDBs["sqlite"],
+        )
+
+        parquetResult: Any
+        parquetTime: float
+        parquetResult, parquetTime = _timeFunction(
+            function=function,
+            oaDB=oaDBs["parquet"],
+        )
+
+        results[name] = sqliteResult
+        print(
+            f"{name}: {sqliteTime:.3f} seconds sqlite,",
+            f"{parquetTime:.3f} seconds parquet",
+            f"({sqliteTime / parquetTime:.1f}x), results are equal:",
+            _resultsAreEqual(a=sqliteResult, b=parquetResult),
+        )
+
+    # Resolve the works that cite the most cited PeaTMOSS paper like
+    # oapm_GetDOIsOfOAWorksThatCitePM does
+    citationCounts: Series = results["oapm_CountCitationsOfArXivPMPapers"]
+    if citationCounts.shape[0] == 0:
+        return
+
+    citingOAIDs: List[str] = [
+        row[0]
+        for row in oaDBs["sqlite"]
+        .execute(
+            "SELECT work FROM cites WHERE reference = ?",
+            (citationCounts.index[0],),
+        )
+        .fetchall()
+    ]
+
+    doiResults: List[dict[str, str]] = []
+    doiTimes: List[float] = []
+
+    oaDB: Connection | ParquetDB
+    for oaDB in oaDBs.values():
+        doiResult: dict[str, str]
+        doiTime: float
+        doiResult, doiTime = _timeFunction(
+            function=oa_GetDOIsOfWorks,
+            oaDB=oaDB,
+            oaIDs=citingOAIDs,
+        )
+        doiResults.append(doiResult)
+        doiTimes.append(doiTime)
+
+    print(
+        f"oa_GetDOIsOfWorks: {doiTimes[0]:.3f} seconds sqlite,",
+        f"{doiTimes[1]:.3f} seconds parquet",
+        f"({doiTimes[0] / doiTimes[1]:.1f}x), results are equal:",
+        doiResults[0] == doiResults[1],
+    )
+
+
+@cli.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+@click.option(
+    "-g",
+    "--graph",
+    "graphPath",
+    type=Path,
+    help="Path to the citation graph written by prepare.py graph",
+    required=False,
+    default=Path("../../data/graph"),
+    show_default=True,
+)
+def graph(pmPath: Path, oaPath: Path, graphPath: Path) -> None:
+    """
+    Compare the cites table and the citation graph
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+    absGraphPath: Path = resolvePath(path=graphPath)
+
+    assert isFile(path=absPMPath)
+    assert isFile(path=absOAPath)
+    assert isDirectory(path=absGraphPath)
+
+    pmDB: Connection = connectToDB(dbPath=absPMPath)
+    oaDB: Connection = connectToDB(dbPath=absOAPath)
+
+    citationGraph: CitationGraph
+    loadTime: float
+    citationGraph, loadTime = _timeFunction(
+        function=CitationGraph.load,
+        directory=absGraphPath,
+    )
+    print(f"Memory-mapped the graph in {loadTime:.3f} seconds")
+
+    citesBytes: int = sum(
+        [
+            df.memory_usage(deep=True).sum()
+            for df in _createDFGeneratorFromSQL(
+                db=oaDB,
+                query="SELECT work, reference FROM cites",
+            )
+        ]
+    )
+    print(
+        f"cites as string DataFrames: {naturalsize(value=citesBytes)},",
+        f"graph arrays: {naturalsize(value=citationGraph.nbytes)}",
+    )
+
+    tableResult: Series
+    tableTime: float
+    tableResult, tableTime = _timeFunction(
+        function=oapm_CountCitationsOfArXivPMPapers,
+        pmDB=pmDB,
+        oaDB=oaDB,
+    )
+
+    graphResult: Series
+    graphTime: float
+    graphResult, graphTime = _timeFunction(
+        function=oapm_CountCitationsOfArXivPMPapers,
+        pmDB=pmDB,
+        oaDB=oaDB,
+        graph=citationGraph,
+    )
+
+    print(
+        f"oapm_CountCitationsOfArXivPMPapers: {tableTime:.3f} seconds cites table,",
+        f"{graphTime:.3f} seconds graph ({tableTime / graphTime:.1f}x),",
+        "results are equal:",
+        _seriesAreEqual(a=tableResult, b=graphResult),
+    )
+
+    countTime: float
+    _, countTime = _timeFunction(
+        function=citationGraph.countCitations,
+        oaIDs=graphResult.index.to_list(),
+    )
+    print(
+        f"Counted the citations of {intcomma(value=graphResult.shape[0])} works",
+        f"from the graph in {countTime * 1000:.3f} milliseconds",
+    )
+
+    citingTimes: List[float] = []
+    citingAreEqual: List[bool] = []
+
+    oaID: str
+    for oaID in graphResult.index[0:5]:
+        tableCiters: DataFrame
+        tableCitersTime: float
+        tableCiters, tableCitersTime = _timeFunction(
+            function=_createDFFromSQL,
+            db=oaDB,
+            query="SELECT work FROM cites WHERE reference = ?",
+            params=(oaID,),
+        )
+
+        graphCiters: List[str]
+        graphCitersTime: float
+        graphCiters, graphCitersTime = _timeFunction(
+            function=citationGraph.citedBy,
+            oaID=oaID,
+        )
+
+        citingTimes.append(graphCitersTime)
+        citingAreEqual.append(tableCiters["work"].to_list() == graphCiters)
+        print(
+            f"Works citing {oaID}: {tableCitersTime * 1000:.3f} milliseconds",
+            f"cites table, {graphCitersTime * 1000:.3f} milliseconds graph",
+        )
+
+    print("Citing works are equal:", all(citingAreEqual))
+
+
+@cli.command()
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+@click.option(
+    "-g",
+    "--graph",
+    "graphPath",
+    type=Path,
+    help="Path to the citation graph written by prepare.py graph",
+    required=False,
+    default=Path("../../data/graph"),
+    show_default=True,
+)
+@click.option(
+    "-k",
+    "--hops",
+    "hops",
+    type=click.IntRange(min=1),
+    help="Number of citation hops to follow",
+    required=False,
+    default=3,
+    show_default=True,
+)
+@click.option(
+    "-n",
+    "--seeds",
+    "seedCount",
+    type=click.IntRange(min=1),
+    help="Number of the most cited works to start from",
+    required=False,
+    default=5,
+    show_default=True,
+)
+@click.option(
+    "--compare-sql",
+    "compareSQL",
+    is_flag=True,
+    help="Also follow the citations with SQL queries and compare the results",
+)
+def hops(
+    oaPath: Path,
+    graphPath: Path,
+    hops: int,
+    seedCount: int,
+    compareSQL: bool,
+) -> None:
+    """
+    Benchmark following citations over several hops from the most cited works
+    """
+    absOAPath: Path = resolvePath(path=oaPath)
+    absGraphPath: Path = resolvePath(path=graphPath)
+
+    assert isFile(path=absOAPath)
+    assert isDirectory(path=absGraphPath)
+
+    oaDB: Connection = connectToDB(dbPath=absOAPath)
+    citationGraph: CitationGraph = CitationGraph.load(directory=absGraphPath)
+
+    inDegrees: numpy.ndarray = numpy.diff(citationGraph.inIndptr)
+    seeds: List[str] = decodeOAIDs(
+        encodedIDs=citationGraph.nodes[
+            numpy.argsort(inDegrees, kind="stable")[::-1][:seedCount]
+        ]
+    )
+
+    oaID: str
+    for oaID in seeds:
+        levels: List[numpy.ndarray]
+        graphTime: float
+        levels, graphTime = _timeFunction(
+            function=citationGraph.expandCitations,
+            oaID=oaID,
+            hops=hops,
+        )
+        hopCounts: List[int] = [level.shape[0] for level in levels]
+        print(
+            f"{oaID}: {intcomma(value=sum(hopCounts))} works within {hops} hops",
+            f"({', '.join([intcomma(value=count) for count in hopCounts])})",
+            f"in {graphTime:.3f} seconds",
+        )
+
+        if not compareSQL:
+            continue
+
+        sqlLevels: List[set[str]]
+        sqlTime: float
+        sqlLevels, sqlTime = _timeFunction(
+            function=_expandCitationsInSQL,
+            db=oaDB,
+            oaID=oaID,
+            hops=hops,
+        )
+        print(
+            f"{oaID}: {sqlTime:.3f} seconds with SQL ({sqlTime / graphTime:.1f}x),",
+            "results are equal:",
+            [
+                set(decodeOAIDs(encodedIDs=citationGraph.nodes[level]))
+                for level in levels
+            ]
+            == sqlLevels,
+        )
+
+
+@cli.command()
+@click.option(
+    "-d",
+    "--dir",
+    "abstractDirectory",
+    type=Path,
+    help="Path to abstract directory to read files",
+    required=False,
+    default=Path("../../data/abstracts"),
+    show_default=True,
+)
+@click.option(
+    "-m",
+    "--model",
+    "model",
+    type=str,
+    help="Ollama model to classify abstracts with",
+    required=False,
+    default="gemma",
+    show_default=True,
+)
+@click.option(
+    "-u",
+    "--base-url",
+    "baseURL",
+    type=str,
+    help="URL of the Ollama server",
+    required=False,
+    default="http://localhost:11434",
+    show_default=True,
+)
+@click.option(
+    "-n",
+    "--pack-size",
+    "packSizes",
+    type=click.IntRange(min=2),
+    multiple=True,
+    help="Number of abstracts per request to compare against one at a time, can be repeated",
+    required=False,
+    default=[5, 10, 20],
+    show_default=True,
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    "concurrency",
+    type=click.IntRange(min=1),
+    help="Maximum number of requests to the Ollama server in flight",
+    required=False,
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "-l",
+    "--limit",
+    "limit",
+    type=click.IntRange(min=1),
+    help="Number of abstracts to classify",
+    required=False,
+    default=100,
+    show_default=True,
+)
+def packing(
+    abstractDirectory: Path,
+    model: str,
+    baseURL: str,
+    packSizes: Tuple[int, ...],
+    concurrency: int,
+    limit: int,
+) -> None:
+    """
+    Benchmark classifying several abstracts per request against one at a time
+    """
+    absAbstractDirectory: Path = resolvePath(path=abstractDirectory)
+
+    assert isDirectory(path=absAbstractDirectory)
+
+    abstracts: List[str] = [
+        record[2]
+        for record in islice(
+            streamAbstracts(
+                filepaths=[
+                    Path(absAbstractDirectory, fp)
+                    for fp in sorted(listdir(path=absAbstractDirectory))
+                ]
+            ),
+            limit,
+        )
+    ]
+
+    chain: Runnable = createChain(model=model, baseURL=baseURL, retries=3)
+    packedChain: Runnable = createChain(
+        model=model,
+        baseURL=baseURL,
+        retries=3,
+        systemPrompt=PACKED_SYSTEM_PROMPT,
+    )
+
+    baseline: List[str] = []
+    baselineTokens: int = 0
+    baselineTime: float = 0
+
+    packSize: int
+    for packSize in [1, *sorted(set(packSizes))]:
+        packs: List[List[str]] = [
+            abstracts[idx : idx + packSize]
+            for idx in range(0, len(abstracts), packSize)
+        ]
+
+        results: List[Tuple[List[str], int, int]]
+        resultTime: float
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results, resultTime = _timeFunction(
+                function=lambda: list(
+                    executor.map(
+                        partial(_classifyPackWithUsage, chain, packedChain),
+                        packs,
+                    )
+                )
+            )
+
+        classifications: List[str] = [
+            classification for result in results for classification in result[0]
+        ]
+        tokens: int = sum([result[1] for result in results])
+        requests: int = sum([result[2] for result in results])
+
+        if packSize == 1:
+            baseline, baselineTokens, baselineTime = (
+                classifications,
+                tokens,
+                resultTime,
+            )
+            print(
+                f"1 abstract per request: {intcomma(value=requests)} requests,",
+                f"~{tokens / len(abstracts):.1f} tokens per abstract,",
+                f"{resultTime:.3f} seconds",
+            )
+            continue
+
+        fallbackCount: int = requests - len(packs)
+        agreedCount: int = sum([a == b for a, b in zip(baseline, classifications)])
+        print(
+            f"{packSize} abstracts per request: {intcomma(value=requests)} requests",
+            f"({fallbackCount} to fall back),",
+            f"~{tokens / len(abstracts):.1f} tokens per abstract",
+            f"({baselineTokens / tokens:.1f}x fewer),",
+            f"{resultTime:.3f} seconds ({baselineTime / resultTime:.1f}x),",
+            f"agreed with 1 per request on {agreedCount} of {len(abstracts)}",
+        )
+
+
+@cli.command()
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+@click.option(
+    "-n",
+    "--samples",
+    "sampleCount",
+    type=click.IntRange(min=1),
+    help="Number of cited works to explore, half of them the most cited",
+    required=False,
+    default=200,
+    show_default=True,
+)
+def explorer(oaPath: Path, sampleCount: int) -> None:
+    """
+    Measure the latency of the Streamlit app's citation explorer queries
+    """
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    assert isFile(path=absOAPath)
+
+    oaDB: Connection = connectToDB(dbPath=absOAPath, readOnly=True)
+    engine: Engine = getEngine(dbPath=str(absOAPath))
+
+    # The most cited works have the most citing works to page through
+    mostCited: List[str] = [
+        row[0]
+        for row in oaDB.execute(
+            "SELECT reference FROM cites GROUP BY reference ORDER BY COUNT(*) DESC LIMIT ?",
+            (sampleCount // 2,),
+        ).fetchall()
+    ]
+
+    # Typical works are sampled from evenly spaced rows of the cites table
+    rowIDs: numpy.ndarray = numpy.linspace(
+        start=1,
+        stop=getTableMaxRowID(db=oaDB, table="cites"),
+        num=sampleCount - len(mostCited),
+        dtype=numpy.int64,
+    )
+    typicallyCited: List[str] = [
+        row[0]
+        for rowID in rowIDs.tolist()
+        for row in oaDB.execute(
+            "SELECT reference FROM cites WHERE rowid = ? AND reference IS NOT NULL",
+            (rowID,),
+        ).fetchall()
+    ]
+
+    latencies: dict[str, List[float]] = {"resolve": [], "count": [], "page": []}
+
+    oaID: str
+    for oaID in mostCited + typicallyCited:
+        resolveTime: float
+        _, resolveTime = _timeFunction(
+            function=resolveWork,
+            engine=engine,
+            work=oaID,
+        )
+        latencies["resolve"].append(resolveTime)
+
+        countTime: float
+        _, countTime = _timeFunction(
+            function=describeCitations,
+            engine=engine,
+            oaID=oaID,
+        )
+        latencies["count"].append(countTime)
+
+        pageTime: float
+        _, pageTime = _timeFunction(
+            function=fetchCitingWorks,
+            engine=engine,
+            oaID=oaID,
+        )
+        latencies["page"].append(pageTime)
+
+    totals: numpy.ndarray = numpy.sum(
+        [numpy.array(times) for times in latencies.values()],
+        axis=0,
+    )
+
+    name: str
+    times: List[float]
+    for name, times in [*latencies.items(), ("total", totals)]:
+        print(
+            f"{name}: p50 {numpy.percentile(times, 50) * 1000:.2f} ms,",
+            f"p95 {numpy.percentile(times, 95) * 1000:.2f} ms,",
+            f"max {numpy.max(times) * 1000:.2f} ms",
+        )
+
+
+@cli.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database with the full-text index of `prepare.py fts`",
+    required=True,
+)
+@click.option(
+    "-n",
+    "--samples",
+    "sampleCount",
+    type=click.IntRange(min=1),
+    help="Number of title searches to time",
+    required=False,
+    default=200,
+    show_default=True,
+)
+def titles(pmPath: Path, oaPath: Path, sampleCount: int) -> None:
+    """
+    Compare the SQLite and full-text index title matching, and measure the latency of the Streamlit app's title search
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    assert isFile(path=absPMPath)
+    assert isFile(path=absOAPath)
+
+    pmDB: Connection = connectToDB(dbPath=absPMPath)
+    oaDB: Connection = connectToDB(dbPath=absOAPath)
+    engine: Engine = getEngine(dbPath=str(absOAPath))
+
+    sqlResult: Series
+    sqlTime: float
+    sqlResult, sqlTime = _timeFunction(
+        function=oapm_CountCitationsOfArXivPMPapersInSQL,
+        pmDB=pmDB,
+        oaDB=oaDB,
+    )
+
+    ftsResult: Series
+    ftsTime: float
+    ftsResult, ftsTime = _timeFunction(
+        function=oapm_CountCitationsOfArXivPMPapersInFTS,
+        pmDB=pmDB,
+        oaDB=oaDB,
+    )
+
+    print(f"sql: {sqlTime:.3f} seconds")
+    print(f"fts: {ftsTime:.3f} seconds ({sqlTime / ftsTime:.1f}x)")
+    print("Results are equal:", _seriesAreEqual(a=sqlResult, b=ftsResult))
+
+    # Queries are the first words of titles sampled from evenly spaced rows of the
+    # works table, with the last word cut short as if it were still being typed
+    rowIDs: numpy.ndarray = numpy.linspace(
+        start=1,
+        stop=getTableMaxRowID(db=oaDB, table="works"),
+        num=sampleCount,
+        dtype=numpy.int64,
+    )
+    queries: List[str] = []
+
+    rowID: int
+    for rowID in rowIDs.tolist():
+        row: Tuple[str | None] | None = oaDB.execute(
+            "SELECT title FROM works WHERE rowid = ?",
+            (rowID,),
+        ).fetchone()
+        if row is None or row[0] is None:
+            continue
+
+        tokens: List[str] = FTS_TOKEN_PATTERN.findall(string=row[0])[0:4]
+        if len(tokens) == 0:
+            continue
+
+        tokens[-1] = tokens[-1][0 : max(1, len(tokens[-1]) - 2)]
+        queries.append(" ".join(tokens))
+
+    latencies: List[float] = []
+    resultCounts: List[int] = []
+
+    query: str
+    for query in queries:
+        df: DataFrame | None
+        searchTime: float
+        df, searchTime = _timeFunction(
+            function=searchTitles,
+            engine=engine,
+            query=query,
+        )
+        if df is None:
+            print(
+                "The database does not have the full-text index, run `prepare.py fts`"
+            )
+            return
+
+        latencies.append(searchTime)
+        resultCounts.append(df.shape[0])
+
+    print(
+        f"title search ({len(queries)} queries, {numpy.mean(resultCounts):.1f} results on average):",
+        f"p50 {numpy.percentile(latencies, 50) * 1000:.2f} ms,",
+        f"p95 {numpy.percentile(latencies, 95) * 1000:.2f} ms,",
+        f"max {numpy.max(latencies) * 1000:.2f} ms",
+    )
+
+
+@cli.command()
+@click.option(
+    "-n",
+    "--works",
+    "scales",
+    type=click.IntRange(min=100),
+    multiple=True,
+    help="Number of works of each synthetic OpenAlex database to benchmark",
+    required=False,
+    default=[10000, 100000],
+    show_default=True,
+)
+@click.option(
+    "-d",
+    "--data-dir",
+    "dataDirectory",
+    type=Path,
+    help="Directory to generate, or reuse, the synthetic databases in",
+    required=False,
+    default=Path("../../data/synthetic"),
+    show_default=True,
+)
+@click.option(
+    "-i",
+    "--ai-classification-path",
+    "aiClassificationPath",
+    type=Path,
+    help="Path to JSON file of AI classes for the plot.py pipeline",
+    required=False,
+    default=Path("../../data/json/ai_nature_classes.json"),
+    show_default=True,
+)
+@click.option(
+    "-r",
+    "--repeats",
+    "repeats",
+    type=click.IntRange(min=1),
+    help="Number of times to run each function; the fastest run is reported",
+    required=False,
+    default=3,
+    show_default=True,
+)
+@click.option(
+    "-b",
+    "--baseline",
+    "baselinePath",
+    type=Path,
+    help="Path to the stored results to flag regressions against",
+    required=False,
+    default=Path("../../data/benchmarks/baseline.json"),
+    show_default=True,
+)
+@click.option(
+    "--update-baseline",
+    "updateBaseline",
+    is_flag=True,
+    help="Store these results as the baseline instead of comparing to it",
+)
+@click.option(
+    "-t",
+    "--tolerance",
+    "tolerance",
+    type=click.FloatRange(min=0),
+    help="Fraction that rows/sec may fall, or peak memory may grow, before it is flagged",
+    required=False,
+    default=0.25,
+    show_default=True,
+)
+@click.option(
+    "-s",
+    "--save",
+    "savePath",
+    type=Path,
+    help="Path to save the results to as JSON",
+    required=False,
+    default=Path("../../data/benchmarks/suite.json"),
+    show_default=True,
+)
+def suite(
+    scales: Tuple[int, ...],
+    dataDirectory: Path,
+    aiClassificationPath: Path,
+    repeats: int,
+    baselinePath: Path,
+    updateBaseline: bool,
+    tolerance: float,
+    savePath: Path,
+) -> None:
+    """
+    Time every oa_*, pm_*, and oapm_* function and the plot.py pipeline on synthetic databases and flag regressions
+    """
+    absDataDirectory: Path = resolvePath(path=dataDirectory)
+    absAIClassesPath: Path = resolvePath(path=aiClassificationPath)
+    absBaselinePath: Path = resolvePath(path=baselinePath)
+    absSavePath: Path = resolvePath(path=savePath)
+
+    assert isFile(path=absAIClassesPath)
+
+    results: dict[str, dict[str, dict[str, float]]] = {}
+
+    scale: int
+    for scale in scales:
+        pmPath: Path = Path(absDataDirectory, f"peatmoss_{scale}.db")
+        oaPath: Path = Path(absDataDirectory, f"openalex_{scale}.db")
+
+        if not (pmPath.exists() and oaPath.exists()):
+            pmPath.unlink(missing_ok=True)
+            oaPath.unlink(missing_ok=True)
+            generateDatabases(
+                pmPath=pmPath,
+                oaPath=oaPath,
+                workCount=scale,
+                paperCount=defaultPaperCount(workCount=scale),
+            )
+
+        pmDB: Connection = connectToDB(dbPath=pmPath)
+        oaDB: Connection = connectToDB(dbPath=oaPath)
+
+        createIndexes(db=pmDB, dbPath=pmPath, indexes=PM_INDEXES)
+        createIndexes(db=oaDB, dbPath=oaPath, indexes=OA_INDEXES)
+        createFTSIndex(db=oaDB, dbPath=oaPath, refresh=False)
+
+        rowCounts: dict[str, int] = {
+            "paper": getTableRowCount(db=pmDB, table="paper"),
+            "model_to_paper": getTableRowCount(db=pmDB, table="model_to_paper"),
+            "works": getTableRowCount(db=oaDB, table="works"),
+            "cites": getTableRowCount(db=oaDB, table="cites"),
+        }
+        pmDB.close()
+        oaDB.close()
+
+        print(f"{intcomma(value=scale)} works:")
+        results[str(scale)] = {}
+
+        name: str
+        tables: List[str]
+        for name, (_, tables) in SUITE_FUNCTIONS.items():
+            runs: List[Tuple[float, int]] = []
+
+            _: int
+            for _ in range(repeats):
+                # A fresh process per run so that the peak memory is only this run's
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    runs.append(
+                        executor.submit(
+                            _runSuiteFunction,
+                            name,
+                            pmPath,
+                            oaPath,
+                            absAIClassesPath,
+                        ).result()
+                    )
+
+            seconds: float = min([run[0] for run in runs])
+            peakBytes: int = min([run[1] for run in runs])
+            rows: int = sum([rowCounts[table] for table in tables])
+
+            results[str(scale)][name] = {
+                "seconds": seconds,
+                "rows": rows,
+                "rowsPerSecond": rows / seconds,
+                "peakBytes": peakBytes,
+            }
+            print(
+                f"  {name}: {seconds:.3f} seconds,",
+                f"{intcomma(value=int(rows / seconds))} rows/sec,",
+                f"peak {naturalsize(value=peakBytes)}",
+            )
+
+    absSavePath.parent.mkdir(parents=True, exist_ok=True)
+    with open(file=absSavePath, mode="w") as fp:
+        json.dump(obj=results, fp=fp, indent=4)
+    print(f"Saved file to: {absSavePath}")
+
+    baseline: dict[str, dict[str, dict[str, float]]] = {}
+    if absBaselinePath.exists():
+        with open(file=absBaselinePath, mode="r") as fp:
+            baseline = json.load(fp=fp)
+
+    if updateBaseline:
+        baseline.update(results)
+        absBaselinePath.parent.mkdir(parents=True, exist_ok=True)
+        with open(file=absBaselinePath, mode="w") as fp:
+            json.dump(obj=baseline, fp=fp, indent=4)
+        print(f"Saved baseline to: {absBaselinePath}")
+        return
+
+    if len(baseline) == 0:
+        print(f"No baseline at {absBaselinePath}; store one with --update-baseline")
+        return
+
+    regressions: List[str] = _findRegressions(
+        results=results,
+        baseline=baseline,
+        tolerance=tolerance,
+    )
+
+    regression: str
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    if len(regressions) > 0:
+        raise SystemExit(1)
+
+    print(f"No regressions against {absBaselinePath}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,316 @@
+import pickle
+from functools import lru_cache, wraps
+from hashlib import sha256
+from inspect import BoundArguments, Signature, isfunction, signature, unwrap
+from os import replace, stat_result, utime
+from pathlib import Path
+from sqlite3 import Connection, OperationalError
+from types import CodeType
+from typing import Any, Callable, List, Tuple
+
+from src.stats import getDBPath, runOneValueSQLQuery
+from src.stats.graph import CitationGraph
+from src.stats.parquet import ParquetDB
+
+
+class ResultCache:
+    """
+    ResultCache An on-disk, size capped cache of pickled results keyed by content hashes
+
+    The least recently used entries are evicted once the cache grows larger than `maxBytes`
+    """
+
+    def __init__(self, directory: Path, maxBytes: int) -> None:
+        self.directory: Path = directory
+        self.maxBytes: int = maxBytes
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _entryPath(self, key: str) -> Path:
+        return Path(self.directory, f"{key}.pickle")
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        get Return whether a key is cached and its value
+
+        :param key: A cache key
+        :type key: str
+        :return: A tuple of whether the key was found and its value
+        :rtype: Tuple[bool, Any]
+        """
+        entryPath: Path = self._entryPath(key=key)
+
+        try:
+            with open(file=entryPath, mode="rb") as fp:
+                value: Any = pickle.load(file=fp)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return (False, None)
+
+        # Touch the entry so that eviction sees it as recently used
+        utime(path=entryPath)
+        return (True, value)
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        put Store a value and evict the least recently used entries if the cache is too large
+
+        :param key: A cache key
+        :type key: str
+        :param value: A picklable value
+        :type value: Any
+        """
+        entryPath: Path = self._entryPath(key=key)
+        tempPath: Path = entryPath.with_suffix(suffix=".tmp")
+
+        with open(file=tempPath, mode="wb") as fp:
+            pickle.dump(obj=value, file=fp)
+
+        replace(src=tempPath, dst=entryPath)
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        evict Remove the least recently used entries until the cache fits within maxBytes
+        """
+        entries: List[Tuple[Path, stat_result]] = [
+            (entryPath, entryPath.stat())
+            for entryPath in self.directory.glob(pattern="*.pickle")
+        ]
+        entries.sort(key=lambda entry: entry[1].st_mtime_ns)
+
+        size: int = sum([entry[1].st_size for entry in entries])
+
+        entryPath: Path
+        entryStat: stat_result
+        for entryPath, entryStat in entries:
+            if size <= self.maxBytes:
+                break
+
+            entryPath.unlink(missing_ok=True)
+            size -= entryStat.st_size
+
+
+_CACHE: ResultCache | None = None
+
+
+def configureCache(directory: Path, maxBytes: int) -> None:
+    """
+    configureCache Enable caching of the stats functions decorated with `cached`
+
+    :param directory: Directory to store cached results in
+    :type directory: Path
+    :param maxBytes: Maximum size of the cache directory in bytes
+    :type maxBytes: int
+    """
+    global _CACHE
+    _CACHE = ResultCache(directory=directory, maxBytes=maxBytes)
+
+
+def fingerprintDB(db: Connection) -> str:
+    """
+    fingerprintDB Hash the file size, modification time, schema, and row counts of a SQLite3 database
+
+    Row counts are approximated by MAX(rowid) so that fingerprinting does not scan any table
+
+    :param db: An sqlite3.Connection object
+    :type db: Connection
+    :return: A hex digest of the database fingerprint
+    :rtype: str
+    """
+    dbPath: Path = getDBPath(db=db)
+    dbStat: stat_result = dbPath.stat()
+
+    schema: List[Tuple[str, str, str]] = db.execute(
+        "SELECT type, name, sql FROM sqlite_master ORDER BY type, name"
+    ).fetchall()
+
+    rowCounts: List[str] = []
+
+    table: str
+    for table in [row[1] for row in schema if row[0] == "table"]:
+        try:
+            rowCount: int | None = runOneValueSQLQuery(
+                db=db,
+                query=f'SELECT MAX(rowid) FROM "{table}"',
+            )[0]
+        except OperationalError:
+            # WITHOUT ROWID tables
+            continue
+
+        rowCounts.append(f"{table}={rowCount}")
+
+    fingerprint: str = "\n".join(
+        [
+            str(dbPath),
+            str(dbStat.st_size),
+            str(dbStat.st_mtime_ns),
+            repr(schema),
+            ",".join(rowCounts),
+        ]
+    )
+    return sha256(fingerprint.encode()).hexdigest()
+
+
+def fingerprintValue(value: Any) -> str:
+    """
+    fingerprintValue Return a string that changes whenever a parameter of a stats function changes
+
+    Databases and graphs are fingerprinted, files by their path, size, and modification time, and any other value by its repr
+
+    :param value: A parameter value
+    :type value: Any
+    :return: The fingerprint of the value
+    :rtype: str
+    """
+    if isinstance(value, Connection):
+        return fingerprintDB(db=value)
+    elif isinstance(value, (ParquetDB, CitationGraph)):
+        return value.fingerprint()
+    elif isinstance(value, Path) and value.is_file():
+        valueStat: stat_result = value.stat()
+        return f"{value}:{valueStat.st_size}:{valueStat.st_mtime_ns}"
+
+    return repr(value)
+
+
+def _describeConstant(constant: Any) -> str:
+    """
+    _describeConstant Return a description of a constant of a code object that is the same in every process
+
+    Frozen sets, such as those of `in {...}` tests, are sorted as their order changes with the hash seed
+
+    :param constant: A constant of a code object
+    :type constant: Any
+    :return: The description of the constant
+    :rtype: str
+    """
+    if isinstance(constant, CodeType):
+        return _describeCode(code=constant)
+    elif isinstance(constant, frozenset):
+        return f"frozenset({sorted(_describeConstant(item) for item in constant)})"
+    elif isinstance(constant, tuple):
+        return f"({', '.join(_describeConstant(item) for item in constant)})"
+
+    return repr(constant)
+
+
+def _describeCode(code: CodeType) -> str:
+    """
+    _describeCode Return a description of the bytecode, constants, and names of a code object
+
+    Line numbers are left out, so moving a function does not change its description
+
+    :param code: A code object
+    :type code: CodeType
+    :return: The description of the code object
+    :rtype: str
+    """
+    return "\n".join(
+        [
+            code.co_code.hex(),
+            _describeConstant(constant=code.co_consts),
+            repr(code.co_names),
+        ]
+    )
+
+
+def _listNames(code: CodeType) -> List[str]:
+    names: List[str] = list(code.co_names)
+
+    constant: Any
+    for constant in code.co_consts:
+        if isinstance(constant, CodeType):
+            names.extend(_listNames(code=constant))
+
+    return names
+
+
+@lru_cache(maxsize=None)
+def fingerprintFunction(function: Callable[..., Any]) -> str:
+    """
+    fingerprintFunction Return a hash of the code of a function and of the functions of this project that it calls
+
+    Decorators are unwrapped, and called functions are found by the global names of the code, so functions that are passed in or called as attributes of modules are not part of the hash
+
+    :param function: A function
+    :type function: Callable[..., Any]
+    :return: The fingerprint of the function
+    :rtype: str
+    """
+    package: str = function.__module__.split(".")[0]
+    descriptions: List[str] = []
+    visited: set[Callable[..., Any]] = set()
+    pending: List[Callable[..., Any]] = [unwrap(function)]
+
+    while pending:
+        current: Callable[..., Any] = pending.pop()
+        if current in visited:
+            continue
+
+        visited.add(current)
+        descriptions.append(f"{current.__module__}.{current.__qualname__}")
+        descriptions.append(_describeCode(code=current.__code__))
+
+        name: str
+        for name in sorted(set(_listNames(code=current.__code__))):
+            value: Any = current.__globals__.get(name)
+            if isfunction(value) and value.__module__.split(".")[0] == package:
+                pending.append(unwrap(value))
+
+    return sha256("\n".join(descriptions).encode()).hexdigest()
+
+
+def cached(
+    ignore: Tuple[str, ...] = ("workers",),
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    cached Cache the results of a stats function once `configureCache` is called
+
+    Entries are keyed on the function and the fingerprint of its code, its parameters, and the fingerprint of every sqlite3.Connection, ParquetDB, and CitationGraph parameter, so changing a database or the code of the function invalidates its entries
+
+    :param ignore: Names of parameters that do not change the result, defaults to ("workers",)
+    :type ignore: Tuple[str, ...], optional
+    :return: A decorator
+    :rtype: Callable[[Callable[..., Any]], Callable[..., Any]]
+    """
+
+    def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+        functionSignature: Signature = signature(function)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs) -> Any:
+            if _CACHE is None:
+                return function(*args, **kwargs)
+
+            boundArguments: BoundArguments = functionSignature.bind(*args, **kwargs)
+            boundArguments.apply_defaults()
+
+            keyParts: List[str] = [
+                function.__module__,
+                function.__qualname__,
+                fingerprintFunction(function=function),
+            ]
+
+            name: str
+            value: Any
+            for name, value in boundArguments.arguments.items():
+                if name in ignore:
+                    continue
+
+                keyParts.append(f"{name}={fingerprintValue(value=value)}")
+
+            key: str = sha256("\n".join(keyParts).encode()).hexdigest()
+
+            hit: bool
+            result: Any
+            hit, result = _CACHE.get(key=key)
+            if hit:
+                return result
+
+            result = function(*args, **kwargs)
+            _CACHE.put(key=key, value=result)
+            return result
+
+        return wrapper
+
+    return decorator
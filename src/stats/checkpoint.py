@@ -0,0 +1,129 @@
+import json
+from hashlib import sha256
+from io import SEEK_END, TextIOWrapper
+from pathlib import Path
+from typing import Iterator
+
+
+def normalizeAbstract(abstract: str) -> str:
+    """
+    normalizeAbstract Lower case an abstract and collapse its whitespace
+
+    :param abstract: The abstract to normalize
+    :type abstract: str
+    :return: The normalized abstract
+    :rtype: str
+    """
+    return " ".join(abstract.lower().split())
+
+
+def readCheckpoint(path: Path) -> Iterator[dict[str, str]]:
+    """
+    readCheckpoint Read the entries of a ClassificationCheckpoint log one at a time
+
+    :param path: Path to a ClassificationCheckpoint log
+    :type path: Path
+    :return: A generator of entries
+    :rtype: Iterator[dict[str, str]]
+    :yield: A dict with the key, model, abstract, and classification of an entry
+    :rtype: Iterator[dict[str, str]]
+    """
+    with open(file=path, mode="r") as fp:
+        line: str
+        for line in fp:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # The last line of an interrupted run may be incomplete
+                continue
+
+
+class ClassificationCheckpoint:
+    """
+    ClassificationCheckpoint An append-only JSON lines log of abstract classifications
+
+    Entries are keyed by a hash of the model, the system prompt, and the normalized abstract, so an abstract is only classified once per model and prompt. Every entry is flushed as soon as it is added so that an interrupted run can be resumed. Without a path, entries are only kept in memory
+    """
+
+    def __init__(self, path: Path | None, model: str, systemPrompt: str) -> None:
+        self.path: Path | None = path
+        self.model: str = model
+        self.systemPrompt: str = systemPrompt
+        self.classifications: dict[str, str] = {}
+        self.fp: TextIOWrapper | None = None
+
+        if self.path is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.path.exists():
+            entry: dict[str, str]
+            for entry in readCheckpoint(path=self.path):
+                self.classifications[entry["key"]] = entry["classification"]
+
+            # Start on a new line after an incomplete last line
+            with open(file=self.path, mode="rb+") as fp:
+                if fp.seek(0, SEEK_END) > 0:
+                    fp.seek(-1, SEEK_END)
+                    if fp.read(1) != b"\n":
+                        fp.write(b"\n")
+
+        self.fp = open(file=self.path, mode="a")
+
+    def __len__(self) -> int:
+        return len(self.classifications)
+
+    def key(self, abstract: str) -> str:
+        """
+        key Return the key of an abstract for this model and system prompt
+
+        :param abstract: An abstract
+        :type abstract: str
+        :return: A hex digest
+        :rtype: str
+        """
+        return sha256(
+            "\0".join(
+                [self.model, self.systemPrompt, normalizeAbstract(abstract=abstract)]
+            ).encode()
+        ).hexdigest()
+
+    def get(self, abstract: str) -> str | None:
+        """
+        get Return the classification of an abstract if it has been classified
+
+        :param abstract: An abstract
+        :type abstract: str
+        :return: The classification, or None
+        :rtype: str | None
+        """
+        return self.classifications.get(self.key(abstract=abstract))
+
+    def put(self, abstract: str, classification: str) -> None:
+        """
+        put Add the classification of an abstract and write it to the log
+
+        :param abstract: An abstract
+        :type abstract: str
+        :param classification: The classification of the abstract
+        :type classification: str
+        """
+        key: str = self.key(abstract=abstract)
+        self.classifications[key] = classification
+
+        if self.fp is None:
+            return
+
+        entry: dict[str, str] = {
+            "key": key,
+            "model": self.model,
+            "abstract": abstract,
+            "classification": classification,
+        }
+        self.fp.write(f"{json.dumps(entry)}\n")
+        self.fp.flush()
+
+    def close(self) -> None:
+        if self.fp is not None:
+            self.fp.close()
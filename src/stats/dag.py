@@ -0,0 +1,466 @@
+import json
+import pickle
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from hashlib import sha256
+from os import replace, stat_result
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, List, Tuple
+
+from progress import Infinite
+
+from src.stats.cache import fingerprintFunction, fingerprintValue
+from src.stats.instrument import (
+    collectWorkerStages,
+    configureWorkerInstrumentation,
+    mergeWorkerStages,
+    recordReusedStage,
+    stage,
+    workerInstrumentation,
+)
+
+
+class Stage:
+    """
+    Stage A computation of a pipeline, the sources, resources, and stages that it reads, and the paths that it writes to
+
+    The result of the function is the artifact of the stage. A result that is a Path, or a list of Paths, is taken to be the files that the stage wrote, and the stage is recomputed if any of them are changed or removed
+    """
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable[..., Any],
+        inputs: dict[str, str],
+        outputs: Tuple[str, ...] = (),
+        ignore: Tuple[str, ...] = ("workers",),
+    ) -> None:
+        """
+        __init__ Declare a stage
+
+        :param name: The name of the stage and of its artifact
+        :type name: str
+        :param function: A picklable function to compute the artifact with
+        :type function: Callable[..., Any]
+        :param inputs: A mapping of the parameters of `function` to the name of a source, resource, or stage
+        :type inputs: dict[str, str]
+        :param outputs: Parameters that are paths to write to, which are keyed on the path rather than on the file, defaults to ()
+        :type outputs: Tuple[str, ...], optional
+        :param ignore: Parameters that do not change the result, defaults to ("workers",)
+        :type ignore: Tuple[str, ...], optional
+        """
+        self.name: str = name
+        self.function: Callable[..., Any] = function
+        self.inputs: dict[str, str] = inputs
+        self.outputs: Tuple[str, ...] = outputs
+        self.ignore: Tuple[str, ...] = ignore
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name})"
+
+
+# Resources are opened once per process, as connections can not be shared
+# between processes
+_RESOURCE_OPENERS: dict[str, Callable[[], Any]] = {}
+_RESOURCES: dict[str, Any] = {}
+
+
+def _openResource(name: str) -> Any:
+    """
+    _openResource Open a resource of this process, or return it if it is already open
+
+    :param name: The name of the resource
+    :type name: str
+    :return: The opened resource
+    :rtype: Any
+    """
+    if name not in _RESOURCES:
+        _RESOURCES[name] = _RESOURCE_OPENERS[name]()
+
+    return _RESOURCES[name]
+
+
+def _initializeWorker(
+    resourceOpeners: dict[str, Callable[[], Any]],
+    traceSettings: dict[str, Any] | None,
+) -> None:
+    """
+    _initializeWorker Drop the resources, progress displays, and trace that a worker process inherited
+
+    Stages that run in parallel would otherwise write over each other's progress displays and trace, so workers keep their trace in memory and return its stages with the artifact
+
+    :param resourceOpeners: A mapping of resource names to functions that open them
+    :type resourceOpeners: dict[str, Callable[[], Any]]
+    :param traceSettings: The settings of the trace of the parent process, or None if it is not traced
+    :type traceSettings: dict[str, Any] | None
+    """
+    global _RESOURCE_OPENERS, _RESOURCES
+    _RESOURCE_OPENERS = resourceOpeners
+    _RESOURCES = {}
+
+    Infinite.file = None
+    configureWorkerInstrumentation(settings=traceSettings)
+
+
+def _artifactPath(artifactDirectory: Path, name: str) -> Path:
+    return Path(artifactDirectory, f"{name}.pickle")
+
+
+def _manifestPath(artifactDirectory: Path, name: str) -> Path:
+    return Path(artifactDirectory, f"{name}.json")
+
+
+def _statFiles(result: Any) -> dict[str, List[int]]:
+    """
+    _statFiles Return the size and modification time of the files that a stage wrote
+
+    :param result: The result of a stage
+    :type result: Any
+    :return: A mapping of filepaths to their size and modification time
+    :rtype: dict[str, List[int]]
+    """
+    filepaths: List[Path] = []
+    if isinstance(result, Path):
+        filepaths = [result]
+    elif isinstance(result, list) and all(isinstance(item, Path) for item in result):
+        filepaths = result
+
+    files: dict[str, List[int]] = {}
+
+    filepath: Path
+    for filepath in filepaths:
+        fileStat: stat_result = filepath.stat()
+        files[str(filepath)] = [fileStat.st_size, fileStat.st_mtime_ns]
+
+    return files
+
+
+def _filesUnchanged(files: dict[str, List[int]]) -> bool:
+    """
+    _filesUnchanged Return whether the files that a stage wrote still exist as they were written
+
+    :param files: A mapping of filepaths to their size and modification time
+    :type files: dict[str, List[int]]
+    :return: True if no file was changed or removed
+    :rtype: bool
+    """
+    filepath: str
+    fileStats: List[int]
+    for filepath, fileStats in files.items():
+        try:
+            fileStat: stat_result = Path(filepath).stat()
+        except FileNotFoundError:
+            return False
+
+        if [fileStat.st_size, fileStat.st_mtime_ns] != fileStats:
+            return False
+
+    return True
+
+
+def _runStage(
+    name: str,
+    function: Callable[..., Any],
+    arguments: dict[str, Any],
+    stageInputs: dict[str, Path],
+    resourceInputs: dict[str, str],
+    artifactPath: Path,
+) -> Tuple[str, dict[str, List[int]], float, List[dict[str, Any]]]:
+    """
+    _runStage Compute the artifact of a stage and save it
+
+    Meant to be ran in a worker process; the artifacts of upstream stages are read from disk rather than sent to the worker, and the stages the worker traced are sent back with the digest
+
+    :param name: The name of the stage
+    :type name: str
+    :param function: The function of the stage
+    :type function: Callable[..., Any]
+    :param arguments: The values of the source parameters
+    :type arguments: dict[str, Any]
+    :param stageInputs: A mapping of parameters to the artifact of an upstream stage
+    :type stageInputs: dict[str, Path]
+    :param resourceInputs: A mapping of parameters to the name of a resource
+    :type resourceInputs: dict[str, str]
+    :param artifactPath: Path to save the artifact to
+    :type artifactPath: Path
+    :return: The digest of the artifact, the files the stage wrote, the seconds it took, and the stages traced by the worker process
+    :rtype: Tuple[str, dict[str, List[int]], float, List[dict[str, Any]]]
+    """
+    startTime: float = perf_counter()
+    kwargs: dict[str, Any] = dict(arguments)
+
+    with stage(name=name):
+        parameter: str
+        inputPath: Path
+        for parameter, inputPath in stageInputs.items():
+            with open(file=inputPath, mode="rb") as fp:
+                kwargs[parameter] = pickle.load(file=fp)
+
+        resourceName: str
+        for parameter, resourceName in resourceInputs.items():
+            kwargs[parameter] = _openResource(name=resourceName)
+
+        result: Any = function(**kwargs)
+        data: bytes = pickle.dumps(obj=result)
+
+        tempPath: Path = artifactPath.with_suffix(suffix=".tmp")
+        tempPath.write_bytes(data=data)
+        replace(src=tempPath, dst=artifactPath)
+
+    return (
+        sha256(data).hexdigest(),
+        _statFiles(result=result),
+        perf_counter() - startTime,
+        collectWorkerStages(),
+    )
+
+
+def _orderStages(
+    stagesByName: dict[str, Stage],
+    targets: List[str],
+    inputNames: set[str],
+) -> List[str]:
+    """
+    _orderStages Return the stages that the targets depend on, dependencies first
+
+    :param stagesByName: A mapping of names to stages
+    :type stagesByName: dict[str, Stage]
+    :param targets: The names of the stages to compute
+    :type targets: List[str]
+    :param inputNames: The names of the sources and resources
+    :type inputNames: set[str]
+    :raises ValueError: If a stage reads an unknown input or the stages form a cycle
+    :return: The names of the stages in dependency order
+    :rtype: List[str]
+    """
+    order: List[str] = []
+    visiting: set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Stage {name} depends on itself")
+
+        visiting.add(name)
+
+        inputName: str
+        for inputName in stagesByName[name].inputs.values():
+            if inputName in stagesByName:
+                visit(name=inputName)
+            elif inputName not in inputNames:
+                raise ValueError(f"Stage {name} reads unknown input {inputName}")
+
+        visiting.remove(name)
+        order.append(name)
+
+    target: str
+    for target in targets:
+        if target not in stagesByName:
+            raise ValueError(f"Unknown stage {target}")
+
+        visit(name=target)
+
+    return order
+
+
+def runStages(
+    stages: List[Stage],
+    targets: List[str],
+    sources: dict[str, Any],
+    resources: dict[str, Callable[[], Any]],
+    artifactDirectory: Path,
+    jobs: int = 1,
+    refresh: bool = False,
+) -> dict[str, Any]:
+    """
+    runStages Compute the artifacts of the targets, reusing the artifacts of every stage whose inputs did not change
+
+    A stage is keyed on its function and the fingerprint of its code, the fingerprint of every source and resource that it reads, and the digest of the artifact of every stage that it reads, so a stage whose upstream stages recomputed the same artifacts is reused. Stages whose upstream stages are resolved run in parallel across `jobs` processes. Every stage is recorded in the trace once `configureInstrumentation` is called, as computed or reused
+
+    :param stages: The stages of the pipeline
+    :type stages: List[Stage]
+    :param targets: The names of the stages to compute
+    :type targets: List[str]
+    :param sources: A mapping of names to picklable values, such as options
+    :type sources: dict[str, Any]
+    :param resources: A mapping of names to picklable functions that open a resource, such as a database connection
+    :type resources: dict[str, Callable[[], Any]]
+    :param artifactDirectory: Directory to save artifacts and their manifests to
+    :type artifactDirectory: Path
+    :param jobs: The number of stages to run at once, defaults to 1
+    :type jobs: int, optional
+    :param refresh: Recompute every stage, even if its inputs did not change, defaults to False
+    :type refresh: bool, optional
+    :return: A mapping of the targets to their artifacts
+    :rtype: dict[str, Any]
+    """
+    global _RESOURCE_OPENERS
+    _RESOURCE_OPENERS = resources
+
+    stagesByName: dict[str, Stage] = {stage.name: stage for stage in stages}
+    pending: List[str] = _orderStages(
+        stagesByName=stagesByName,
+        targets=targets,
+        inputNames=set(sources) | set(resources),
+    )
+
+    artifactDirectory.mkdir(parents=True, exist_ok=True)
+
+    digests: dict[str, str] = {}
+    fingerprints: dict[str, str] = {}
+    running: dict[Future, Tuple[str, str]] = {}
+
+    def fingerprint(inputName: str) -> str:
+        if inputName in digests:
+            return digests[inputName]
+
+        if inputName not in fingerprints:
+            if inputName in resources:
+                value: Any = _openResource(name=inputName)
+            else:
+                value: Any = sources[inputName]
+
+            fingerprints[inputName] = fingerprintValue(value=value)
+
+        return fingerprints[inputName]
+
+    def record(name: str, key: str, outcome: Tuple[str, dict, float, list]) -> None:
+        digest: str
+        files: dict[str, List[int]]
+        seconds: float
+        stageRecords: List[dict[str, Any]]
+        digest, files, seconds, stageRecords = outcome
+
+        mergeWorkerStages(records=stageRecords)
+
+        manifest: dict[str, Any] = {
+            "key": key,
+            "digest": digest,
+            "files": files,
+            "seconds": seconds,
+        }
+        _manifestPath(artifactDirectory=artifactDirectory, name=name).write_text(
+            data=json.dumps(obj=manifest, indent=4)
+        )
+
+        digests[name] = digest
+        print(f"Computed {name} in {seconds:.2f} seconds")
+
+    executor: ProcessPoolExecutor | None = None
+    if jobs > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_initializeWorker,
+            initargs=(resources, workerInstrumentation()),
+        )
+
+    try:
+        while pending or running:
+            ready: List[str] = [
+                name
+                for name in pending
+                if all(
+                    inputName in digests
+                    for inputName in stagesByName[name].inputs.values()
+                    if inputName in stagesByName
+                )
+            ]
+
+            name: str
+            for name in ready:
+                pending.remove(name)
+                stage: Stage = stagesByName[name]
+
+                keyParts: List[str] = [
+                    name,
+                    stage.function.__qualname__,
+                    fingerprintFunction(function=stage.function),
+                ]
+
+                parameter: str
+                inputName: str
+                for parameter, inputName in sorted(stage.inputs.items()):
+                    if parameter in stage.ignore:
+                        continue
+                    elif parameter in stage.outputs:
+                        keyParts.append(f"{parameter}={sources[inputName]!r}")
+                    else:
+                        keyParts.append(f"{parameter}={fingerprint(inputName)}")
+
+                key: str = sha256("\n".join(keyParts).encode()).hexdigest()
+
+                artifactPath: Path = _artifactPath(
+                    artifactDirectory=artifactDirectory,
+                    name=name,
+                )
+                manifestPath: Path = _manifestPath(
+                    artifactDirectory=artifactDirectory,
+                    name=name,
+                )
+
+                if not refresh and artifactPath.exists() and manifestPath.exists():
+                    manifest: dict[str, Any] = json.loads(manifestPath.read_text())
+
+                    if manifest["key"] == key and _filesUnchanged(
+                        files=manifest["files"]
+                    ):
+                        digests[name] = manifest["digest"]
+                        recordReusedStage(name=name, seconds=manifest["seconds"])
+                        print(f"Reusing the artifact of {name}")
+                        continue
+
+                arguments: Tuple[Any, ...] = (
+                    name,
+                    stage.function,
+                    {
+                        parameter: sources[inputName]
+                        for parameter, inputName in stage.inputs.items()
+                        if inputName in sources
+                    },
+                    {
+                        parameter: _artifactPath(
+                            artifactDirectory=artifactDirectory,
+                            name=inputName,
+                        )
+                        for parameter, inputName in stage.inputs.items()
+                        if inputName in stagesByName
+                    },
+                    {
+                        parameter: inputName
+                        for parameter, inputName in stage.inputs.items()
+                        if inputName in resources
+                    },
+                    artifactPath,
+                )
+
+                if executor is None:
+                    record(name=name, key=key, outcome=_runStage(*arguments))
+                else:
+                    running[executor.submit(_runStage, *arguments)] = (name, key)
+
+            if len(running) == 0:
+                continue
+
+            done: set[Future]
+            done, _ = wait(fs=running, return_when=FIRST_COMPLETED)
+
+            future: Future
+            for future in done:
+                name, key = running.pop(future)
+                record(name=name, key=key, outcome=future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    results: dict[str, Any] = {}
+
+    target: str
+    for target in targets:
+        with open(
+            file=_artifactPath(artifactDirectory=artifactDirectory, name=target),
+            mode="rb",
+        ) as fp:
+            results[target] = pickle.load(file=fp)
+
+    return results
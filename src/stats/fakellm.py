@@ -0,0 +1,162 @@
+import json
+import re
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from random import Random
+from threading import Lock
+from time import sleep
+from typing import List
+
+import click
+
+from src.stats import NATURE_SUBJECTS
+
+# A "1. abstract" style line of a packed request
+PACKED_LINE_PATTERN: re.Pattern = re.compile(pattern=r"^(\d+)\. (.*)$")
+
+
+def fakeClassification(abstract: str) -> str:
+    """
+    fakeClassification Deterministically pick one of NATURE_SUBJECTS for an abstract
+
+    :param abstract: An abstract sent to the fake Ollama server
+    :type abstract: str
+    :return: One of NATURE_SUBJECTS
+    :rtype: str
+    """
+    digest: bytes = sha256(abstract.encode()).digest()
+    return NATURE_SUBJECTS[int.from_bytes(digest[0:8], "big") % len(NATURE_SUBJECTS)]
+
+
+def fakeResponse(prompt: str) -> str:
+    """
+    fakeResponse Classify the abstract, or numbered list of abstracts, of a prompt
+
+    :param prompt: The prompt sent to the fake Ollama server, with the user message after the last "Human: "
+    :type prompt: str
+    :return: A classification, or a numbered list of classifications
+    :rtype: str
+    """
+    userMessage: str = prompt.rpartition("Human: ")[2]
+    lines: List[str] = userMessage.splitlines()
+
+    matches: List[re.Match | None] = [PACKED_LINE_PATTERN.match(line) for line in lines]
+    if len(lines) < 2 or None in matches:
+        return fakeClassification(abstract=userMessage)
+
+    return "\n".join(
+        [
+            f"{match.group(1)}. {fakeClassification(abstract=match.group(2))}"
+            for match in matches
+        ]
+    )
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """
+    FakeOllamaHandler Answer Ollama /api/generate requests after a fixed latency
+
+    A fraction of requests fail with HTTP 503 so that retries can be exercised, and a fraction of numbered list responses drop their last line so that the fallback of packed requests can be exercised
+    """
+
+    latency: float = 0.0
+    failureRate: float = 0.0
+    garbleRate: float = 0.0
+    random: Random = Random(42)
+    randomLock: Lock = Lock()
+
+    def do_POST(self) -> None:
+        payload: dict = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        if self.path != "/api/generate":
+            self.send_error(code=404)
+            return
+
+        with self.randomLock:
+            fail: bool = self.random.random() < self.failureRate
+            garble: bool = self.random.random() < self.garbleRate
+
+        sleep(self.latency)
+
+        if fail:
+            self.send_error(code=503)
+            return
+
+        text: str = fakeResponse(prompt=payload["prompt"])
+        if garble and "\n" in text:
+            text = text.rpartition("\n")[0]
+
+        response: dict = {
+            "model": payload.get("model"),
+            "response": text,
+            "done": True,
+        }
+
+        self.send_response(code=200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        self.wfile.write(f"{json.dumps(response)}\n".encode())
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@click.command()
+@click.option(
+    "-p",
+    "--port",
+    "port",
+    required=False,
+    type=click.IntRange(min=1, max=65535),
+    help="Port to listen on",
+    default=11435,
+    show_default=True,
+)
+@click.option(
+    "-l",
+    "--latency",
+    "latency",
+    required=False,
+    type=click.FloatRange(min=0),
+    help="Seconds to wait before answering a request",
+    default=0.5,
+    show_default=True,
+)
+@click.option(
+    "-f",
+    "--failure-rate",
+    "failureRate",
+    required=False,
+    type=click.FloatRange(min=0, max=1),
+    help="Fraction of requests to fail with HTTP 503",
+    default=0.0,
+    show_default=True,
+)
+@click.option(
+    "-g",
+    "--garble-rate",
+    "garbleRate",
+    required=False,
+    type=click.FloatRange(min=0, max=1),
+    help="Fraction of numbered list responses to drop the last line of",
+    default=0.0,
+    show_default=True,
+)
+def main(port: int, latency: float, failureRate: float, garbleRate: float) -> None:
+    """
+    Serve a stand-in for the Ollama API to test ai.py without a model
+    """
+    FakeOllamaHandler.latency = latency
+    FakeOllamaHandler.failureRate = failureRate
+    FakeOllamaHandler.garbleRate = garbleRate
+
+    server: ThreadingHTTPServer = ThreadingHTTPServer(
+        ("127.0.0.1", port),
+        FakeOllamaHandler,
+    )
+    print(f"Serving a fake Ollama API on http://127.0.0.1:{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,652 @@
+import re
+from difflib import SequenceMatcher
+from pathlib import Path
+from sqlite3 import Connection
+from time import perf_counter
+from typing import Callable, Iterable, List, Tuple
+
+import click
+import numpy
+from humanize import intcomma
+from pandas import DataFrame
+from progress.spinner import Spinner
+from pyfs import isFile, resolvePath
+
+from src.stats.parquet import ParquetDB, createDFGeneratorFromParquet
+from src.stats.stats import (
+    OA_BACKENDS,
+    PYARROW_STRING,
+    _createDFGeneratorFromSQL,
+    _standardizeText,
+    connectToDB,
+    connectToOA,
+    pm_IdentifyPapersPublishedInArXiv,
+)
+
+# LaTeX commands such as \emph or \textbf, and runs of anything but letters and digits
+LATEX_COMMAND_PATTERN: re.Pattern = re.compile(pattern=r"\\[a-z]+")
+NON_WORD_PATTERN: re.Pattern = re.compile(pattern=r"[\W_]+")
+
+# A title pair with exactly the similarity threshold must share a band bucket at
+# least this often
+MIN_COLLISION_PROBABILITY: float = 0.95
+
+# Signature estimates of the Jaccard similarity have a standard deviation of about
+# 0.05 with 64 permutations; candidates estimated further than this below the
+# threshold are not verified
+SIGNATURE_ESTIMATE_SLACK: float = 0.15
+
+VERIFIERS: List[str] = ["jaccard", "edit"]
+
+
+def normalizeTitle(title: str) -> str:
+    """
+    normalizeTitle Lower case a title, drop LaTeX commands, and collapse punctuation and whitespace into single spaces
+
+    :param title: A title such as "\\emph{BERT}: Pre-training of Deep Bidirectional Transformers"
+    :type title: str
+    :return: A title such as "bert pre training of deep bidirectional transformers"
+    :rtype: str
+    """
+    title = LATEX_COMMAND_PATTERN.sub(repl=" ", string=title.lower())
+    return NON_WORD_PATTERN.sub(repl=" ", string=title).strip()
+
+
+def shingleSet(title: str, shingleSize: int) -> set[bytes]:
+    """
+    shingleSet Return the set of UTF-8 byte shingles of a normalized title
+
+    :param title: A normalized title
+    :type title: str
+    :param shingleSize: The number of bytes per shingle
+    :type shingleSize: int
+    :return: A set of shingles, which is empty if the title is shorter than a shingle
+    :rtype: set[bytes]
+    """
+    encoded: bytes = title.encode()
+    return {
+        encoded[index : index + shingleSize]
+        for index in range(len(encoded) - shingleSize + 1)
+    }
+
+
+def jaccardSimilarity(a: set[bytes], b: set[bytes]) -> float:
+    """
+    jaccardSimilarity Return the size of the intersection of two sets over the size of their union
+
+    :param a: A set of shingles
+    :type a: set[bytes]
+    :param b: A set of shingles
+    :type b: set[bytes]
+    :return: A similarity between 0 and 1
+    :rtype: float
+    """
+    if len(a) == 0 or len(b) == 0:
+        return 0.0
+
+    return len(a & b) / len(a | b)
+
+
+def editSimilarity(a: str, b: str) -> float:
+    """
+    editSimilarity Return the difflib ratio of two normalized titles, one minus their normalized edit distance
+
+    :param a: A normalized title
+    :type a: str
+    :param b: A normalized title
+    :type b: str
+    :return: A similarity between 0 and 1
+    :rtype: float
+    """
+    return SequenceMatcher(a=a, b=b, autojunk=False).ratio()
+
+
+def _chooseRows(permutations: int, threshold: float) -> int:
+    """
+    _chooseRows Return the most rows per band that still bucket pairs at the similarity threshold together with MIN_COLLISION_PROBABILITY
+
+    More rows per band mean fewer, more similar, candidates to verify
+
+    :param permutations: The number of MinHash permutations
+    :type permutations: int
+    :param threshold: The similarity that matching titles must reach
+    :type threshold: float
+    :return: The number of rows per band
+    :rtype: int
+    """
+    rows: int = 1
+    candidate: int
+    for candidate in range(1, permutations + 1):
+        bands: int = permutations // candidate
+        collisionProbability: float = 1 - (1 - threshold**candidate) ** bands
+        if collisionProbability >= MIN_COLLISION_PROBABILITY:
+            rows = candidate
+
+    return rows
+
+
+class MinHashLSH:
+    """
+    MinHashLSH A banded MinHash index of the byte shingles of normalized titles
+
+    Shingles are packed into integers and the shingles of a whole chunk of titles are hashed per permutation with numpy, so signatures are computed without a Python call per shingle. Titles that share every row of at least one band are candidates. Unless their signatures estimate a similarity far below the threshold, candidates are verified with the exact Jaccard similarity of their shingles or their edit similarity
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        permutations: int = 64,
+        shingleSize: int = 3,
+        verifier: str = "jaccard",
+        seed: int = 42,
+    ) -> None:
+        if not 1 <= shingleSize <= 8:
+            raise ValueError("Shingles must be 1 to 8 bytes to pack into an integer")
+
+        self.threshold: float = threshold
+        self.permutations: int = permutations
+        self.shingleSize: int = shingleSize
+        self.verifier: str = verifier
+
+        self.rows: int = _chooseRows(permutations=permutations, threshold=threshold)
+        self.bands: int = permutations // self.rows
+
+        generator: numpy.random.Generator = numpy.random.default_rng(seed=seed)
+        # Multiply-shift hashing with odd multipliers; uint64 arithmetic wraps
+        self.multipliers: numpy.ndarray = generator.integers(
+            low=0, high=2**64, size=permutations, dtype=numpy.uint64, endpoint=False
+        ) | numpy.uint64(1)
+        self.increments: numpy.ndarray = generator.integers(
+            low=0, high=2**64, size=permutations, dtype=numpy.uint64, endpoint=False
+        )
+        self.bandWeights: numpy.ndarray = generator.integers(
+            low=0, high=2**64, size=permutations, dtype=numpy.uint64, endpoint=False
+        ) | numpy.uint64(1)
+
+        self.titles: List[str] = []
+        self.shingles: List[set[bytes]] = []
+        self.indexSignatures: numpy.ndarray = numpy.empty(
+            shape=(0, permutations), dtype=numpy.uint32
+        )
+        self.bandKeys: List[numpy.ndarray] = []
+        self.buckets: List[dict[int, List[int]]] = []
+
+    def signatures(self, titles: List[str]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        signatures Return the MinHash signatures of normalized titles
+
+        :param titles: A list of normalized titles
+        :type titles: List[str]
+        :return: A tuple of the (titles, permutations) uint32 signatures and a bool array of the titles that have at least one shingle. The signatures of the other titles are meaningless
+        :rtype: Tuple[numpy.ndarray, numpy.ndarray]
+        """
+        encoded: List[bytes] = [title.encode() for title in titles]
+        lengths: numpy.ndarray = numpy.fromiter(
+            (len(title) for title in encoded), dtype=numpy.int64, count=len(encoded)
+        )
+        data: numpy.ndarray = numpy.frombuffer(b"".join(encoded), dtype=numpy.uint8)
+
+        counts: numpy.ndarray = numpy.maximum(lengths - self.shingleSize + 1, 0)
+        shingled: numpy.ndarray = counts > 0
+        signatures: numpy.ndarray = numpy.full(
+            shape=(len(titles), self.permutations),
+            fill_value=numpy.iinfo(numpy.uint32).max,
+            dtype=numpy.uint32,
+        )
+        if not shingled.any():
+            return (signatures, shingled)
+
+        # Position of the first byte of every shingle within `data`
+        titleStarts: numpy.ndarray = numpy.cumsum(lengths) - lengths
+        shingleStarts: numpy.ndarray = numpy.cumsum(counts) - counts
+        positions: numpy.ndarray = (
+            numpy.arange(counts.sum())
+            - numpy.repeat(shingleStarts, counts)
+            + numpy.repeat(titleStarts, counts)
+        )
+
+        packed: numpy.ndarray = numpy.zeros(shape=positions.size, dtype=numpy.uint64)
+        offset: int
+        for offset in range(self.shingleSize):
+            packed = (packed << numpy.uint64(8)) | data[positions + offset]
+
+        # Titles without shingles add no elements, so the remaining segments are contiguous
+        segmentStarts: numpy.ndarray = shingleStarts[shingled]
+
+        permutation: int
+        for permutation in range(self.permutations):
+            hashed: numpy.ndarray = (
+                packed * self.multipliers[permutation] + self.increments[permutation]
+            ) >> numpy.uint64(32)
+            signatures[shingled, permutation] = numpy.minimum.reduceat(
+                hashed, segmentStarts
+            )
+
+        return (signatures, shingled)
+
+    def _bandKeys(self, signatures: numpy.ndarray) -> numpy.ndarray:
+        """
+        _bandKeys Hash the rows of every band of signatures into one uint64 key
+
+        :param signatures: A (titles, permutations) uint32 array of signatures
+        :type signatures: numpy.ndarray
+        :return: A (titles, bands) uint64 array of keys
+        :rtype: numpy.ndarray
+        """
+        weighted: numpy.ndarray = signatures.astype(numpy.uint64) * self.bandWeights
+        return (
+            weighted[:, 0 : self.bands * self.rows]
+            .reshape((signatures.shape[0], self.bands, self.rows))
+            .sum(axis=2, dtype=numpy.uint64)
+        )
+
+    def _similarity(self, title: str, shingles: set[bytes], index: int) -> float:
+        if self.verifier == "edit":
+            return editSimilarity(a=title, b=self.titles[index])
+
+        return jaccardSimilarity(a=shingles, b=self.shingles[index])
+
+    def index(self, titles: List[str]) -> None:
+        """
+        index Add normalized titles to the buckets that other titles are matched against
+
+        :param titles: A list of normalized titles
+        :type titles: List[str]
+        """
+        start: int = len(self.titles)
+        self.titles.extend(titles)
+        self.shingles.extend(
+            [shingleSet(title=title, shingleSize=self.shingleSize) for title in titles]
+        )
+
+        signatures: numpy.ndarray
+        shingled: numpy.ndarray
+        signatures, shingled = self.signatures(titles=titles)
+        keys: numpy.ndarray = self._bandKeys(signatures=signatures)
+        self.indexSignatures = numpy.concatenate([self.indexSignatures, signatures])
+
+        if len(self.buckets) == 0:
+            self.buckets = [{} for _ in range(self.bands)]
+
+        band: int
+        for band in range(self.bands):
+            position: int
+            for position in numpy.nonzero(shingled)[0].tolist():
+                self.buckets[band].setdefault(int(keys[position, band]), []).append(
+                    start + position
+                )
+
+        self.bandKeys = [
+            numpy.fromiter(bucket.keys(), dtype=numpy.uint64, count=len(bucket))
+            for bucket in self.buckets
+        ]
+
+    def match(self, titles: List[str]) -> List[Tuple[int, int, float]]:
+        """
+        match Return the indexed titles that each normalized title is similar to
+
+        :param titles: A list of normalized titles
+        :type titles: List[str]
+        :return: A list of (position in `titles`, index of the indexed title, similarity) tuples of verified matches
+        :rtype: List[Tuple[int, int, float]]
+        """
+        signatures: numpy.ndarray
+        shingled: numpy.ndarray
+        signatures, shingled = self.signatures(titles=titles)
+        keys: numpy.ndarray = self._bandKeys(signatures=signatures)
+
+        candidates: set[Tuple[int, int]] = set()
+        band: int
+        for band in range(self.bands):
+            hits: numpy.ndarray = numpy.nonzero(
+                shingled & numpy.isin(keys[:, band], self.bandKeys[band])
+            )[0]
+
+            position: int
+            for position in hits.tolist():
+                index: int
+                for index in self.buckets[band][int(keys[position, band])]:
+                    candidates.add((position, index))
+
+        pairs: numpy.ndarray = numpy.array(
+            sorted(candidates), dtype=numpy.int64
+        ).reshape((-1, 2))
+
+        # The fraction of equal signature rows estimates the Jaccard similarity, so
+        # candidates far below the threshold are dropped before their exact check
+        if self.verifier == "jaccard" and pairs.shape[0] > 0:
+            estimates: numpy.ndarray = (
+                signatures[pairs[:, 0]] == self.indexSignatures[pairs[:, 1]]
+            ).mean(axis=1)
+            pairs = pairs[estimates >= self.threshold - SIGNATURE_ESTIMATE_SLACK]
+
+        matches: List[Tuple[int, int, float]] = []
+        shingles: dict[int, set[bytes]] = {}
+
+        position: int
+        index: int
+        for position, index in pairs.tolist():
+            if position not in shingles:
+                shingles[position] = shingleSet(
+                    title=titles[position], shingleSize=self.shingleSize
+                )
+
+            similarity: float = self._similarity(
+                title=titles[position], shingles=shingles[position], index=index
+            )
+            if similarity >= self.threshold:
+                matches.append((position, index, similarity))
+
+        return matches
+
+    def bruteForceMatch(self, titles: List[str]) -> List[Tuple[int, int, float]]:
+        """
+        bruteForceMatch Equivalent to match, but every title is verified against every indexed title
+
+        Only useful to measure the recall of the buckets on a sample of titles
+
+        :param titles: A list of normalized titles
+        :type titles: List[str]
+        :return: A list of (position in `titles`, index of the indexed title, similarity) tuples of matches
+        :rtype: List[Tuple[int, int, float]]
+        """
+        matches: List[Tuple[int, int, float]] = []
+
+        position: int
+        title: str
+        for position, title in enumerate(titles):
+            shingles: set[bytes] = shingleSet(title=title, shingleSize=self.shingleSize)
+            if len(shingles) == 0:
+                continue
+
+            index: int
+            for index in range(len(self.titles)):
+                similarity: float = self._similarity(
+                    title=title, shingles=shingles, index=index
+                )
+                if similarity >= self.threshold:
+                    matches.append((position, index, similarity))
+
+        return matches
+
+
+def oapm_MatchArXivPMPapersFuzzily(
+    pmDB: Connection,
+    oaDB: Connection | ParquetDB,
+    lsh: MinHashLSH,
+) -> DataFrame:
+    """
+    oapm_MatchArXivPMPapersFuzzily Match PeaTMOSS arXiv paper titles to OpenAlex works in one pass over the works table
+
+    Each row is either a verified near-duplicate title, an exact standardized title match as used by oapm_CountCitationsOfArXivPMPapers, or both, so that the two matchers can be compared
+
+    :param pmDB: A sqlite3.Connection of a PeaTMOSS database
+    :type pmDB: Connection
+    :param oaDB: A sqlite3.Connection or ParquetDB of a OpenAlex database
+    :type oaDB: Connection | ParquetDB
+    :param lsh: An empty MinHashLSH to index the PeaTMOSS titles in
+    :type lsh: MinHashLSH
+    :return: A pandas.DataFrame of the PeaTMOSS title, OpenAlex ID, OpenAlex title, similarity, and whether it is an exact and/or fuzzy match
+    :rtype: DataFrame
+    """
+    pmDF: DataFrame = pm_IdentifyPapersPublishedInArXiv(pmDB=pmDB)
+    pmTitles: List[str] = list(pmDF["title"].dropna().unique())
+    lsh.index(titles=[normalizeTitle(title=title) for title in pmTitles])
+
+    standardizedPMTitles: dict[str, List[int]] = {}
+    index: int
+    title: str
+    for index, title in enumerate(pmTitles):
+        standardizedPMTitles.setdefault(_standardizeText(text=title), []).append(index)
+
+    oaWorksDFs: Iterable[DataFrame]
+    if isinstance(oaDB, ParquetDB):
+        oaWorksDFs = createDFGeneratorFromParquet(
+            db=oaDB,
+            table="works",
+            columns=["oa_id", "title"],
+        )
+    else:
+        oaWorksDFs = _createDFGeneratorFromSQL(
+            db=oaDB,
+            query="SELECT oa_id, title FROM works",
+            dtype={"title": PYARROW_STRING},
+        )
+
+    rows: dict[Tuple[str, int], dict] = {}
+
+    with Spinner(message="Matching arXiv paper titles to works...") as spinner:
+        df: DataFrame
+        for df in oaWorksDFs:
+            df = df.dropna(subset=["title"])
+            oaIDs: List[str] = df["oa_id"].tolist()
+            oaTitles: List[str] = df["title"].tolist()
+            normalizedTitles: List[str] = [
+                normalizeTitle(title=title) for title in oaTitles
+            ]
+
+            position: int
+            similarity: float
+            for position, index, similarity in lsh.match(titles=normalizedTitles):
+                rows[(oaIDs[position], index)] = {
+                    "pm_title": pmTitles[index],
+                    "oa_id": oaIDs[position],
+                    "oa_title": oaTitles[position],
+                    "similarity": similarity,
+                    "exact": False,
+                    "fuzzy": True,
+                }
+
+            for position, title in enumerate(oaTitles):
+                for index in standardizedPMTitles.get(_standardizeText(text=title), []):
+                    row: dict = rows.setdefault(
+                        (oaIDs[position], index),
+                        {
+                            "pm_title": pmTitles[index],
+                            "oa_id": oaIDs[position],
+                            "oa_title": title,
+                            "similarity": 1.0,
+                            "fuzzy": False,
+                        },
+                    )
+                    row["exact"] = True
+
+            spinner.next()
+
+    return DataFrame(
+        data=list(rows.values()),
+        columns=["pm_title", "oa_id", "oa_title", "similarity", "exact", "fuzzy"],
+    )
+
+
+@click.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database, or to its Parquet directory with --backend parquet",
+    required=True,
+)
+@click.option(
+    "--backend",
+    "backend",
+    type=click.Choice(choices=OA_BACKENDS),
+    help="Read the OpenAlex dataset from SQLite or from the files written by prepare.py parquet",
+    required=False,
+    default="sqlite",
+    show_default=True,
+)
+@click.option(
+    "-t",
+    "--threshold",
+    "threshold",
+    type=click.FloatRange(min=0, max=1, min_open=True),
+    help="Similarity that normalized titles must reach to match",
+    required=False,
+    default=0.8,
+    show_default=True,
+)
+@click.option(
+    "-v",
+    "--verifier",
+    "verifier",
+    type=click.Choice(choices=VERIFIERS),
+    help="Verify candidates by the Jaccard similarity of their shingles or their edit similarity. Buckets are tuned to the Jaccard similarity either way",
+    required=False,
+    default="jaccard",
+    show_default=True,
+)
+@click.option(
+    "-n",
+    "--permutations",
+    "permutations",
+    type=click.IntRange(min=1),
+    help="Number of MinHash permutations per title",
+    required=False,
+    default=64,
+    show_default=True,
+)
+@click.option(
+    "-k",
+    "--shingle-size",
+    "shingleSize",
+    type=click.IntRange(min=1, max=8),
+    help="Number of bytes per shingle",
+    required=False,
+    default=3,
+    show_default=True,
+)
+@click.option(
+    "--brute-force-sample",
+    "bruteForceSample",
+    type=click.IntRange(min=0),
+    help="Number of works to also match by brute force to measure the recall of the buckets",
+    required=False,
+    default=1000,
+    show_default=True,
+)
+@click.option(
+    "-s",
+    "--save",
+    "savePath",
+    type=Path,
+    help="Path to save the matches to as JSON",
+    required=False,
+    default=None,
+)
+def main(
+    pmPath: Path,
+    oaPath: Path,
+    backend: str,
+    threshold: float,
+    verifier: str,
+    permutations: int,
+    shingleSize: int,
+    bruteForceSample: int,
+    savePath: Path | None,
+) -> None:
+    """
+    Match PeaTMOSS arXiv paper titles to near-duplicate OpenAlex work titles and compare them to exact matching
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    assert isFile(path=absPMPath)
+
+    pmDB: Connection = connectToDB(dbPath=absPMPath)
+    oaDB: Connection | ParquetDB = connectToOA(oaPath=absOAPath, backend=backend)
+
+    lsh: MinHashLSH = MinHashLSH(
+        threshold=threshold,
+        permutations=permutations,
+        shingleSize=shingleSize,
+        verifier=verifier,
+    )
+    print(
+        f"{lsh.bands} bands of {lsh.rows} rows",
+        f"(pairs above {(1 / lsh.bands) ** (1 / lsh.rows):.2f} similarity are likely candidates)",
+    )
+
+    startTime: float = perf_counter()
+    df: DataFrame = oapm_MatchArXivPMPapersFuzzily(pmDB=pmDB, oaDB=oaDB, lsh=lsh)
+    matchTime: float = perf_counter() - startTime
+
+    exactCount: int = int(df["exact"].sum())
+    fuzzyCount: int = int(df["fuzzy"].sum())
+    bothCount: int = int((df["exact"] & df["fuzzy"]).sum())
+
+    print(f"Matched {len(lsh.titles)} PeaTMOSS arXiv titles in {matchTime:.2f} seconds")
+    print(f"Exact matches: {intcomma(value=exactCount)}")
+    print(f"Fuzzy matches: {intcomma(value=fuzzyCount)}")
+    print(
+        "Recall of the exact matches:",
+        f"{bothCount / exactCount:.3f}" if exactCount > 0 else "n/a",
+    )
+    print(
+        "Precision against the exact matches:",
+        f"{bothCount / fuzzyCount:.3f}" if fuzzyCount > 0 else "n/a",
+        f"({intcomma(value=fuzzyCount - bothCount)} matches are new)",
+    )
+
+    newMatches: DataFrame = df[df["fuzzy"] & ~df["exact"]].sort_values(by="similarity")
+    if not newMatches.empty:
+        print("Least similar new matches:")
+        print(newMatches[["similarity", "pm_title", "oa_title"]].head(n=10).to_string())
+
+    if bruteForceSample > 0:
+        worksDFs: Iterable[DataFrame]
+        if isinstance(oaDB, ParquetDB):
+            worksDFs = createDFGeneratorFromParquet(
+                db=oaDB, table="works", columns=["title"]
+            )
+        else:
+            worksDFs = _createDFGeneratorFromSQL(
+                db=oaDB, query="SELECT title FROM works"
+            )
+
+        sampleTitles: List[str] = []
+        worksDF: DataFrame
+        for worksDF in worksDFs:
+            sampleTitles.extend(
+                [normalizeTitle(title=title) for title in worksDF["title"].dropna()]
+            )
+            if len(sampleTitles) >= bruteForceSample:
+                break
+        sampleTitles = sampleTitles[0:bruteForceSample]
+
+        function: Callable[[List[str]], List[Tuple[int, int, float]]]
+        results: List[set[Tuple[int, int]]] = []
+        for function in [lsh.match, lsh.bruteForceMatch]:
+            results.append(
+                {
+                    (position, index)
+                    for position, index, _ in function(titles=sampleTitles)
+                }
+            )
+
+        print(
+            f"Recall of the buckets against brute force on {intcomma(value=len(sampleTitles))} works:",
+            (
+                f"{len(results[0] & results[1]) / len(results[1]):.3f}"
+                if len(results[1]) > 0
+                else "n/a (no matches)"
+            ),
+        )
+
+    if savePath is not None:
+        absSavePath: Path = resolvePath(path=savePath)
+        df.to_json(path_or_buf=absSavePath, orient="records", indent=4)
+        print(f"Saved file to: {absSavePath}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+from hashlib import sha256
+from os import stat_result
+from pathlib import Path
+from typing import List
+
+import numpy
+import pandas
+from pandas import DataFrame, Index, Series
+
+from src.stats import sortCitationCounts
+
+OAID_PREFIX: str = "W"
+OAID_PATTERN: str = rf"{OAID_PREFIX}\d+"
+
+GRAPH_ARRAYS: List[str] = [
+    "nodes",
+    "inIndptr",
+    "inIndices",
+    "outIndptr",
+    "outIndices",
+]
+
+# The standardized titles of the PeaTMOSS arXiv papers and the works they match,
+# written next to the arrays by `prepare.py graph --peatmoss`
+GRAPH_TITLES: str = "titles.parquet"
+
+
+def encodeOAIDs(oaIDs: Series) -> numpy.ndarray:
+    """
+    encodeOAIDs Convert OpenAlex IDs to the int64 number that follows their W prefix
+
+    :param oaIDs: A string[pyarrow] pandas.Series of OpenAlex IDs without NULLs
+    :type oaIDs: Series
+    :raises ValueError: If an OpenAlex ID is not a W prefixed number
+    :return: An int64 numpy array of the encoded OpenAlex IDs
+    :rtype: numpy.ndarray
+    """
+    if not oaIDs.str.fullmatch(pat=OAID_PATTERN).all():
+        raise ValueError(f"OpenAlex IDs must match {OAID_PATTERN}")
+
+    return oaIDs.str.slice(start=len(OAID_PREFIX)).astype(dtype="int64").to_numpy()
+
+
+def decodeOAIDs(encodedIDs: numpy.ndarray) -> List[str]:
+    """
+    decodeOAIDs Convert encoded OpenAlex IDs back to strings
+
+    :param encodedIDs: An int64 numpy array of encoded OpenAlex IDs
+    :type encodedIDs: numpy.ndarray
+    :return: A list of OpenAlex IDs
+    :rtype: List[str]
+    """
+    return [f"{OAID_PREFIX}{encodedID}" for encodedID in encodedIDs.tolist()]
+
+
+def _compressEdges(
+    keys: numpy.ndarray,
+    values: numpy.ndarray,
+    nodeCount: int,
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    _compressEdges Group edge values by their key into compressed sparse row arrays
+
+    The stable sort keeps the edges of a node in the order that they were read from the cites table
+
+    :param keys: An int32 numpy array of the node each edge is grouped by
+    :type keys: numpy.ndarray
+    :param values: An int32 numpy array of the node at the other end of each edge
+    :type values: numpy.ndarray
+    :param nodeCount: The number of nodes in the graph
+    :type nodeCount: int
+    :return: A tuple of the int64 indptr and int32 indices arrays
+    :rtype: tuple[numpy.ndarray, numpy.ndarray]
+    """
+    indptr: numpy.ndarray = numpy.zeros(shape=nodeCount + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(keys, minlength=nodeCount), out=indptr[1:])
+
+    indices: numpy.ndarray = values[numpy.argsort(keys, kind="stable")]
+    return (indptr, indices)
+
+
+class CitationGraph:
+    """
+    CitationGraph The cites table of an OpenAlex database as integer compressed sparse arrays
+
+    OpenAlex IDs are stored once as sorted int64 numbers, and every edge refers to a node by its int32 position in that array. The in-edges (works that cite a node) and out-edges (works that a node cites) are stored as CSC and CSR arrays respectively. The works that PeaTMOSS arXiv paper titles match can be stored with the graph, so that they are not matched against the works table again
+    """
+
+    def __init__(
+        self,
+        nodes: numpy.ndarray,
+        inIndptr: numpy.ndarray,
+        inIndices: numpy.ndarray,
+        outIndptr: numpy.ndarray,
+        outIndices: numpy.ndarray,
+        directory: Path | None = None,
+        titles: DataFrame | None = None,
+    ) -> None:
+        self.nodes: numpy.ndarray = nodes
+        self.inIndptr: numpy.ndarray = inIndptr
+        self.inIndices: numpy.ndarray = inIndices
+        self.outIndptr: numpy.ndarray = outIndptr
+        self.outIndices: numpy.ndarray = outIndices
+        self.directory: Path | None = directory
+        self.titles: DataFrame | None = titles
+
+    def __repr__(self) -> str:
+        return f"CitationGraph({self.directory})"
+
+    @property
+    def nodeCount(self) -> int:
+        return self.nodes.shape[0]
+
+    @property
+    def edgeCount(self) -> int:
+        return self.inIndices.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return sum([getattr(self, name).nbytes for name in GRAPH_ARRAYS])
+
+    @classmethod
+    def fromEdges(
+        cls,
+        works: numpy.ndarray,
+        references: numpy.ndarray,
+    ) -> "CitationGraph":
+        """
+        fromEdges Build a graph from the encoded work and reference of every citation
+
+        :param works: An int64 numpy array of encoded OpenAlex IDs of citing works
+        :type works: numpy.ndarray
+        :param references: An int64 numpy array of encoded OpenAlex IDs of cited works
+        :type references: numpy.ndarray
+        :return: A CitationGraph object
+        :rtype: CitationGraph
+        """
+        nodes: numpy.ndarray = numpy.union1d(
+            numpy.unique(works),
+            numpy.unique(references),
+        )
+        assert nodes.shape[0] < numpy.iinfo(numpy.int32).max
+
+        sources: numpy.ndarray = numpy.searchsorted(nodes, works).astype(
+            dtype=numpy.int32
+        )
+        targets: numpy.ndarray = numpy.searchsorted(nodes, references).astype(
+            dtype=numpy.int32
+        )
+
+        inIndptr: numpy.ndarray
+        inIndices: numpy.ndarray
+        inIndptr, inIndices = _compressEdges(
+            keys=targets,
+            values=sources,
+            nodeCount=nodes.shape[0],
+        )
+
+        outIndptr: numpy.ndarray
+        outIndices: numpy.ndarray
+        outIndptr, outIndices = _compressEdges(
+            keys=sources,
+            values=targets,
+            nodeCount=nodes.shape[0],
+        )
+
+        return cls(
+            nodes=nodes,
+            inIndptr=inIndptr,
+            inIndices=inIndices,
+            outIndptr=outIndptr,
+            outIndices=outIndices,
+        )
+
+    @classmethod
+    def load(cls, directory: Path) -> "CitationGraph":
+        """
+        load Memory-map a graph written by `save`
+
+        Only the pages of the arrays that are read are loaded into memory
+
+        :param directory: The directory the graph was saved to
+        :type directory: Path
+        :return: A CitationGraph object
+        :rtype: CitationGraph
+        """
+        arrays: dict[str, numpy.ndarray] = {
+            name: numpy.load(file=Path(directory, f"{name}.npy"), mmap_mode="r")
+            for name in GRAPH_ARRAYS
+        }
+
+        titlesPath: Path = Path(directory, GRAPH_TITLES)
+        titles: DataFrame | None = None
+        if titlesPath.exists():
+            titles = pandas.read_parquet(path=titlesPath)
+
+        return cls(**arrays, directory=directory, titles=titles)
+
+    def save(self, directory: Path) -> None:
+        """
+        save Write every array of the graph to a .npy file, and the title matches to GRAPH_TITLES
+
+        Title matches left over from a previous graph are removed
+
+        :param directory: The directory to save the graph to
+        :type directory: Path
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+
+        name: str
+        for name in GRAPH_ARRAYS:
+            numpy.save(file=Path(directory, f"{name}.npy"), arr=getattr(self, name))
+
+        titlesPath: Path = Path(directory, GRAPH_TITLES)
+        if self.titles is not None:
+            self.titles.to_parquet(path=titlesPath, index=False)
+        else:
+            titlesPath.unlink(missing_ok=True)
+
+        self.directory = directory
+
+    def fingerprint(self) -> str:
+        """
+        fingerprint Hash the path, size, and modification time of every array file and of the title matches, or the arrays and title matches of an unsaved graph
+
+        :return: A hex digest of the graph fingerprint
+        :rtype: str
+        """
+        fingerprint = sha256()
+
+        name: str
+        for name in GRAPH_ARRAYS:
+            if self.directory is None:
+                fingerprint.update(getattr(self, name).tobytes())
+                continue
+
+            filepath: Path = Path(self.directory, f"{name}.npy")
+            fileStat: stat_result = filepath.stat()
+            fingerprint.update(
+                f"{filepath}:{fileStat.st_size}:{fileStat.st_mtime_ns}\n".encode()
+            )
+
+        if self.titles is not None and self.directory is None:
+            fingerprint.update(
+                pandas.util.hash_pandas_object(obj=self.titles, index=False).to_numpy()
+            )
+        elif self.titles is not None:
+            filepath: Path = Path(self.directory, GRAPH_TITLES)
+            fileStat: stat_result = filepath.stat()
+            fingerprint.update(
+                f"{filepath}:{fileStat.st_size}:{fileStat.st_mtime_ns}\n".encode()
+            )
+
+        return fingerprint.hexdigest()
+
+    def lookup(self, oaIDs: List[str]) -> numpy.ndarray:
+        """
+        lookup Return the node of every OpenAlex ID
+
+        :param oaIDs: A list of OpenAlex IDs
+        :type oaIDs: List[str]
+        :return: An int64 numpy array of nodes, where -1 marks OpenAlex IDs that are not in the graph
+        :rtype: numpy.ndarray
+        """
+        nodes: numpy.ndarray = numpy.full(shape=len(oaIDs), fill_value=-1)
+
+        ids: Series = Series(data=oaIDs, dtype="string[pyarrow]")
+        valid: numpy.ndarray = ids.str.fullmatch(pat=OAID_PATTERN).to_numpy(
+            dtype=bool,
+            na_value=False,
+        )
+        if self.nodeCount == 0 or not valid.any():
+            return nodes
+
+        encodedIDs: numpy.ndarray = encodeOAIDs(oaIDs=ids[valid])
+        positions: numpy.ndarray = numpy.searchsorted(self.nodes, encodedIDs)
+        positions[positions == self.nodeCount] = 0
+
+        nodes[valid] = numpy.where(
+            self.nodes[positions] == encodedIDs,
+            positions,
+            -1,
+        )
+        return nodes
+
+    def inDegree(self, nodes: numpy.ndarray) -> numpy.ndarray:
+        """
+        inDegree Return the number of citations of every node
+
+        :param nodes: An integer numpy array of nodes
+        :type nodes: numpy.ndarray
+        :return: An int64 numpy array of the in-degree of each node
+        :rtype: numpy.ndarray
+        """
+        return self.inIndptr[nodes + 1] - self.inIndptr[nodes]
+
+    def _gatherCiters(self, nodes: numpy.ndarray) -> numpy.ndarray:
+        """
+        _gatherCiters Return the in-edges of every node as one array without a Python loop per node
+
+        :param nodes: An integer numpy array of nodes
+        :type nodes: numpy.ndarray
+        :return: An int32 numpy array of the nodes that cite `nodes`, with duplicates
+        :rtype: numpy.ndarray
+        """
+        starts: numpy.ndarray = self.inIndptr[nodes]
+        lengths: numpy.ndarray = self.inIndptr[nodes + 1] - starts
+
+        # Offset every position of a node's range by where that range starts
+        positions: numpy.ndarray = numpy.arange(lengths.sum()) + numpy.repeat(
+            starts - (numpy.cumsum(lengths) - lengths),
+            lengths,
+        )
+        return self.inIndices[positions]
+
+    def expandCitations(self, oaID: str, hops: int) -> List[numpy.ndarray]:
+        """
+        expandCitations Breadth-first search the works that transitively cite a work
+
+        :param oaID: An OpenAlex ID
+        :type oaID: str
+        :param hops: The number of citation hops to follow
+        :type hops: int
+        :return: A list of `hops` sorted numpy arrays of the nodes first reached at each hop, which are empty if `oaID` is not in the graph
+        :rtype: List[numpy.ndarray]
+        """
+        levels: List[numpy.ndarray] = []
+
+        node: int = int(self.lookup(oaIDs=[oaID])[0])
+        frontier: numpy.ndarray = numpy.array(
+            [node] if node != -1 else [],
+            dtype=numpy.int64,
+        )
+
+        visited: numpy.ndarray = numpy.zeros(shape=self.nodeCount, dtype=bool)
+        visited[frontier] = True
+
+        for _ in range(hops):
+            citers: numpy.ndarray = numpy.unique(self._gatherCiters(nodes=frontier))
+            citers = citers[~visited[citers]]
+            visited[citers] = True
+
+            levels.append(citers)
+            frontier = citers
+
+        return levels
+
+    def citedBy(self, oaID: str) -> List[str]:
+        """
+        citedBy Return the OpenAlex IDs of the works that cite a work, in cites table order
+
+        :param oaID: An OpenAlex ID
+        :type oaID: str
+        :return: A list of OpenAlex IDs, which is empty if `oaID` is not in the graph
+        :rtype: List[str]
+        """
+        node: int = int(self.lookup(oaIDs=[oaID])[0])
+        if node == -1:
+            return []
+
+        citers: numpy.ndarray = self.inIndices[
+            self.inIndptr[node] : self.inIndptr[node + 1]
+        ]
+        return decodeOAIDs(encodedIDs=self.nodes[citers])
+
+    def matchTitles(self, titles: set[str]) -> List[str] | None:
+        """
+        matchTitles Return the OpenAlex IDs of the works whose standardized title is in `titles`, from the title matches stored with the graph
+
+        :param titles: Standardized titles of PeaTMOSS arXiv papers
+        :type titles: set[str]
+        :return: A list of OpenAlex IDs, or None if no titles were matched when the graph was built or if one of `titles` was not
+        :rtype: List[str] | None
+        """
+        if self.titles is None or not titles.issubset(self.titles["title"]):
+            return None
+
+        return (
+            self.titles["oa_id"][self.titles["title"].isin(values=titles)]
+            .dropna()
+            .tolist()
+        )
+
+    def countCitations(self, oaIDs: List[str]) -> Series:
+        """
+        countCitations Count the citations of OpenAlex works
+
+        Equivalent to counting the cites rows per reference; works without citations are left out, and the counts are ordered by sortCitationCounts
+
+        :param oaIDs: A list of OpenAlex IDs
+        :type oaIDs: List[str]
+        :return: A Series of the number of citations per OpenAlex ID in descending order
+        :rtype: Series
+        """
+        uniqueIDs: List[str] = list(set(oaIDs))
+        nodes: numpy.ndarray = self.lookup(oaIDs=uniqueIDs)
+        found: numpy.ndarray = nodes != -1
+
+        counts: Series = Series(
+            data=self.inDegree(nodes=nodes[found]),
+            index=Index(
+                data=[oaID for oaID, hit in zip(uniqueIDs, found) if hit],
+                dtype=object,
+                name="reference",
+            ),
+            name="count",
+        )
+        return sortCitationCounts(counts=counts[counts > 0])
@@ -0,0 +1,543 @@
+import cProfile
+import json
+import resource
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from os import getpid, replace
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Iterator, List
+
+from humanize import intcomma
+from progress.bar import Bar
+from progress.spinner import Spinner
+
+PROFILERS: List[str] = ["none", "cprofile", "pyinstrument"]
+
+# Writing "5" to clear_refs resets the VmHWM (peak RSS) line of /proc/self/status
+_CLEAR_REFS_PATH: Path = Path("/proc/self/clear_refs")
+_STATUS_PATH: Path = Path("/proc/self/status")
+
+# ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+_RU_MAXRSS_UNIT: int = 1 if sys.platform == "darwin" else 1024
+
+
+def _readPeakRSS() -> int:
+    """
+    _readPeakRSS Return the peak resident set size of this process in bytes since it was last reset
+
+    :return: The peak resident set size in bytes
+    :rtype: int
+    """
+    try:
+        with open(file=_STATUS_PATH, mode="r") as fp:
+            line: str
+            for line in fp:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RU_MAXRSS_UNIT
+
+
+def _resetPeakRSS() -> bool:
+    """
+    _resetPeakRSS Reset the peak resident set size of this process
+
+    :return: True if the peak was reset, False if the platform does not allow it
+    :rtype: bool
+    """
+    try:
+        with open(file=_CLEAR_REFS_PATH, mode="w") as fp:
+            fp.write("5")
+    except OSError:
+        return False
+
+    return True
+
+
+def _readWorkerPeakRSS() -> int:
+    """
+    _readWorkerPeakRSS Return the largest peak resident set size of the finished worker processes in bytes
+
+    :return: The peak resident set size in bytes
+    :rtype: int
+    """
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * _RU_MAXRSS_UNIT
+
+
+class PipelineTrace:
+    """
+    PipelineTrace Record the wall time, rows processed, and peak RSS of every stage and chunk loop of a run to JSON
+
+    The trace is rewritten after every stage so that an interrupted run keeps the stages it finished. Peak RSS is per stage where /proc/self/clear_refs is writable, and for the whole process up to the end of the stage elsewhere. Worker processes keep their trace in memory and hand their stages to the trace of their parent
+    """
+
+    def __init__(
+        self,
+        tracePath: Path | None,
+        profiler: str = "none",
+        profileDirectory: Path | None = None,
+        startTime: float | None = None,
+        started: str | None = None,
+    ) -> None:
+        self.tracePath: Path | None = tracePath
+        self.profiler: str = profiler
+        self.profileDirectory: Path | None = profileDirectory
+
+        # perf_counter is a system-wide clock, so worker processes that start
+        # from the clock of their parent record times on the same timeline
+        self.startTime: float = perf_counter() if startTime is None else startTime
+        self.started: str = (
+            datetime.now(tz=timezone.utc).isoformat() if started is None else started
+        )
+        self.stages: List[dict[str, Any]] = []
+        self.openStages: List[dict[str, Any]] = []
+        self.stageScopedRSS: bool = _resetPeakRSS()
+
+        if self.profiler != "none":
+            self.profileDirectory.mkdir(parents=True, exist_ok=True)
+
+    def _foldPeakRSS(self) -> None:
+        # Nested stages share the process peak, so it is credited to every open
+        # stage before it is reset or read
+        peakRSS: int = _readPeakRSS()
+
+        record: dict[str, Any]
+        for record in self.openStages:
+            record["peakRSSBytes"] = max(record["peakRSSBytes"], peakRSS)
+
+    def beginStage(self, name: str) -> dict[str, Any]:
+        """
+        beginStage Start timing a stage, nested within the innermost open stage
+
+        :param name: The name of the stage
+        :type name: str
+        :return: The record of the stage
+        :rtype: dict[str, Any]
+        """
+        self._foldPeakRSS()
+        if self.stageScopedRSS:
+            _resetPeakRSS()
+
+        record: dict[str, Any] = {
+            "name": name,
+            "parent": self.openStages[-1]["name"] if self.openStages else None,
+            "status": "computed",
+            "pid": getpid(),
+            "startSeconds": perf_counter() - self.startTime,
+            "wallSeconds": None,
+            "rows": 0,
+            "rowsPerSecond": None,
+            "peakRSSBytes": 0,
+            "workerPeakRSSBytes": None,
+            "loops": [],
+            "profile": None,
+            "_workerPeakRSS": _readWorkerPeakRSS(),
+            "_profiler": None,
+        }
+
+        # Profilers cannot be nested, so only the outermost stages are profiled
+        if self.profiler != "none" and not self.openStages:
+            record["_profiler"] = self._startProfiler()
+
+        self.openStages.append(record)
+        return record
+
+    def endStage(self, record: dict[str, Any]) -> None:
+        """
+        endStage Stop timing a stage and rewrite the trace
+
+        :param record: The record returned by `beginStage`
+        :type record: dict[str, Any]
+        """
+        self._foldPeakRSS()
+        self.openStages.remove(record)
+
+        if record["_profiler"] is not None:
+            record["profile"] = str(
+                self._stopProfiler(
+                    profiler=record["_profiler"],
+                    name=f"{len(self.stages):02d}-{record['name']}",
+                )
+            )
+
+        record["wallSeconds"] = perf_counter() - self.startTime - record["startSeconds"]
+        if record["rows"] > 0 and record["wallSeconds"] > 0:
+            record["rowsPerSecond"] = record["rows"] / record["wallSeconds"]
+
+        workerPeakRSS: int = _readWorkerPeakRSS()
+        if workerPeakRSS > record["_workerPeakRSS"]:
+            record["workerPeakRSSBytes"] = workerPeakRSS
+
+        self.stages.append(
+            {key: value for key, value in record.items() if not key.startswith("_")}
+        )
+        self.write()
+
+    def addStages(self, records: List[dict[str, Any]]) -> None:
+        """
+        addStages Record the finished stages of a worker process and rewrite the trace
+
+        :param records: The stages that the worker process recorded
+        :type records: List[dict[str, Any]]
+        """
+        self.stages.extend(records)
+        self.write()
+
+    def addReusedStage(self, name: str, seconds: float) -> None:
+        """
+        addReusedStage Record a stage whose saved artifact was reused rather than computed, and rewrite the trace
+
+        :param name: The name of the stage
+        :type name: str
+        :param seconds: The seconds the stage took when its artifact was computed
+        :type seconds: float
+        """
+        self.stages.append(
+            {
+                "name": name,
+                "parent": self.openStages[-1]["name"] if self.openStages else None,
+                "status": "reused",
+                "pid": getpid(),
+                "startSeconds": perf_counter() - self.startTime,
+                "wallSeconds": 0.0,
+                "computedSeconds": seconds,
+                "rows": 0,
+                "rowsPerSecond": None,
+                "peakRSSBytes": None,
+                "workerPeakRSSBytes": None,
+                "loops": [],
+                "profile": None,
+            }
+        )
+        self.write()
+
+    def addRows(self, rows: int) -> None:
+        """
+        addRows Credit processed rows to every open stage
+
+        :param rows: The number of rows processed
+        :type rows: int
+        """
+        record: dict[str, Any]
+        for record in self.openStages:
+            record["rows"] += rows
+
+    def addLoop(self, loop: dict[str, Any]) -> None:
+        """
+        addLoop Record a finished chunk loop within the innermost open stage
+
+        :param loop: The message, rows, total rows, and wall time of the loop
+        :type loop: dict[str, Any]
+        """
+        if self.openStages:
+            self.openStages[-1]["loops"].append(loop)
+
+    def _startProfiler(self) -> Any:
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler: Any = Profiler()
+            profiler.start()
+            return profiler
+
+        profiler: cProfile.Profile = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stopProfiler(self, profiler: Any, name: str) -> Path:
+        if self.profiler == "pyinstrument":
+            profiler.stop()
+            profilePath: Path = Path(self.profileDirectory, f"{name}.html")
+            profilePath.write_text(data=profiler.output_html())
+            return profilePath
+
+        profiler.disable()
+        profilePath: Path = Path(self.profileDirectory, f"{name}.prof")
+        profiler.dump_stats(file=profilePath)
+        return profilePath
+
+    def write(self) -> None:
+        """
+        write Atomically write the trace to `tracePath`, unless the trace is kept in memory
+        """
+        if self.tracePath is None:
+            return
+
+        self._foldPeakRSS()
+
+        trace: dict[str, Any] = {
+            "command": sys.argv,
+            "started": self.started,
+            "wallSeconds": perf_counter() - self.startTime,
+            "peakRSSBytes": _readPeakRSS(),
+            "peakRSSScope": "stage" if self.stageScopedRSS else "process",
+            "profiler": self.profiler,
+            "stages": self.stages,
+        }
+
+        # The peak was reset by the stages, so the largest stage peak is the
+        # process peak. Stages of worker processes report their own peak
+        if self.stageScopedRSS and self.stages:
+            trace["peakRSSBytes"] = max(
+                [trace["peakRSSBytes"]]
+                + [
+                    record["peakRSSBytes"]
+                    for record in self.stages
+                    if record["status"] == "computed" and record["pid"] == getpid()
+                ]
+            )
+
+        tempPath: Path = self.tracePath.with_suffix(suffix=".tmp")
+        with open(file=tempPath, mode="w") as fp:
+            json.dump(obj=trace, fp=fp, indent=4)
+
+        replace(src=tempPath, dst=self.tracePath)
+
+
+_TRACE: PipelineTrace | None = None
+
+
+def configureInstrumentation(
+    tracePath: Path,
+    profiler: str = "none",
+    profileDirectory: Path | None = None,
+) -> None:
+    """
+    configureInstrumentation Enable tracing of the stats functions decorated with `instrumented`
+
+    :param tracePath: Path to write the JSON trace to
+    :type tracePath: Path
+    :param profiler: One of PROFILERS to capture a profile of every stage with, defaults to "none"
+    :type profiler: str, optional
+    :param profileDirectory: Directory to save the profiles to, required unless `profiler` is "none", defaults to None
+    :type profileDirectory: Path | None, optional
+    """
+    global _TRACE
+    _TRACE = PipelineTrace(
+        tracePath=tracePath,
+        profiler=profiler,
+        profileDirectory=profileDirectory,
+    )
+
+
+def resetInstrumentation() -> None:
+    """
+    resetInstrumentation Stop tracing, such as in worker processes that inherited the trace of their parent
+    """
+    global _TRACE
+    _TRACE = None
+
+
+def workerInstrumentation() -> dict[str, Any] | None:
+    """
+    workerInstrumentation Return the settings that worker processes trace their stages with
+
+    :return: The keyword arguments of `configureWorkerInstrumentation`, or None if tracing is disabled
+    :rtype: dict[str, Any] | None
+    """
+    if _TRACE is None:
+        return None
+
+    return {
+        "profiler": _TRACE.profiler,
+        "profileDirectory": _TRACE.profileDirectory,
+        "startTime": _TRACE.startTime,
+        "started": _TRACE.started,
+    }
+
+
+def configureWorkerInstrumentation(settings: dict[str, Any] | None) -> None:
+    """
+    configureWorkerInstrumentation Replace the trace that a worker process inherited with one kept in memory, whose stages are collected with `collectWorkerStages`
+
+    :param settings: The settings returned by `workerInstrumentation` in the parent process, or None to stop tracing
+    :type settings: dict[str, Any] | None
+    """
+    global _TRACE
+    _TRACE = None
+
+    if settings is not None:
+        _TRACE = PipelineTrace(tracePath=None, **settings)
+
+
+def collectWorkerStages() -> List[dict[str, Any]]:
+    """
+    collectWorkerStages Return and forget the finished stages of a trace kept in memory, to be sent to the parent process
+
+    :return: The finished stages, or an empty list if the trace is written to a file or tracing is disabled
+    :rtype: List[dict[str, Any]]
+    """
+    if _TRACE is None or _TRACE.tracePath is not None:
+        return []
+
+    records: List[dict[str, Any]] = _TRACE.stages
+    _TRACE.stages = []
+    return records
+
+
+def mergeWorkerStages(records: List[dict[str, Any]]) -> None:
+    """
+    mergeWorkerStages Record the stages that a worker process collected with `collectWorkerStages`
+
+    :param records: The finished stages of the worker process
+    :type records: List[dict[str, Any]]
+    """
+    if _TRACE is not None and len(records) > 0:
+        _TRACE.addStages(records=records)
+
+
+def recordReusedStage(name: str, seconds: float) -> None:
+    """
+    recordReusedStage Record a stage whose saved artifact was reused once `configureInstrumentation` is called
+
+    :param name: The name of the stage
+    :type name: str
+    :param seconds: The seconds the stage took when its artifact was computed
+    :type seconds: float
+    """
+    if _TRACE is not None:
+        _TRACE.addReusedStage(name=name, seconds=seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    stage Record a block of code as a stage of the trace once `configureInstrumentation` is called
+
+    :param name: The name of the stage
+    :type name: str
+    """
+    if _TRACE is None:
+        yield
+        return
+
+    record: dict[str, Any] = _TRACE.beginStage(name=name)
+    try:
+        yield
+    finally:
+        _TRACE.endStage(record=record)
+
+
+def instrumented() -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    instrumented Record every call of a stats function as a stage of the trace once `configureInstrumentation` is called
+
+    Apply above `cached` so that cache hits are recorded too
+
+    :return: A decorator
+    :rtype: Callable[[Callable[..., Any]], Callable[..., Any]]
+    """
+
+    def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(function)
+        def wrapper(*args, **kwargs) -> Any:
+            with stage(name=function.__name__):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class _RowCounter:
+    """
+    _RowCounter Count the rows of a chunk loop and credit them to the open stages of the trace
+
+    Mixed into progress classes, whose `next` is called with the number of rows of every chunk
+    """
+
+    rows: int = 0
+    totalRows: int | None = None
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._loopStart: float = perf_counter()
+        super().__init__(*args, **kwargs)
+
+    @property
+    def rowsText(self) -> str:
+        if self.totalRows is None:
+            return intcomma(value=self.rows)
+
+        return f"{intcomma(value=self.rows)}/{intcomma(value=self.totalRows)}"
+
+    @property
+    def rate(self) -> str:
+        seconds: float = perf_counter() - self._loopStart
+        if seconds == 0:
+            return "0"
+
+        return intcomma(value=int(self.rows / seconds))
+
+    def next(self, n: int = 1, position: int | None = None) -> None:
+        """
+        next Count `n` rows and advance the display
+
+        :param n: The number of rows of the chunk, defaults to 1
+        :type n: int, optional
+        :param position: The position to move the display to instead of advancing it by `n`, defaults to None
+        :type position: int | None, optional
+        """
+        self.rows += n
+        if _TRACE is not None:
+            _TRACE.addRows(rows=n)
+
+        super().next(n if position is None else position - self.index)
+
+    def finish(self) -> None:
+        super().finish()
+
+        if _TRACE is not None:
+            seconds: float = perf_counter() - self._loopStart
+            _TRACE.addLoop(
+                loop={
+                    "message": self.message.strip(),
+                    "rows": self.rows,
+                    "totalRows": self.totalRows,
+                    "wallSeconds": seconds,
+                    "rowsPerSecond": self.rows / seconds if seconds > 0 else None,
+                }
+            )
+
+
+class RowBar(_RowCounter, Bar):
+    """
+    RowBar A progress bar of the rows of a chunk loop with its rate and ETA
+    """
+
+    suffix: str = "%(rowsText)s rows, %(rate)s rows/s, ETA %(eta_td)s"
+
+
+class RowSpinner(_RowCounter, Spinner):
+    """
+    RowSpinner A spinner of the rows of a chunk loop with its rate, for loops of an unknown number of rows
+    """
+
+    def update(self) -> None:
+        self.writeln(
+            line=f"{self.message}{self.rowsText} rows, {self.rate} rows/s "
+            + self.phases[self.index % len(self.phases)]
+        )
+
+
+def trackRows(message: str, totalRows: int | None = None) -> RowBar | RowSpinner:
+    """
+    trackRows Return a progress display for a chunk loop of `totalRows` rows
+
+    `totalRows` is an estimate such as MAX(rowid), so the ETA is an upper bound for queries that drop rows
+
+    :param message: The progress message
+    :type message: str
+    :param totalRows: The number of rows the loop is expected to read, or None if unknown, defaults to None
+    :type totalRows: int | None, optional
+    :return: A RowBar if `totalRows` is known, else a RowSpinner
+    :rtype: RowBar | RowSpinner
+    """
+    if totalRows is None or totalRows <= 0:
+        return RowSpinner(message=f"{message} ")
+
+    return RowBar(message, max=totalRows, totalRows=totalRows)
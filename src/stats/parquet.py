@@ -0,0 +1,116 @@
+from hashlib import sha256
+from os import stat_result
+from pathlib import Path
+from typing import Iterable, List
+
+import pandas as pd
+import pyarrow
+import pyarrow.dataset as ds
+from pandas import DataFrame
+
+OA_PARQUET_SCHEMAS: dict[str, pyarrow.Schema] = {
+    "works": pyarrow.schema(
+        [
+            ("oa_id", pyarrow.string()),
+            ("doi", pyarrow.string()),
+            ("title", pyarrow.string()),
+        ]
+    ),
+    "cites": pyarrow.schema(
+        [
+            ("id", pyarrow.int64()),
+            ("work", pyarrow.string()),
+            ("reference", pyarrow.string()),
+        ]
+    ),
+}
+
+
+class ParquetDB:
+    """
+    ParquetDB An OpenAlex database exported to Parquet files by `prepare.py parquet`
+
+    Every table is a directory of Parquet files named after the table
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory: Path = directory
+
+    def __repr__(self) -> str:
+        return f"ParquetDB({self.directory})"
+
+    def dataset(self, table: str) -> ds.Dataset:
+        """
+        dataset Return a pyarrow Dataset of a table
+
+        :param table: The name of the table
+        :type table: str
+        :return: A pyarrow Dataset over the Parquet files of the table
+        :rtype: ds.Dataset
+        """
+        return ds.dataset(
+            source=Path(self.directory, table),
+            schema=OA_PARQUET_SCHEMAS[table],
+            format="parquet",
+        )
+
+    def fingerprint(self) -> str:
+        """
+        fingerprint Hash the path, size, and modification time of every Parquet file
+
+        :return: A hex digest of the dataset fingerprint
+        :rtype: str
+        """
+        files: List[str] = []
+
+        filepath: Path
+        for filepath in sorted(self.directory.glob(pattern="*/*.parquet")):
+            fileStat: stat_result = filepath.stat()
+            files.append(f"{filepath}:{fileStat.st_size}:{fileStat.st_mtime_ns}")
+
+        return sha256("\n".join(files).encode()).hexdigest()
+
+
+def _toPandasType(arrowType: pyarrow.DataType) -> pd.api.extensions.ExtensionDtype:
+    """
+    _toPandasType Map Arrow strings to string[pyarrow] when converting to pandas
+
+    :param arrowType: An Arrow data type
+    :type arrowType: pyarrow.DataType
+    :return: The pandas dtype to convert to, or None to use the default
+    :rtype: pd.api.extensions.ExtensionDtype
+    """
+    if arrowType == pyarrow.string():
+        return pd.StringDtype(storage="pyarrow")
+
+    return None
+
+
+def createDFGeneratorFromParquet(
+    db: ParquetDB,
+    table: str,
+    columns: List[str],
+    filter: ds.Expression | None = None,
+) -> Iterable[DataFrame]:
+    """
+    createDFGeneratorFromParquet Return a generator of Pandas DataFrames of a Parquet table
+
+    Only `columns` are read from disk, and `filter` is evaluated by pyarrow before any rows are converted to pandas
+
+    :param db: A ParquetDB object
+    :type db: ParquetDB
+    :param table: The name of the table to read
+    :type table: str
+    :param columns: The columns to read
+    :type columns: List[str]
+    :param filter: A pyarrow expression rows must match, defaults to None
+    :type filter: ds.Expression | None, optional
+    :return: A generator of Pandas DataFrames with string[pyarrow] text columns
+    :rtype: Iterable[DataFrame]
+    :yield: A pandas.DataFrame
+    :rtype: Iterable[DataFrame]
+    """
+    batch: pyarrow.RecordBatch
+    for batch in db.dataset(table=table).to_batches(columns=columns, filter=filter):
+        if batch.num_rows > 0:
+            yield batch.to_pandas(types_mapper=_toPandasType)
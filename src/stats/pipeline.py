@@ -0,0 +1,281 @@
+from pathlib import Path
+from typing import Any
+
+import click
+from pyfs import isDirectory, isFile, resolvePath
+
+from src.stats.dag import runStages
+from src.stats.instrument import PROFILERS
+from src.stats.plot import FIGURE_FORMATS, FIGURE_STAGES, PLOT_STAGES, figurePaths
+from src.stats.stats import (
+    CITATION_MODES,
+    OA_BACKENDS,
+    STATS_STAGES,
+    configureRun,
+    createResourceOpeners,
+    printStatistics,
+    statsTargets,
+)
+
+
+@click.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database, or to its Parquet directory with --backend parquet",
+    required=True,
+)
+@click.option(
+    "--backend",
+    "backend",
+    type=click.Choice(choices=OA_BACKENDS),
+    help="Read the OpenAlex dataset from SQLite or from the files written by prepare.py parquet",
+    required=False,
+    default="sqlite",
+    show_default=True,
+)
+@click.option(
+    "-g",
+    "--graph",
+    "graphPath",
+    type=Path,
+    help="Path to a citation graph written by prepare.py graph to count and resolve citations with",
+    required=False,
+    default=None,
+)
+@click.option(
+    "-k",
+    "--hops",
+    "hops",
+    type=click.IntRange(min=1),
+    help="Number of citation hops to follow from the most cited PeaTMOSS papers with --graph",
+    required=False,
+    default=3,
+    show_default=True,
+)
+@click.option(
+    "-j",
+    "--json-output",
+    "jsonOutput",
+    type=Path,
+    help="Path to JSON output",
+    required=False,
+    default=Path("../../data/json"),
+    show_default=True,
+)
+@click.option(
+    "-i",
+    "--ai-classification-path",
+    "aiClassificationPath",
+    type=Path,
+    help="Path to JSON file of AI classes",
+    required=False,
+    default=Path("../../data/json/ai_nature_classes.json"),
+    show_default=True,
+)
+@click.option(
+    "-d",
+    "--figure-dir",
+    "figureDirectory",
+    type=Path,
+    help="Path to save the figures to",
+    required=False,
+    default=Path("../../data/figs"),
+    show_default=True,
+)
+@click.option(
+    "-f",
+    "--format",
+    "figureFormat",
+    type=click.Choice(choices=FIGURE_FORMATS),
+    help="File format to save the figures in",
+    required=False,
+    default="png",
+    show_default=True,
+)
+@click.option(
+    "-m",
+    "--mode",
+    "mode",
+    type=click.Choice(choices=CITATION_MODES),
+    help="Compute the PeaTMOSS arXiv citation counts in pandas, within SQLite, or with the full-text index of work titles",
+    required=False,
+    default="pandas",
+    show_default=True,
+)
+@click.option(
+    "-b",
+    "--batch-size",
+    "batchSize",
+    type=click.IntRange(min=1),
+    help="Number of OpenAlex IDs to resolve to DOIs per query",
+    required=False,
+    default=999,
+    show_default=True,
+)
+@click.option(
+    "-w",
+    "--workers",
+    "workers",
+    type=click.IntRange(min=1),
+    help="Number of processes to scan the OpenAlex tables with",
+    required=False,
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "-c",
+    "--cache-dir",
+    "cacheDirectory",
+    type=Path,
+    help="Path to cache computed results in",
+    required=False,
+    default=Path("../../data/cache"),
+    show_default=True,
+)
+@click.option(
+    "-s",
+    "--cache-size",
+    "cacheSize",
+    type=click.IntRange(min=1),
+    help="Maximum size of the cache in MB",
+    required=False,
+    default=1024,
+    show_default=True,
+)
+@click.option(
+    "--no-cache",
+    "noCache",
+    is_flag=True,
+    help="Recompute every result instead of reading from the cache and the stage artifacts",
+)
+@click.option(
+    "-t",
+    "--trace",
+    "tracePath",
+    type=Path,
+    help="Path to write a JSON trace of the wall time, rows processed, rows/sec, and peak RSS of every stage to",
+    required=False,
+    default=None,
+)
+@click.option(
+    "--profiler",
+    "profiler",
+    type=click.Choice(choices=PROFILERS),
+    help="Profile every stage of a --trace run with cProfile or pyinstrument",
+    required=False,
+    default="none",
+    show_default=True,
+)
+@click.option(
+    "--profile-dir",
+    "profileDirectory",
+    type=Path,
+    help="Path to save the profiles of --profiler to",
+    required=False,
+    default=Path("../../data/profiles"),
+    show_default=True,
+)
+@click.option(
+    "--artifact-dir",
+    "artifactDirectory",
+    type=Path,
+    help="Path to save the result of every stage to, so that only stages whose inputs changed are recomputed",
+    required=False,
+    default=Path("../../data/artifacts"),
+    show_default=True,
+)
+@click.option(
+    "--jobs",
+    "jobs",
+    type=click.IntRange(min=1),
+    help="Number of independent stages to run at once",
+    required=False,
+    default=1,
+    show_default=True,
+)
+def main(
+    pmPath: Path,
+    oaPath: Path,
+    backend: str,
+    graphPath: Path | None,
+    hops: int,
+    jsonOutput: Path,
+    aiClassificationPath: Path,
+    figureDirectory: Path,
+    figureFormat: str,
+    mode: str,
+    batchSize: int,
+    workers: int,
+    cacheDirectory: Path,
+    cacheSize: int,
+    noCache: bool,
+    tracePath: Path | None,
+    profiler: str,
+    profileDirectory: Path,
+    artifactDirectory: Path,
+    jobs: int,
+) -> None:
+    """
+    Compute every statistic, JSON file, and figure, recomputing only the stages whose inputs changed
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+    absJOPath: Path = resolvePath(path=jsonOutput)
+    absAIClassesPath: Path = resolvePath(path=aiClassificationPath)
+    absFigurePath: Path = resolvePath(path=figureDirectory)
+
+    assert isFile(path=absPMPath)
+    assert isDirectory(path=absJOPath)
+    assert isFile(path=absAIClassesPath)
+    assert isDirectory(path=absFigurePath)
+
+    configureRun(
+        backend=backend,
+        mode=mode,
+        noCache=noCache,
+        cacheDirectory=cacheDirectory,
+        cacheSize=cacheSize,
+        tracePath=tracePath,
+        profiler=profiler,
+        profileDirectory=profileDirectory,
+    )
+
+    results: dict[str, Any] = runStages(
+        stages=STATS_STAGES + PLOT_STAGES,
+        targets=statsTargets(graphPath=graphPath) + FIGURE_STAGES,
+        sources={
+            "workers": workers,
+            "mode": mode,
+            "jsonOutputPath": absJOPath,
+            "batchSize": batchSize,
+            "hops": hops,
+            "aiClassificationPath": absAIClassesPath,
+        }
+        | figurePaths(figureDirectory=absFigurePath, figureFormat=figureFormat),
+        resources=createResourceOpeners(
+            pmPath=absPMPath,
+            oaPath=absOAPath,
+            backend=backend,
+            graphPath=None if graphPath is None else resolvePath(path=graphPath),
+        ),
+        artifactDirectory=resolvePath(path=artifactDirectory),
+        jobs=jobs,
+        refresh=noCache,
+    )
+
+    printStatistics(results=results)
+
+
+if __name__ == "__main__":
+    main()
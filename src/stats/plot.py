@@ -1,17 +1,27 @@
+from os import cpu_count
 from pathlib import Path
 from sqlite3 import Connection
 from string import Template
-from typing import List
+from typing import List, Tuple
 
 import click
-import matplotlib.pyplot as plt
+import matplotlib
 import seaborn
 from humanize import intcomma
 from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from numpy import ndarray
 from pandas import DataFrame
 
 from src.stats.stats import *
 
+# Figures are only ever saved to files, so a GUI backend is never needed
+matplotlib.use(backend="Agg")
+# Set at import so that the worker processes rendering figures share the style
+seaborn.set_style(style="darkgrid")
+
+FIGURE_FORMATS: List[str] = ["png", "svg"]
+
 
 def _humanizeInt(number: int | float) -> str:
     """
@@ -54,11 +64,30 @@ def _renameURL(url: str) -> str:
             return hostname
 
 
+def _createFigure(rows: int = 1, columns: int = 1) -> Tuple[Figure, Axes | ndarray]:
+    """
+    _createFigure Create a figure and its axes outside of the global pyplot state
+
+    Figures created this way can be rendered in parallel, as they share no state
+
+    :param rows: The number of rows of axes, defaults to 1
+    :type rows: int, optional
+    :param columns: The number of columns of axes, defaults to 1
+    :type columns: int, optional
+    :return: The figure and its axes, as an array if there is more than one
+    :rtype: Tuple[Figure, Axes | ndarray]
+    """
+    figure: Figure = Figure()
+    axes: Axes | ndarray = figure.subplots(nrows=rows, ncols=columns)
+
+    return (figure, axes)
+
+
 def plot_DatasetSizes(
     oaSize: int,
     pmSize: int,
     filepath: Path,
-) -> None:
+) -> Path:
     """
     plot_DatasetSizes Plot the number of papers of OpenAlex and PeaTMOSS
 
@@ -68,6 +97,8 @@ def plot_DatasetSizes(
     :type pmSize: int
     :param filepath: A path to save the output figure
     :type filepath: Path
+    :return: The path of the figure
+    :rtype: Path
     """
     data: dict[str, List[str | int]] = {
         "x": ["OpenAlex", "PeaTMOSS"],
@@ -76,23 +107,27 @@ def plot_DatasetSizes(
 
     df: DataFrame = DataFrame(data=data)
 
-    graph: Axes = seaborn.barplot(data=df, x="x", y="y")
+    figure: Figure
+    graph: Axes
+    figure, graph = _createFigure()
+
+    seaborn.barplot(data=df, x="x", y="y", ax=graph)
     graph.set_yscale(value="log")
-    plt.title(label="Number of Papers per Dataset")
-    plt.xlabel(xlabel="Dataset")
-    plt.ylabel(ylabel="Number of Papers")
+    graph.set_title(label="Number of Papers per Dataset")
+    graph.set_xlabel(xlabel="Dataset")
+    graph.set_ylabel(ylabel="Number of Papers")
     graph.bar_label(
         container=graph.containers[0],
         fmt=_humanizeInt,
     )
-    plt.savefig(filepath)
-    plt.clf()
+    figure.savefig(filepath)
+    return filepath
 
 
 def plot_PMPublicationVenuePaperCount(
     venuePaperCounts: Series,
     filepath: Path,
-) -> None:
+) -> Path:
     """
     plot_PMPublicationVenuePaperCount Plot the number of PeaTMOSS papers per publication venue
 
@@ -100,6 +135,8 @@ def plot_PMPublicationVenuePaperCount(
     :type venuePaperCounts: Series
     :param filepath: Path to save figure to
     :type filepath: Path
+    :return: The path of the figure
+    :rtype: Path
     """
     data: Series = venuePaperCounts.iloc[0:4]
 
@@ -112,38 +149,46 @@ def plot_PMPublicationVenuePaperCount(
     data.sort_values(inplace=True, ascending=False)
 
     df: DataFrame = DataFrame(data=data)
-    graph: Axes = seaborn.barplot(
+
+    figure: Figure
+    graph: Axes
+    figure, graph = _createFigure()
+
+    seaborn.barplot(
         data=df,
         x="url",
         y="count",
+        ax=graph,
     )
-    plt.title(label="Number of PeaTMOSS Papers per Venue")
-    plt.xlabel(xlabel="Venue", labelpad=7)
-    plt.ylabel(ylabel="Number of Papers")
+    graph.set_title(label="Number of PeaTMOSS Papers per Venue")
+    graph.set_xlabel(xlabel="Venue", labelpad=7)
+    graph.set_ylabel(ylabel="Number of Papers")
     graph.bar_label(
         container=graph.containers[0],
         fmt=_humanizeInt,
     )
 
-    plt.tight_layout()
-    plt.savefig(filepath)
-    plt.clf()
+    figure.tight_layout()
+    figure.savefig(filepath)
+    return filepath
 
 
 def plot_MostCitedArXivPMPapers(
-    oaDB: Connection,
+    oaDB: Connection | ParquetDB,
     paperCitationCounts: Series,
     filepath: Path,
-) -> None:
+) -> Path:
     """
     plot_MostCitedArXivPMPapers Plot the most cited PeaTMOSS models published to arXiv
 
-    :param oaDB: A sqlite3.Connection object for an OpenAlex database
-    :type oaDB: Connection
+    :param oaDB: A sqlite3.Connection or ParquetDB object for an OpenAlex database
+    :type oaDB: Connection | ParquetDB
     :param paperCitationCounts: A pandas.Series of PeaTMOSS arXiv papers and their citations
     :type paperCitationCounts: Series
     :param filepath: A path to save the figure to
     :type filepath: Path
+    :return: The path of the figure
+    :rtype: Path
     """
     # Top 6 choosen because the 4th entry is a dataset and not a DNN
     data: Series = paperCitationCounts[0:6]
@@ -164,28 +209,34 @@ def plot_MostCitedArXivPMPapers(
 
     df: DataFrame = DataFrame(data=data)
     df.reset_index(drop=False, inplace=True)
-    graph: Axes = seaborn.barplot(
+
+    figure: Figure
+    graph: Axes
+    figure, graph = _createFigure()
+
+    seaborn.barplot(
         data=df,
         x="index",
         y="count",
+        ax=graph,
     )
-    plt.title(label="Number of Citations per PeaTMOSS Model")
-    plt.xlabel(xlabel="PeaTMOSS Model")
-    plt.ylabel(ylabel="Number of Citations")
+    graph.set_title(label="Number of Citations per PeaTMOSS Model")
+    graph.set_xlabel(xlabel="PeaTMOSS Model")
+    graph.set_ylabel(ylabel="Number of Citations")
     graph.bar_label(
         container=graph.containers[0],
         fmt=_humanizeInt,
     )
 
-    plt.tight_layout()
-    plt.savefig(filepath)
-    plt.clf()
+    figure.tight_layout()
+    figure.savefig(filepath)
+    return filepath
 
 
 def plot_AIClassificationOfPMModelUsage(
     aiClasses: DataFrame,
     filepath: Path,
-) -> None:
+) -> Path:
     def _formatText(text: str) -> str:
         firstClass: str = text.split(sep="and")[0].strip().title()
 
@@ -207,13 +258,15 @@ def plot_AIClassificationOfPMModelUsage(
 
     ptm: str
     for ptm in ptms:
-        data: Series = aiClasses[ptm]
+        # PTMs with fewer abstracts than others are padded with NaN
+        data: Series = aiClasses[ptm].dropna()
         data = data.apply(_formatText).value_counts(sort=True)
         ptmClasses.append(data)
 
     # Set up the matplotlib figure and axes
-    axes: List[Axes]
-    fig, axes = plt.subplots(2, 2)
+    fig: Figure
+    axes: ndarray
+    fig, axes = _createFigure(rows=2, columns=2)
 
     # Flatten the axes array for easy iteration
     axes = axes.flatten()
@@ -288,11 +341,97 @@ def plot_AIClassificationOfPMModelUsage(
     fig.supylabel(t="Number of Papers")
 
     # Adjust layout for better spacing
-    plt.tight_layout()
+    fig.tight_layout()
 
     # Show the plot
-    plt.savefig(filepath)
-    plt.clf()
+    fig.savefig(filepath)
+    return filepath
+
+
+def readAIClasses(aiClassificationPath: Path) -> DataFrame:
+    """
+    readAIClasses Read the AI classifications of the papers that cite each PeaTMOSS model
+
+    :param aiClassificationPath: Path to JSON file of AI classes
+    :type aiClassificationPath: Path
+    :return: A DataFrame with a column of classifications per PeaTMOSS model
+    :rtype: DataFrame
+    """
+    return pandas.read_json(path_or_buf=aiClassificationPath).T
+
+
+# Filenames, without an extension, of the figures within the figure directory,
+# keyed by the stage that renders them. Each stage reads the path of its
+# figure from the "<stage>Path" source
+FIGURE_FILENAMES: dict[str, str] = {
+    "venueFigure": "numberofPeaTMOSSPapersPerVenue",
+    "datasetSizesFigure": "comparisonOfDatasetPaperCounts",
+    "citationsFigure": "numberOfCitationsPerPMModel",
+    "aiClassesFigure": "numberOfPaperClassificationsPerPMModel",
+}
+
+FIGURE_STAGES: List[str] = list(FIGURE_FILENAMES.keys())
+
+# The stages of the figures, which read the artifacts of STATS_STAGES
+PLOT_STAGES: List[Stage] = [
+    Stage(
+        name="aiClasses",
+        function=readAIClasses,
+        inputs={"aiClassificationPath": "aiClassificationPath"},
+    ),
+    Stage(
+        name="venueFigure",
+        function=plot_PMPublicationVenuePaperCount,
+        inputs={
+            "venuePaperCounts": "pmPapersPerJournal",
+            "filepath": "venueFigurePath",
+        },
+        outputs=("filepath",),
+    ),
+    Stage(
+        name="datasetSizesFigure",
+        function=plot_DatasetSizes,
+        inputs={
+            "oaSize": "oaPaperCountByDOI",
+            "pmSize": "pmPaperCountByID",
+            "filepath": "datasetSizesFigurePath",
+        },
+        outputs=("filepath",),
+    ),
+    Stage(
+        name="citationsFigure",
+        function=plot_MostCitedArXivPMPapers,
+        inputs={
+            "oaDB": "oaDB",
+            "paperCitationCounts": "pmCitationCounts",
+            "filepath": "citationsFigurePath",
+        },
+        outputs=("filepath",),
+    ),
+    Stage(
+        name="aiClassesFigure",
+        function=plot_AIClassificationOfPMModelUsage,
+        inputs={"aiClasses": "aiClasses", "filepath": "aiClassesFigurePath"},
+        outputs=("filepath",),
+    ),
+]
+
+
+def figurePaths(figureDirectory: Path, figureFormat: str = "png") -> dict[str, Path]:
+    """
+    figurePaths Return the path of every figure within a directory
+
+    :param figureDirectory: Directory to save the figures to
+    :type figureDirectory: Path
+    :param figureFormat: One of FIGURE_FORMATS, defaults to "png"
+    :type figureFormat: str, optional
+    :return: A mapping of the path source of every stage of FIGURE_STAGES to its figure path
+    :rtype: dict[str, Path]
+    """
+    return {
+        f"{stage}Path": Path(figureDirectory, f"{filename}.{figureFormat}")
+        for stage, filename in FIGURE_FILENAMES.items()
+    }
 
 
 @click.command()
@@ -309,19 +448,27 @@ def plot_AIClassificationOfPMModelUsage(
     "--openalex",
     "oaPath",
     type=Path,
-    help="Path to OpenAlex database",
+    help="Path to OpenAlex database, or to its Parquet directory with --backend parquet",
     required=True,
 )
 @click.option(
-    "-a",
-    "--peatmoss-arxiv-citation-count-path",
-    "pmArxivCitationCountPath",
-    type=Path,
-    help="Path to pickled PeaTMOSS arXiv Citation Count",
+    "--backend",
+    "backend",
+    type=click.Choice(choices=OA_BACKENDS),
+    help="Read the OpenAlex dataset from SQLite or from the files written by prepare.py parquet",
     required=False,
-    default=Path("../../data/pickle/pmArXivCitations.pickle"),
+    default="sqlite",
     show_default=True,
 )
+@click.option(
+    "-g",
+    "--graph",
+    "graphPath",
+    type=Path,
+    help="Path to a citation graph written by prepare.py graph to count citations with",
+    required=False,
+    default=None,
+)
 @click.option(
     "-i",
     "--ai-classification-path",
@@ -332,77 +479,149 @@ def plot_AIClassificationOfPMModelUsage(
     default=Path("../../data/json/ai_nature_classes.json"),
     show_default=True,
 )
+@click.option(
+    "-m",
+    "--mode",
+    "mode",
+    type=click.Choice(choices=CITATION_MODES),
+    help="Compute the PeaTMOSS arXiv citation counts in pandas, within SQLite, or with the full-text index of work titles",
+    required=False,
+    default="pandas",
+    show_default=True,
+)
+@click.option(
+    "-w",
+    "--workers",
+    "workers",
+    type=click.IntRange(min=1),
+    help="Number of processes to scan the OpenAlex tables with",
+    required=False,
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "-c",
+    "--cache-dir",
+    "cacheDirectory",
+    type=Path,
+    help="Path to cache computed results in",
+    required=False,
+    default=Path("../../data/cache"),
+    show_default=True,
+)
+@click.option(
+    "-s",
+    "--cache-size",
+    "cacheSize",
+    type=click.IntRange(min=1),
+    help="Maximum size of the cache in MB",
+    required=False,
+    default=1024,
+    show_default=True,
+)
+@click.option(
+    "--no-cache",
+    "noCache",
+    is_flag=True,
+    help="Recompute every result instead of reading from the cache and the stage artifacts",
+)
+@click.option(
+    "-d",
+    "--figure-dir",
+    "figureDirectory",
+    type=Path,
+    help="Path to save the figures to",
+    required=False,
+    default=Path("../../data/figs"),
+    show_default=True,
+)
+@click.option(
+    "-f",
+    "--format",
+    "figureFormat",
+    type=click.Choice(choices=FIGURE_FORMATS),
+    help="File format to save the figures in",
+    required=False,
+    default="png",
+    show_default=True,
+)
+@click.option(
+    "--figures",
+    "figures",
+    type=click.Choice(choices=FIGURE_STAGES),
+    multiple=True,
+    help="Figure to render, can be repeated; every figure if not given",
+    required=False,
+)
+@click.option(
+    "--artifact-dir",
+    "artifactDirectory",
+    type=Path,
+    help="Path to save the result of every stage to, so that only stages whose inputs changed are recomputed",
+    required=False,
+    default=Path("../../data/artifacts"),
+    show_default=True,
+)
+@click.option(
+    "--jobs",
+    "jobs",
+    type=click.IntRange(min=1),
+    help="Number of independent stages, such as figures, to run at once; the number of CPUs if not given",
+    required=False,
+    default=None,
+)
 def main(
     pmPath: Path,
     oaPath: Path,
-    pmArxivCitationCountPath: Path,
+    backend: str,
+    graphPath: Path | None,
     aiClassificationPath: Path,
+    mode: str,
+    workers: int,
+    cacheDirectory: Path,
+    cacheSize: int,
+    noCache: bool,
+    figureDirectory: Path,
+    figureFormat: str,
+    figures: Tuple[str, ...],
+    artifactDirectory: Path,
+    jobs: int | None,
 ) -> None:
-    seaborn.set_style(style="darkgrid")
-
     absPMPath: Path = resolvePath(path=pmPath)
     absOAPath: Path = resolvePath(path=oaPath)
-    absPMACCP: Path = resolvePath(path=pmArxivCitationCountPath)
-    # Don't assert existence; may be created later (~ line 278)
     absAIClassesPath = resolvePath(path=aiClassificationPath)
+    absFigurePath: Path = resolvePath(path=figureDirectory)
 
     assert isFile(path=absPMPath)
-    assert isFile(path=absOAPath)
     assert isFile(path=absAIClassesPath)
-
-    pmDB: Connection = connectToDB(dbPath=absPMPath)
-    oaDB: Connection = connectToDB(dbPath=absOAPath)
-
-    oaPaperCounts: int = oa_CountPapersByDOI(oaDB=oaDB)
-    pmPaperCounts: int = pm_CountPapersByID(pmDB=pmDB)
-
-    pmVenueCounts: Series = pm_CountPapersPerJournal(
-        pmDB=pmDB,
-    )
-
-    pmPaperCitationCounts: Series
-    try:
-        pmPaperCitationCounts = pandas.read_pickle(
-            filepath_or_buffer=absPMACCP,
-        )
-    except FileNotFoundError:
-        pmPaperCitationCounts = oapm_CountCitationsOfArXivPMPapers(
-            pmDB=pmDB,
-            oaDB=oaDB,
-        )
-        pmPaperCitationCounts.to_pickle(path=absPMACCP)
-
-    plot_PMPublicationVenuePaperCount(
-        venuePaperCounts=pmVenueCounts,
-        filepath=resolvePath(
-            path=Path("../../data/figs/numberofPeaTMOSSPapersPerVenue.png"),
-        ),
-    )
-
-    plot_DatasetSizes(
-        oaSize=oaPaperCounts,
-        pmSize=pmPaperCounts,
-        filepath=resolvePath(
-            path=Path("../../data/figs/comparisonOfDatasetPaperCounts.png"),
-        ),
-    )
-
-    plot_MostCitedArXivPMPapers(
-        oaDB=oaDB,
-        paperCitationCounts=pmPaperCitationCounts,
-        filepath=resolvePath(
-            path=Path(
-                "../../data/figs/numberOfCitationsPerPMModel.png",
-            ),
-        ),
+    assert isDirectory(path=absFigurePath)
+
+    configureRun(
+        backend=backend,
+        mode=mode,
+        noCache=noCache,
+        cacheDirectory=cacheDirectory,
+        cacheSize=cacheSize,
     )
 
-    aiClassesDF: DataFrame = pandas.read_json(path_or_buf=absAIClassesPath).T
-    plot_AIClassificationOfPMModelUsage(
-        aiClasses=aiClassesDF,
-        filepath=resolvePath(
-            path=Path("../../data/figs/numberOfPaperClassificationsPerPMModel.png"),
+    runStages(
+        stages=STATS_STAGES + PLOT_STAGES,
+        targets=list(figures) if len(figures) > 0 else FIGURE_STAGES,
+        sources={
+            "workers": workers,
+            "mode": mode,
+            "aiClassificationPath": absAIClassesPath,
+        }
+        | figurePaths(figureDirectory=absFigurePath, figureFormat=figureFormat),
+        resources=createResourceOpeners(
+            pmPath=absPMPath,
+            oaPath=absOAPath,
+            backend=backend,
+            graphPath=None if graphPath is None else resolvePath(path=graphPath),
         ),
+        artifactDirectory=resolvePath(path=artifactDirectory),
+        jobs=jobs if jobs is not None else (cpu_count() or 1),
+        refresh=noCache,
     )
 
 
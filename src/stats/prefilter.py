@@ -0,0 +1,415 @@
+import re
+from collections import Counter
+from pathlib import Path
+from typing import List, Tuple
+
+import click
+import numpy
+from humanize import intcomma
+from pyfs import isFile, resolvePath
+
+from src.stats import NATURE_SUBJECTS
+from src.stats.checkpoint import normalizeAbstract, readCheckpoint
+
+TOKEN_PATTERN: re.Pattern = re.compile(pattern=r"[a-z0-9]+")
+
+
+def _tokenize(abstract: str) -> List[str]:
+    """
+    _tokenize Split a normalized abstract into alphanumeric tokens
+
+    :param abstract: An abstract
+    :type abstract: str
+    :return: A list of tokens
+    :rtype: List[str]
+    """
+    return TOKEN_PATTERN.findall(normalizeAbstract(abstract=abstract))
+
+
+class CentroidClassifier:
+    """
+    CentroidClassifier A TF-IDF nearest centroid classifier of abstracts
+
+    Each class is the L2 normalized mean TF-IDF vector of the abstracts labelled with it. An abstract is only classified when the cosine similarity of its nearest centroid beats the runner-up by at least a threshold
+    """
+
+    def __init__(
+        self,
+        vocabulary: List[str],
+        idf: numpy.ndarray,
+        centroids: numpy.ndarray,
+        labels: List[str],
+    ) -> None:
+        self.vocabulary: dict[str, int] = {
+            term: idx for idx, term in enumerate(vocabulary)
+        }
+        self.idf: numpy.ndarray = idf
+        self.centroids: numpy.ndarray = centroids
+        self.labels: List[str] = labels
+
+    @classmethod
+    def fit(
+        cls,
+        abstracts: List[str],
+        labels: List[str],
+        minDocumentFrequency: int = 2,
+    ) -> "CentroidClassifier":
+        """
+        fit Train a classifier on labelled abstracts
+
+        :param abstracts: A list of abstracts
+        :type abstracts: List[str]
+        :param labels: The label of each abstract
+        :type labels: List[str]
+        :param minDocumentFrequency: The minimum number of abstracts a term must be in to be part of the vocabulary, defaults to 2
+        :type minDocumentFrequency: int, optional
+        :return: A CentroidClassifier object
+        :rtype: CentroidClassifier
+        """
+        tokens: List[List[str]] = [
+            _tokenize(abstract=abstract) for abstract in abstracts
+        ]
+
+        documentFrequency: Counter = Counter()
+        abstractTokens: List[str]
+        for abstractTokens in tokens:
+            documentFrequency.update(set(abstractTokens))
+
+        vocabulary: List[str] = sorted(
+            [
+                term
+                for term, frequency in documentFrequency.items()
+                if frequency >= minDocumentFrequency
+            ]
+        )
+        frequencies: numpy.ndarray = numpy.array(
+            [documentFrequency[term] for term in vocabulary],
+            dtype=numpy.float64,
+        )
+        idf: numpy.ndarray = (
+            numpy.log((1 + len(abstracts)) / (1 + frequencies)) + 1
+        ).astype(numpy.float32)
+
+        classes: List[str] = sorted(set(labels))
+        classifier: CentroidClassifier = cls(
+            vocabulary=vocabulary,
+            idf=idf,
+            centroids=numpy.zeros(
+                shape=(len(classes), len(vocabulary)),
+                dtype=numpy.float32,
+            ),
+            labels=classes,
+        )
+
+        rows: numpy.ndarray
+        columns: numpy.ndarray
+        weights: numpy.ndarray
+        rows, columns, weights = classifier._vectorize(tokens=tokens)
+
+        classIndexes: numpy.ndarray = numpy.searchsorted(classes, labels)
+        numpy.add.at(classifier.centroids, (classIndexes[rows], columns), weights)
+
+        norms: numpy.ndarray = numpy.linalg.norm(classifier.centroids, axis=1)
+        classifier.centroids /= numpy.where(norms == 0, 1, norms)[:, None]
+
+        return classifier
+
+    @classmethod
+    def load(cls, path: Path) -> "CentroidClassifier":
+        """
+        load Load a classifier written by `save`
+
+        :param path: Path to a .npz file
+        :type path: Path
+        :return: A CentroidClassifier object
+        :rtype: CentroidClassifier
+        """
+        with numpy.load(file=path) as arrays:
+            return cls(
+                vocabulary=arrays["vocabulary"].tolist(),
+                idf=arrays["idf"],
+                centroids=arrays["centroids"],
+                labels=arrays["labels"].tolist(),
+            )
+
+    def save(self, path: Path) -> None:
+        """
+        save Write the classifier to a .npz file
+
+        :param path: Path to a .npz file
+        :type path: Path
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        numpy.savez_compressed(
+            file=path,
+            vocabulary=numpy.array(list(self.vocabulary.keys())),
+            idf=self.idf,
+            centroids=self.centroids,
+            labels=numpy.array(self.labels),
+        )
+
+    def _vectorize(
+        self,
+        tokens: List[List[str]],
+    ) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """
+        _vectorize Convert tokenized abstracts to L2 normalized, sublinear TF-IDF vectors
+
+        :param tokens: The tokens of each abstract
+        :type tokens: List[List[str]]
+        :return: A tuple of the abstract, term, and weight of every non-zero entry
+        :rtype: Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        """
+        termIDs: List[List[int]] = [
+            [
+                self.vocabulary[term]
+                for term in abstractTokens
+                if term in self.vocabulary
+            ]
+            for abstractTokens in tokens
+        ]
+        rows: numpy.ndarray = numpy.repeat(
+            numpy.arange(len(termIDs)),
+            [len(abstractTermIDs) for abstractTermIDs in termIDs],
+        )
+        columns: numpy.ndarray = numpy.fromiter(
+            (termID for abstractTermIDs in termIDs for termID in abstractTermIDs),
+            dtype=numpy.int64,
+            count=rows.shape[0],
+        )
+
+        # Count each term once per abstract
+        vocabularySize: int = len(self.vocabulary)
+        entries: numpy.ndarray
+        counts: numpy.ndarray
+        entries, counts = numpy.unique(
+            rows * vocabularySize + columns,
+            return_counts=True,
+        )
+        rows = entries // vocabularySize
+        columns = entries % vocabularySize
+
+        weights: numpy.ndarray = (1 + numpy.log(counts)) * self.idf[columns]
+        norms: numpy.ndarray = numpy.sqrt(
+            numpy.bincount(rows, weights=weights**2, minlength=len(tokens))
+        )
+        weights /= norms[rows]
+
+        return (rows, columns, weights)
+
+    def scores(self, abstracts: List[str]) -> numpy.ndarray:
+        """
+        scores Return the cosine similarity of every abstract to every centroid
+
+        :param abstracts: A list of abstracts
+        :type abstracts: List[str]
+        :return: An array of shape (abstracts, labels)
+        :rtype: numpy.ndarray
+        """
+        rows: numpy.ndarray
+        columns: numpy.ndarray
+        weights: numpy.ndarray
+        rows, columns, weights = self._vectorize(
+            tokens=[_tokenize(abstract=abstract) for abstract in abstracts]
+        )
+
+        return numpy.stack(
+            [
+                numpy.bincount(
+                    rows,
+                    weights=weights * centroid[columns],
+                    minlength=len(abstracts),
+                )
+                for centroid in self.centroids
+            ],
+            axis=1,
+        )
+
+    def predict(self, abstracts: List[str], threshold: float) -> List[str | None]:
+        """
+        predict Classify the abstracts that the classifier is confident about
+
+        :param abstracts: A list of abstracts
+        :type abstracts: List[str]
+        :param threshold: The minimum margin between the best and second best cosine similarity
+        :type threshold: float
+        :return: The label of each abstract, or None when the margin is below `threshold`
+        :rtype: List[str | None]
+        """
+        if len(abstracts) == 0 or len(self.labels) == 0:
+            return [None] * len(abstracts)
+
+        scores: numpy.ndarray = self.scores(abstracts=abstracts)
+        ranked: numpy.ndarray = numpy.sort(scores, axis=1)
+
+        best: numpy.ndarray = ranked[:, -1]
+        runnerUp: numpy.ndarray = ranked[:, -2] if len(self.labels) > 1 else 0
+        confident: numpy.ndarray = (best > 0) & (best - runnerUp >= threshold)
+
+        return [
+            self.labels[labelIdx] if isConfident else None
+            for labelIdx, isConfident in zip(scores.argmax(axis=1), confident)
+        ]
+
+
+def _isHeldOut(key: str, holdout: float) -> bool:
+    """
+    _isHeldOut Deterministically assign a checkpoint entry to the held-out set by its key
+
+    :param key: The hex digest key of a checkpoint entry
+    :type key: str
+    :param holdout: The fraction of entries to hold out
+    :type holdout: float
+    :return: True if the entry is held out
+    :rtype: bool
+    """
+    return int(key[0:8], 16) / 16**8 < holdout
+
+
+@click.group()
+def cli() -> None:
+    pass
+
+
+@cli.command()
+@click.option(
+    "-k",
+    "--checkpoint",
+    "checkpointPath",
+    required=False,
+    type=Path,
+    help="Path to the ai.py checkpoint of abstracts classified by the model",
+    default=Path("../../data/cache/ai_checkpoint.jsonl"),
+    show_default=True,
+)
+@click.option(
+    "-m",
+    "--model",
+    "model",
+    required=False,
+    type=str,
+    help="Ollama model whose classifications to train on",
+    default="gemma",
+    show_default=True,
+)
+@click.option(
+    "-o",
+    "--output",
+    "outputPath",
+    required=False,
+    type=Path,
+    help="Path to write the classifier to",
+    default=Path("../../data/cache/ai_prefilter.npz"),
+    show_default=True,
+)
+@click.option(
+    "-t",
+    "--threshold",
+    "thresholds",
+    required=False,
+    type=click.FloatRange(min=0),
+    multiple=True,
+    help="Similarity margin to report LLM calls saved and agreement for, can be repeated",
+    default=[0.0, 0.02, 0.05, 0.1, 0.2],
+    show_default=True,
+)
+@click.option(
+    "--holdout",
+    "holdout",
+    required=False,
+    type=click.FloatRange(min=0, max=1, min_open=True, max_open=True),
+    help="Fraction of the classified abstracts to evaluate on",
+    default=0.2,
+    show_default=True,
+)
+@click.option(
+    "--min-df",
+    "minDocumentFrequency",
+    required=False,
+    type=click.IntRange(min=1),
+    help="Minimum number of abstracts a term must be in",
+    default=2,
+    show_default=True,
+)
+def train(
+    checkpointPath: Path,
+    model: str,
+    outputPath: Path,
+    thresholds: Tuple[float, ...],
+    holdout: float,
+    minDocumentFrequency: int,
+) -> None:
+    """
+    Train the pre-classifier on model classifications and report its agreement
+    """
+    absCheckpointPath: Path = resolvePath(path=checkpointPath)
+    absOutputPath: Path = resolvePath(path=outputPath)
+
+    assert isFile(path=absCheckpointPath)
+
+    trainAbstracts: List[str] = []
+    trainLabels: List[str] = []
+    heldOutAbstracts: List[str] = []
+    heldOutLabels: List[str] = []
+    skippedCount: int = 0
+
+    entry: dict[str, str]
+    for entry in readCheckpoint(path=absCheckpointPath):
+        label: str = entry["classification"].strip()
+
+        if entry["model"] != model:
+            continue
+        elif label not in NATURE_SUBJECTS:
+            skippedCount += 1
+            continue
+
+        if _isHeldOut(key=entry["key"], holdout=holdout):
+            heldOutAbstracts.append(entry["abstract"])
+            heldOutLabels.append(label)
+        else:
+            trainAbstracts.append(entry["abstract"])
+            trainLabels.append(label)
+
+    print(
+        f"Training on {intcomma(value=len(trainAbstracts))} abstracts,",
+        f"evaluating on {intcomma(value=len(heldOutAbstracts))},",
+        f"skipped {intcomma(value=skippedCount)} that are not one of NATURE_SUBJECTS",
+    )
+
+    classifier: CentroidClassifier = CentroidClassifier.fit(
+        abstracts=trainAbstracts,
+        labels=trainLabels,
+        minDocumentFrequency=minDocumentFrequency,
+    )
+
+    threshold: float
+    for threshold in sorted(thresholds):
+        predictions: List[str | None] = classifier.predict(
+            abstracts=heldOutAbstracts,
+            threshold=threshold,
+        )
+        answered: List[Tuple[str, str]] = [
+            (prediction, label)
+            for prediction, label in zip(predictions, heldOutLabels)
+            if prediction is not None
+        ]
+        agreedCount: int = sum([prediction == label for prediction, label in answered])
+
+        print(
+            f"Threshold {threshold:.2f}: saved {len(answered)} of",
+            f"{len(heldOutAbstracts)} LLM calls",
+            f"({len(answered) / max(len(heldOutAbstracts), 1) * 100:.1f}%),",
+            f"agreed with the LLM on {agreedCount}",
+            f"({agreedCount / max(len(answered), 1) * 100:.1f}%)",
+        )
+
+    CentroidClassifier.fit(
+        abstracts=trainAbstracts + heldOutAbstracts,
+        labels=trainLabels + heldOutLabels,
+        minDocumentFrequency=minDocumentFrequency,
+    ).save(path=absOutputPath)
+    print(f"Saved the classifier trained on every abstract to: {absOutputPath}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,862 @@
+from datetime import datetime, timezone
+from functools import partial
+from math import ceil
+from pathlib import Path
+from sqlite3 import Connection, Cursor
+from time import time
+from typing import Callable, Iterable, List, Tuple
+
+import click
+import numpy
+import pandas
+import pyarrow
+import pyarrow.parquet as pq
+from humanize import intcomma, naturalsize
+from pandas import DataFrame
+from progress.bar import Bar
+from progress.spinner import Spinner
+from pyfs import isDirectory, isFile, resolvePath
+
+from src.stats import (
+    CITATION_COUNTS_TABLE,
+    FTS_TABLE,
+    PM_PAPERS_TABLE,
+    SQL_STANDARDIZED_DOI,
+    SQL_STANDARDIZED_TITLE,
+    STANDARDIZED_TITLES_TABLE,
+    SUMMARY_TABLE,
+    getSummaryMarkers,
+    getTableMaxRowID,
+    readSummaryStatistics,
+    runOneValueSQLQuery,
+    summaryTableIsCurrent,
+)
+from src.stats.graph import CitationGraph, encodeOAIDs
+from src.stats.parquet import (
+    OA_PARQUET_SCHEMAS,
+    ParquetDB,
+    createDFGeneratorFromParquet,
+)
+from src.stats.stats import (
+    OA_BACKENDS,
+    PYARROW_STRING,
+    _createDFGeneratorFromSQL,
+    _standardizeTextSeries,
+    connectToDB,
+    connectToOA,
+    oa_CountCitations,
+    oa_CountPapersByDOI,
+    oa_CountPapersByOAID,
+    oa_MatchWorksByTitle,
+    oapm_CountPMArXivPapersInOA,
+    pm_IdentifyPapersPublishedInArXiv,
+)
+
+OA_INDEXES: dict[str, str] = {
+    "idx_works_doi": "CREATE INDEX IF NOT EXISTS idx_works_doi ON works (doi)",
+    "idx_works_standardized_doi": f"CREATE INDEX IF NOT EXISTS idx_works_standardized_doi ON works ({SQL_STANDARDIZED_DOI})",
+    "idx_works_oa_id": "CREATE INDEX IF NOT EXISTS idx_works_oa_id ON works (oa_id)",
+    "idx_standardized_titles_title": f"CREATE INDEX IF NOT EXISTS idx_standardized_titles_title ON {STANDARDIZED_TITLES_TABLE} (title)",
+    "idx_cites_reference": "CREATE INDEX IF NOT EXISTS idx_cites_reference ON cites (reference)",
+    "idx_cites_work": "CREATE INDEX IF NOT EXISTS idx_cites_work ON cites (work)",
+}
+
+# Indexes of older versions that are dropped by `prepare.py indexes`. An index on
+# standardize() broke every client that does not register the function
+OBSOLETE_OA_INDEXES: List[str] = ["idx_works_standardized_title"]
+
+PM_INDEXES: dict[str, str] = {
+    "idx_model_to_paper_paper_id": "CREATE INDEX IF NOT EXISTS idx_model_to_paper_paper_id ON model_to_paper (paper_id)",
+}
+
+PARQUET_COMPRESSIONS: List[str] = ["zstd", "snappy", "gzip", "none"]
+
+
+def _listIndexes(db: Connection) -> dict[str, str | None]:
+    """
+    _listIndexes Return the indexes that exist within a SQLite3 database
+
+    :param db: An sqlite3.Connection object
+    :type db: Connection
+    :return: A mapping of index names to the statements that created them, which are None for automatic indexes
+    :rtype: dict[str, str | None]
+    """
+    query: str = "SELECT name, sql FROM sqlite_master WHERE type = 'index'"
+    return dict(db.execute(query).fetchall())
+
+
+def dropIndexes(db: Connection, dbPath: Path, names: List[str]) -> None:
+    """
+    dropIndexes Drop the indexes of a SQLite3 database that exist
+
+    :param db: An sqlite3.Connection object
+    :type db: Connection
+    :param dbPath: Filepath to the SQLite3 database that `db` is connected to
+    :type dbPath: Path
+    :param names: The names of the indexes
+    :type names: List[str]
+    """
+    existingIndexes: dict[str, str | None] = _listIndexes(db=db)
+
+    name: str
+    for name in names:
+        if name in existingIndexes:
+            db.execute(f"DROP INDEX {name}")
+            db.commit()
+            print(f"Dropped {name} from {dbPath}")
+
+
+def createStandardizedTitlesTable(db: Connection) -> None:
+    """
+    createStandardizedTitlesTable Add the standardized titles of the works that are not in STANDARDIZED_TITLES_TABLE to it
+
+    Titles are standardized with the SQL function of registerSQLFunctions, so `db` must be opened with connectToDB. Only works that were added since the table was last filled are standardized
+
+    :param db: An sqlite3.Connection object of an OpenAlex database
+    :type db: Connection
+    """
+    db.execute(
+        f"""CREATE TABLE IF NOT EXISTS {STANDARDIZED_TITLES_TABLE} (
+            work INTEGER PRIMARY KEY,
+            title TEXT
+        )"""
+    )
+
+    startTime: float = time()
+    cursor: Cursor = db.execute(
+        f"""INSERT INTO {STANDARDIZED_TITLES_TABLE}
+        SELECT rowid, {SQL_STANDARDIZED_TITLE} FROM works WHERE rowid > ?""",
+        (getTableMaxRowID(db=db, table=STANDARDIZED_TITLES_TABLE),),
+    )
+    db.commit()
+
+    print(
+        f"Standardized the titles of {intcomma(value=cursor.rowcount)} works",
+        f"in {time() - startTime:.2f} seconds",
+    )
+
+
+def createIndexes(db: Connection, dbPath: Path, indexes: dict[str, str]) -> None:
+    """
+    createIndexes Create the missing indexes of a SQLite3 database and ANALYZE it
+
+    Indexes that were created by an older statement, such as a different expression, are dropped and rebuilt. Nothing is executed if every index already exists
+
+    :param db: An sqlite3.Connection object
+    :type db: Connection
+    :param dbPath: Filepath to the SQLite3 database that `db` is connected to
+    :type dbPath: Path
+    :param indexes: A mapping of index names to CREATE INDEX statements
+    :type indexes: dict[str, str]
+    """
+    existingIndexes: dict[str, str | None] = _listIndexes(db=db)
+
+    # SQLite stores the statement without IF NOT EXISTS
+    missingIndexes: List[str] = [
+        name
+        for name, statement in indexes.items()
+        if existingIndexes.get(name) != statement.replace("IF NOT EXISTS ", "")
+    ]
+
+    if len(missingIndexes) == 0:
+        print(f"All indexes already exist in {dbPath}")
+        return
+
+    startSize: int = dbPath.stat().st_size
+
+    name: str
+    for name in missingIndexes:
+        startTime: float = time()
+        db.execute(f"DROP INDEX IF EXISTS {name}")
+        db.execute(indexes[name])
+        db.commit()
+        print(f"Built {name} in {time() - startTime:.2f} seconds")
+
+    startTime: float = time()
+    db.execute("ANALYZE")
+    db.commit()
+    print(f"Analyzed {dbPath} in {time() - startTime:.2f} seconds")
+
+    print(
+        f"Database size grew from {naturalsize(value=startSize)} to",
+        naturalsize(value=dbPath.stat().st_size),
+    )
+
+
+def createSummaryTable(
+    pmDB: Connection,
+    oaDB: Connection,
+    refresh: bool,
+    workers: int,
+) -> None:
+    """
+    createSummaryTable Compute the dataset-level statistics and store them in the OpenAlex database
+
+    Only the statistics that are missing or were computed before rows were added to the works or cites tables, or before their last rows were removed, are computed. A summary table of an older version is rebuilt
+
+    :param pmDB: A sqlite3.Connection object of a PeaTMOSS database
+    :type pmDB: Connection
+    :param oaDB: A sqlite3.Connection object of an OpenAlex database
+    :type oaDB: Connection
+    :param refresh: Recompute every statistic
+    :type refresh: bool
+    :param workers: The number of processes to scan the OpenAlex tables with
+    :type workers: int
+    """
+    if not summaryTableIsCurrent(db=oaDB):
+        oaDB.execute(f"DROP TABLE IF EXISTS {SUMMARY_TABLE}")
+
+    oaDB.execute(
+        f"""CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL,
+            works_max_rowid INTEGER NOT NULL,
+            cites_max_rowid INTEGER NOT NULL,
+            computed_at TEXT NOT NULL
+        )"""
+    )
+
+    markers: Tuple[int, int] = getSummaryMarkers(db=oaDB)
+
+    # The oa_* functions read from the summary table, so stale rows must be
+    # removed before recomputing them
+    if refresh:
+        oaDB.execute(f"DELETE FROM {SUMMARY_TABLE}")
+    else:
+        oaDB.execute(
+            f"DELETE FROM {SUMMARY_TABLE} WHERE works_max_rowid != ? OR cites_max_rowid != ?",
+            markers,
+        )
+    oaDB.commit()
+
+    freshStatistics: dict[str, int] = readSummaryStatistics(db=oaDB)
+
+    statistics: dict[str, Callable[[], int]] = {
+        "oa_doi_count": partial(oa_CountPapersByDOI, oaDB=oaDB, workers=workers),
+        "oa_oaid_count": partial(oa_CountPapersByOAID, oaDB=oaDB),
+        "oa_citation_count": partial(oa_CountCitations, oaDB=oaDB),
+        "oapm_arxiv_pm_papers_in_oa": partial(
+            oapm_CountPMArXivPapersInOA,
+            pmDB=pmDB,
+            oaDB=oaDB,
+            workers=workers,
+        ),
+    }
+
+    name: str
+    statistic: Callable[[], int]
+    for name, statistic in statistics.items():
+        if name in freshStatistics:
+            print(f"{name} is up to date: {intcomma(value=freshStatistics[name])}")
+            continue
+
+        startTime: float = time()
+        value: int = statistic()
+        oaDB.execute(
+            f"INSERT INTO {SUMMARY_TABLE} VALUES (?, ?, ?, ?, ?)",
+            (
+                name,
+                value,
+                *markers,
+                datetime.now(tz=timezone.utc).isoformat(),
+            ),
+        )
+        oaDB.commit()
+        print(
+            f"Computed {name} in {time() - startTime:.2f} seconds:",
+            intcomma(value=value),
+        )
+
+
+def exportParquetTable(
+    db: Connection,
+    table: str,
+    directory: Path,
+    rowsPerFile: int,
+    compression: str,
+) -> None:
+    """
+    exportParquetTable Export the columns of an OpenAlex table that the stats scripts read to Parquet files
+
+    Files are written in rowid order to `directory`/`table`/part-NNNNN.parquet, and files left over from a previous export are removed
+
+    :param db: An sqlite3.Connection object of an OpenAlex database
+    :type db: Connection
+    :param table: The name of a table in OA_PARQUET_SCHEMAS
+    :type table: str
+    :param directory: Directory to write the table directory to
+    :type directory: Path
+    :param rowsPerFile: The number of rows per Parquet file
+    :type rowsPerFile: int
+    :param compression: One of PARQUET_COMPRESSIONS
+    :type compression: str
+    """
+    schema: pyarrow.Schema = OA_PARQUET_SCHEMAS[table]
+    tableDirectory: Path = Path(directory, table)
+    tableDirectory.mkdir(parents=True, exist_ok=True)
+
+    stalePath: Path
+    for stalePath in tableDirectory.glob(pattern="part-*.parquet"):
+        stalePath.unlink()
+
+    query: str = f"SELECT {', '.join(schema.names)} FROM {table} ORDER BY rowid"
+    dfs: Iterable[DataFrame] = _createDFGeneratorFromSQL(
+        db=db,
+        query=query,
+        chunkSize=rowsPerFile,
+        dtype={
+            field.name: PYARROW_STRING
+            for field in schema
+            if field.type == pyarrow.string()
+        },
+    )
+
+    startTime: float = time()
+    fileCount: int = ceil(getTableMaxRowID(db=db, table=table) / rowsPerFile)
+    rowCount: int = 0
+
+    with Bar(f"Exporting {table} to Parquet...", max=fileCount) as bar:
+        idx: int
+        df: DataFrame
+        for idx, df in enumerate(dfs):
+            pq.write_table(
+                table=pyarrow.Table.from_pandas(
+                    df=df,
+                    schema=schema,
+                    preserve_index=False,
+                ),
+                where=Path(tableDirectory, f"part-{idx:05d}.parquet"),
+                compression=compression,
+            )
+            rowCount += df.shape[0]
+            bar.next()
+
+    print(
+        f"Exported {intcomma(value=rowCount)} rows of {table} in",
+        f"{time() - startTime:.2f} seconds:",
+        naturalsize(
+            value=sum(
+                [
+                    filepath.stat().st_size
+                    for filepath in tableDirectory.glob(pattern="*.parquet")
+                ]
+            )
+        ),
+    )
+
+
+def buildCitationGraph(
+    oaDB: Connection | ParquetDB,
+    chunkSize: int,
+) -> CitationGraph:
+    """
+    buildCitationGraph Read every citation of an OpenAlex dataset into a CitationGraph
+
+    Citations with a NULL work or reference are skipped
+
+    :param oaDB: A sqlite3.Connection or ParquetDB object of an OpenAlex database
+    :type oaDB: Connection | ParquetDB
+    :param chunkSize: The number of citations to read and encode at a time
+    :type chunkSize: int
+    :return: A CitationGraph object
+    :rtype: CitationGraph
+    """
+    # Seeded with an empty array so that an empty cites table can be concatenated
+    works: List[numpy.ndarray] = [numpy.empty(shape=0, dtype=numpy.int64)]
+    references: List[numpy.ndarray] = [numpy.empty(shape=0, dtype=numpy.int64)]
+
+    dfs: Iterable[DataFrame]
+    if isinstance(oaDB, ParquetDB):
+        dfs = createDFGeneratorFromParquet(
+            db=oaDB,
+            table="cites",
+            columns=["work", "reference"],
+        )
+    else:
+        dfs = _createDFGeneratorFromSQL(
+            db=oaDB,
+            query="SELECT work, reference FROM cites ORDER BY rowid",
+            chunkSize=chunkSize,
+            dtype={"work": PYARROW_STRING, "reference": PYARROW_STRING},
+        )
+
+    with Spinner(message="Encoding citations...") as spinner:
+        df: DataFrame
+        for df in dfs:
+            df.dropna(inplace=True)
+            works.append(encodeOAIDs(oaIDs=df["work"]))
+            references.append(encodeOAIDs(oaIDs=df["reference"]))
+            spinner.next()
+
+    return CitationGraph.fromEdges(
+        works=numpy.concatenate(works),
+        references=numpy.concatenate(references),
+    )
+
+
+def matchPMTitles(pmDB: Connection, oaDB: Connection | ParquetDB) -> DataFrame:
+    """
+    matchPMTitles Match the standardized titles of the PeaTMOSS arXiv papers to works, as stats.oapm_CountCitationsOfArXivPMPapers does
+
+    Titles that match no work are kept with a NULL OpenAlex ID, so that CitationGraph.matchTitles can tell them apart from titles that were never matched
+
+    :param pmDB: A sqlite3.Connection object of a PeaTMOSS database
+    :type pmDB: Connection
+    :param oaDB: A sqlite3.Connection or ParquetDB object of an OpenAlex database
+    :type oaDB: Connection | ParquetDB
+    :return: A pandas.DataFrame of every standardized title and the OpenAlex ID of the works that it matches
+    :rtype: DataFrame
+    """
+    pmDF: DataFrame = pm_IdentifyPapersPublishedInArXiv(pmDB=pmDB)
+    titles: set[str] = set(_standardizeTextSeries(text=pmDF["title"]).dropna())
+
+    worksDF: DataFrame = oa_MatchWorksByTitle(oaDB=oaDB, titles=titles)
+    unmatchedDF: DataFrame = DataFrame(
+        data={
+            "title": sorted(titles.difference(worksDF["title"])),
+            "oa_id": None,
+        }
+    )
+
+    return pandas.concat(
+        objs=[worksDF[["title", "oa_id"]].astype(dtype=object), unmatchedDF],
+        ignore_index=True,
+    )
+
+
+def createCitationTables(pmDB: Connection, oaDB: Connection) -> None:
+    """
+    createCitationTables Materialize the citation count of every cited work and the works that are PeaTMOSS arXiv papers in the OpenAlex database
+
+    Both tables are rebuilt from scratch. PeaTMOSS papers are matched to works by standardized title, as in stats.oapm_CountCitationsOfArXivPMPapersInSQL
+
+    :param pmDB: A sqlite3.Connection object of a PeaTMOSS database
+    :type pmDB: Connection
+    :param oaDB: A sqlite3.Connection object of an OpenAlex database
+    :type oaDB: Connection
+    """
+    startTime: float = time()
+    oaDB.execute(f"DROP TABLE IF EXISTS {CITATION_COUNTS_TABLE}")
+    oaDB.execute(
+        f"""CREATE TABLE {CITATION_COUNTS_TABLE} (
+            reference TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        ) WITHOUT ROWID"""
+    )
+    oaDB.execute(
+        f"""INSERT INTO {CITATION_COUNTS_TABLE}
+        SELECT reference, COUNT(*) FROM cites
+        WHERE reference IS NOT NULL
+        GROUP BY reference"""
+    )
+    oaDB.commit()
+
+    countQuery: str = f"SELECT COUNT(*) FROM {CITATION_COUNTS_TABLE}"
+    print(
+        f"Counted the citations of {intcomma(value=runOneValueSQLQuery(db=oaDB, query=countQuery)[0])}",
+        f"works in {time() - startTime:.2f} seconds",
+    )
+
+    createStandardizedTitlesTable(db=oaDB)
+
+    startTime = time()
+    pmDF: DataFrame = pm_IdentifyPapersPublishedInArXiv(pmDB=pmDB)
+    titles: List[tuple[str, str]] = list(
+        zip(
+            _standardizeTextSeries(text=pmDF["title"]).tolist(),
+            pmDF["title"].tolist(),
+        )
+    )
+
+    oaDB.execute("DROP TABLE IF EXISTS temp.pm_arxiv_titles")
+    oaDB.execute(
+        "CREATE TEMP TABLE pm_arxiv_titles (standardized_title TEXT PRIMARY KEY, pm_title)"
+    )
+    oaDB.executemany("INSERT OR IGNORE INTO temp.pm_arxiv_titles VALUES (?, ?)", titles)
+
+    oaDB.execute(f"DROP TABLE IF EXISTS {PM_PAPERS_TABLE}")
+    oaDB.execute(
+        f"""CREATE TABLE {PM_PAPERS_TABLE} (
+            oa_id TEXT PRIMARY KEY,
+            pm_title TEXT NOT NULL
+        ) WITHOUT ROWID"""
+    )
+    oaDB.execute(
+        f"""INSERT OR IGNORE INTO {PM_PAPERS_TABLE}
+        SELECT works.oa_id, pm_arxiv_titles.pm_title
+        FROM temp.pm_arxiv_titles
+        JOIN {STANDARDIZED_TITLES_TABLE}
+            ON {STANDARDIZED_TITLES_TABLE}.title = pm_arxiv_titles.standardized_title
+        JOIN works ON works.rowid = {STANDARDIZED_TITLES_TABLE}.work
+        WHERE works.oa_id IS NOT NULL"""
+    )
+    oaDB.execute("DROP TABLE temp.pm_arxiv_titles")
+    oaDB.commit()
+
+    countQuery = f"SELECT COUNT(*) FROM {PM_PAPERS_TABLE}"
+    print(
+        f"Matched {intcomma(value=runOneValueSQLQuery(db=oaDB, query=countQuery)[0])}",
+        f"works to PeaTMOSS arXiv papers in {time() - startTime:.2f} seconds",
+    )
+
+
+def createFTSIndex(db: Connection, dbPath: Path, refresh: bool) -> None:
+    """
+    createFTSIndex Build an FTS5 index of the titles, and abstracts if there are any, of the works table
+
+    The index is an external content table, so the text is not stored twice. It is not updated when rows are added to the works table
+
+    :param db: An sqlite3.Connection object of an OpenAlex database
+    :type db: Connection
+    :param dbPath: Filepath to the SQLite3 database that `db` is connected to
+    :type dbPath: Path
+    :param refresh: Rebuild the index if it already exists
+    :type refresh: bool
+    """
+    query: str = "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?"
+    if db.execute(query, (FTS_TABLE,)).fetchone()[0] > 0:
+        if not refresh:
+            print(f"{FTS_TABLE} already exists in {dbPath}")
+            return
+
+        db.execute(f"DROP TABLE {FTS_TABLE}")
+
+    worksColumns: List[str] = [
+        row[1] for row in db.execute("PRAGMA table_info(works)").fetchall()
+    ]
+    columns: List[str] = [
+        column for column in ["title", "abstract"] if column in worksColumns
+    ]
+
+    startSize: int = dbPath.stat().st_size
+    startTime: float = time()
+
+    db.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({', '.join(columns)}, content='works')"
+    )
+    db.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+    db.commit()
+
+    print(
+        f"Built {FTS_TABLE} over works ({', '.join(columns)})",
+        f"in {time() - startTime:.2f} seconds",
+    )
+    print(
+        f"Database size grew from {naturalsize(value=startSize)} to",
+        naturalsize(value=dbPath.stat().st_size),
+    )
+
+
+@click.group()
+def cli() -> None:
+    pass
+
+
+@cli.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+def indexes(pmPath: Path, oaPath: Path) -> None:
+    """
+    Build the indexes that the stats scripts and Streamlit app rely on
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    assert isFile(path=absPMPath)
+    assert isFile(path=absOAPath)
+
+    pmDB: Connection = connectToDB(dbPath=absPMPath)
+    oaDB: Connection = connectToDB(dbPath=absOAPath)
+
+    createIndexes(db=pmDB, dbPath=absPMPath, indexes=PM_INDEXES)
+
+    dropIndexes(db=oaDB, dbPath=absOAPath, names=OBSOLETE_OA_INDEXES)
+    createStandardizedTitlesTable(db=oaDB)
+    createIndexes(db=oaDB, dbPath=absOAPath, indexes=OA_INDEXES)
+
+
+@cli.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+def citations(pmPath: Path, oaPath: Path) -> None:
+    """
+    Store the citation counts and PeaTMOSS papers that the Streamlit app's citation explorer reads
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    assert isFile(path=absPMPath)
+    assert isFile(path=absOAPath)
+
+    pmDB: Connection = connectToDB(dbPath=absPMPath)
+    oaDB: Connection = connectToDB(dbPath=absOAPath)
+
+    createCitationTables(pmDB=pmDB, oaDB=oaDB)
+
+
+@cli.command()
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+@click.option(
+    "-r",
+    "--refresh",
+    "refresh",
+    is_flag=True,
+    help="Rebuild the index, even if it exists",
+)
+def fts(oaPath: Path, refresh: bool) -> None:
+    """
+    Build the full-text index of work titles for --mode fts and the Streamlit title search
+    """
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    assert isFile(path=absOAPath)
+
+    oaDB: Connection = connectToDB(dbPath=absOAPath)
+
+    createFTSIndex(db=oaDB, dbPath=absOAPath, refresh=refresh)
+
+
+@cli.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database",
+    required=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+@click.option(
+    "-r",
+    "--refresh",
+    "refresh",
+    is_flag=True,
+    help="Recompute every statistic, even if it is up to date",
+)
+@click.option(
+    "-w",
+    "--workers",
+    "workers",
+    type=click.IntRange(min=1),
+    help="Number of processes to scan the OpenAlex tables with",
+    required=False,
+    default=1,
+    show_default=True,
+)
+def summary(pmPath: Path, oaPath: Path, refresh: bool, workers: int) -> None:
+    """
+    Store the dataset-level statistics in the OpenAlex database
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    assert isFile(path=absPMPath)
+    assert isFile(path=absOAPath)
+
+    pmDB: Connection = connectToDB(dbPath=absPMPath)
+    oaDB: Connection = connectToDB(dbPath=absOAPath)
+
+    createSummaryTable(pmDB=pmDB, oaDB=oaDB, refresh=refresh, workers=workers)
+
+
+@cli.command()
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database",
+    required=True,
+)
+@click.option(
+    "-d",
+    "--output-dir",
+    "outputDirectory",
+    type=Path,
+    help="Directory to write the Parquet files to",
+    required=False,
+    default=Path("../../data/parquet"),
+    show_default=True,
+)
+@click.option(
+    "-n",
+    "--rows-per-file",
+    "rowsPerFile",
+    type=click.IntRange(min=1),
+    help="Number of rows per Parquet file",
+    required=False,
+    default=1000000,
+    show_default=True,
+)
+@click.option(
+    "-z",
+    "--compression",
+    "compression",
+    type=click.Choice(choices=PARQUET_COMPRESSIONS),
+    help="Parquet compression codec",
+    required=False,
+    default="zstd",
+    show_default=True,
+)
+def parquet(
+    oaPath: Path,
+    outputDirectory: Path,
+    rowsPerFile: int,
+    compression: str,
+) -> None:
+    """
+    Export the OpenAlex works and cites tables to Parquet for --backend parquet
+    """
+    absOAPath: Path = resolvePath(path=oaPath)
+    absOutputPath: Path = resolvePath(path=outputDirectory)
+
+    assert isFile(path=absOAPath)
+
+    absOutputPath.mkdir(parents=True, exist_ok=True)
+    assert isDirectory(path=absOutputPath)
+
+    oaDB: Connection = connectToDB(dbPath=absOAPath, readOnly=True)
+
+    table: str
+    for table in OA_PARQUET_SCHEMAS.keys():
+        exportParquetTable(
+            db=oaDB,
+            table=table,
+            directory=absOutputPath,
+            rowsPerFile=rowsPerFile,
+            compression=compression,
+        )
+
+
+@cli.command()
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to OpenAlex database, or to its Parquet directory with --backend parquet",
+    required=True,
+)
+@click.option(
+    "--backend",
+    "backend",
+    type=click.Choice(choices=OA_BACKENDS),
+    help="Read the OpenAlex dataset from SQLite or from the files written by prepare.py parquet",
+    required=False,
+    default="sqlite",
+    show_default=True,
+)
+@click.option(
+    "-g",
+    "--graph-dir",
+    "graphDirectory",
+    type=Path,
+    help="Directory to write the citation graph to",
+    required=False,
+    default=Path("../../data/graph"),
+    show_default=True,
+)
+@click.option(
+    "-n",
+    "--chunk-size",
+    "chunkSize",
+    type=click.IntRange(min=1),
+    help="Number of citations to read at a time",
+    required=False,
+    default=1000000,
+    show_default=True,
+)
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to PeaTMOSS database whose arXiv paper titles are matched to works and stored with the graph, so that --graph does not read the works table",
+    required=False,
+    default=None,
+)
+def graph(
+    oaPath: Path,
+    backend: str,
+    graphDirectory: Path,
+    chunkSize: int,
+    pmPath: Path | None,
+) -> None:
+    """
+    Build the integer citation graph that stats.py and plot.py read with --graph
+    """
+    absOAPath: Path = resolvePath(path=oaPath)
+    absGraphPath: Path = resolvePath(path=graphDirectory)
+
+    oaDB: Connection | ParquetDB = connectToOA(oaPath=absOAPath, backend=backend)
+
+    startTime: float = time()
+    citationGraph: CitationGraph = buildCitationGraph(oaDB=oaDB, chunkSize=chunkSize)
+
+    if pmPath is not None:
+        absPMPath: Path = resolvePath(path=pmPath)
+        assert isFile(path=absPMPath)
+
+        citationGraph.titles = matchPMTitles(
+            pmDB=connectToDB(dbPath=absPMPath),
+            oaDB=oaDB,
+        )
+        print(
+            f"Matched {intcomma(value=citationGraph.titles['oa_id'].count())}",
+            "works to PeaTMOSS arXiv papers",
+        )
+
+    citationGraph.save(directory=absGraphPath)
+
+    print(
+        f"Built a graph of {intcomma(value=citationGraph.nodeCount)} works and",
+        f"{intcomma(value=citationGraph.edgeCount)} citations in",
+        f"{time() - startTime:.2f} seconds:",
+        naturalsize(value=citationGraph.nbytes),
+    )
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,12 +1,18 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from importlib.util import find_spec
+from math import ceil
 from pathlib import Path
 from sqlite3 import Connection
-from string import Template
-from typing import Any, Iterable, List
+from typing import Any, Callable, Iterable, List, Tuple
 from urllib.parse import urlparse
 
 import click
+import numpy
 import pandas
 import pandas as pd
+import pyarrow
+import pyarrow.compute as pc
 from humanize import intcomma
 from pandas import DataFrame, Series
 from progress.bar import Bar
@@ -14,18 +20,52 @@ from progress.spinner import Spinner
 from pyfs import isDirectory, isFile, resolvePath
 
 from src.stats import (
-    OA_CITATION_COUNT,
-    OA_DOI_COUNT,
-    OA_OAID_COUNT,
-    OAPM_ARXIV_PM_PAPERS_IN_OA,
+    FTS_TABLE,
+    FTS_TOKEN_PATTERN,
+    SQL_CITATION_COUNT_ORDER,
+    SQL_STANDARDIZED_TITLE,
+    STANDARDIZED_TITLES_TABLE,
+    getDBPath,
+    getTableMaxRowID,
+    readSummaryStatistics,
+    registerSQLFunctions,
     runOneValueSQLQuery,
+    sortCitationCounts,
+    standardizedTitlesAreFresh,
 )
+from src.stats.cache import cached, configureCache
+from src.stats.dag import Stage, runStages
+from src.stats.graph import CitationGraph
+from src.stats.instrument import (
+    PROFILERS,
+    configureInstrumentation,
+    instrumented,
+    trackRows,
+)
+from src.stats.parquet import ParquetDB, createDFGeneratorFromParquet
+
+PYARROW_STRING: str = "string[pyarrow]"
+
+OA_BACKENDS: List[str] = ["sqlite", "parquet"]
+
+CITATION_MODES: List[str] = ["pandas", "sql", "fts"]
+
+# Characters that urllib.parse strips from the start of a URL or removes from it
+_URL_LEADING_CHARACTERS: str = "".join([chr(character) for character in range(33)])
+_URL_UNSAFE_CHARACTERS_PATTERN: str = r"[\t\r\n]"
+_URL_NETLOC_PATTERN: str = r"^(?:[A-Za-z][A-Za-z0-9+\-.]*:)?//([^/?#]*)"
+
+# str.lower() lower cases a final capital sigma to ς and İ to i̇, which pyarrow
+# lower cases to σ and i
+_CONTEXTUAL_LOWER_CASE_PATTERN: str = "[\u03a3\u0130]"
 
 
 def _createDFGeneratorFromSQL(
     db: Connection,
     query: str,
     chunkSize: int = 10000,
+    params: Iterable[Any] | None = None,
+    dtype: dict[str, str] | None = None,
 ) -> Iterable[DataFrame]:
     """
     _createDFGeneratorFromSQL Return a generator of Pandas DataFrames to process large SQL query results
@@ -36,15 +76,30 @@ def _createDFGeneratorFromSQL(
     :type query: str
     :param chunkSize: The number of rows per DataFrame to return, defaults to 10000
     :type chunkSize: int, optional
+    :param params: Values to bind to the `?` placeholders of the query, defaults to None
+    :type params: Iterable[Any] | None, optional
+    :param dtype: Data types to read columns as, defaults to None
+    :type dtype: dict[str, str] | None, optional
     :return: A generator of Pandas DataFrames
     :rtype: _type_
     :yield: A pandas.DataFrame
     :rtype: Iterable[DataFrame]
     """
-    return pd.read_sql_query(query, con=db, chunksize=chunkSize)
+    return pd.read_sql_query(
+        query,
+        con=db,
+        chunksize=chunkSize,
+        params=params,
+        dtype=dtype,
+    )
 
 
-def _createDFFromSQL(db: Connection, query: str) -> DataFrame:
+def _createDFFromSQL(
+    db: Connection,
+    query: str,
+    params: Iterable[Any] | None = None,
+    dtype: dict[str, str] | None = None,
+) -> DataFrame:
     """
     _createDFFromSQL Return a Pandas DataFrame of the results from a SQL query
 
@@ -54,10 +109,14 @@ def _createDFFromSQL(db: Connection, query: str) -> DataFrame:
     :type db: Connection
     :param query: The SQLite3 compatible query to run
     :type query: str
+    :param params: Values to bind to the `?` placeholders of the query, defaults to None
+    :type params: Iterable[Any] | None, optional
+    :param dtype: Data types to read columns as, defaults to None
+    :type dtype: dict[str, str] | None, optional
     :return: A pandas.DataFrame of the SQL query results
     :rtype: DataFrame
     """
-    return pd.read_sql_query(query, con=db)
+    return pd.read_sql_query(query, con=db, params=params, dtype=dtype)
 
 
 def _extractNetLoc(url: str) -> str:
@@ -99,73 +158,414 @@ def _standardizeText(text: str) -> str:
     return text.strip().lower()
 
 
-def connectToDB(dbPath: Path) -> Connection:
+def _extractNetLocSeries(urls: Series) -> Series:
+    """
+    _extractNetLocSeries Vectorized equivalent of _extractNetLoc
+
+    :param urls: A pandas.Series of URLs to parse
+    :type urls: Series
+    :return: A pandas.Series of the netloc attribute of each URL
+    :rtype: Series
+    """
+    return (
+        urls.str.lstrip(to_strip=_URL_LEADING_CHARACTERS)
+        .str.replace(pat=_URL_UNSAFE_CHARACTERS_PATTERN, repl="", regex=True)
+        .str.extract(pat=_URL_NETLOC_PATTERN, expand=False)
+        .fillna(value="")
+    )
+
+
+def _convertToArXivDOISeries(arxivURLs: Series) -> Series:
+    """
+    _convertToArXivDOISeries Vectorized equivalent of _convertToArXivDOI
+
+    :param arxivURLs: A pandas.Series of arXiv compatible URLs
+    :type arxivURLs: Series
+    :return: A pandas.Series of arXiv compatible DOIs
+    :rtype: Series
+    """
+    return arxivURLs.str.replace(
+        pat="https://arxiv.org/abs/",
+        repl="10.48550/arxiv.",
+        regex=False,
+    )
+
+
+def _standardizeTextSeries(text: Series) -> Series:
+    """
+    _standardizeTextSeries Vectorized equivalent of _standardizeText
+
+    Run on a string[pyarrow] Series so that pyarrow compute kernels are used instead of a Python call per row. pyarrow lower cases every character on its own, so the rows that str.lower() lower cases differently are standardized by _standardizeText
+
+    :param text: A pandas.Series of text to format
+    :type text: Series
+    :return: A pandas.Series of formatted text
+    :rtype: Series
+    """
+    standardized: Series = text.str.strip().str.lower()
+
+    contextual: Series = (
+        text.str.contains(
+            pat=_CONTEXTUAL_LOWER_CASE_PATTERN,
+            regex=True,
+        )
+        .fillna(value=False)
+        .astype(dtype=bool)
+    )
+    if contextual.any():
+        standardized[contextual] = text[contextual].map(arg=_standardizeText)
+
+    return standardized
+
+
+def _createRowIDRanges(
+    db: Connection,
+    table: str,
+    partitions: int,
+) -> List[Tuple[int, int]]:
+    """
+    _createRowIDRanges Split the rowids of a table into inclusive, contiguous ranges
+
+    :param db: An sqlite3.Connection object
+    :type db: Connection
+    :param table: The name of the table to split
+    :type table: str
+    :param partitions: The number of ranges to split the table into
+    :type partitions: int
+    :return: A list of (low, high) rowid tuples
+    :rtype: List[Tuple[int, int]]
+    """
+    query: str = f"SELECT MIN(rowid), MAX(rowid) FROM {table}"
+    minRowID: int | None
+    maxRowID: int | None
+    minRowID, maxRowID = runOneValueSQLQuery(db=db, query=query)
+
+    if minRowID is None:
+        return []
+
+    step: int = ceil((maxRowID - minRowID + 1) / partitions)
+    return [
+        (low, min(low + step - 1, maxRowID))
+        for low in range(minRowID, maxRowID + 1, step)
+    ]
+
+
+def _scanRowIDRange(
+    dbPath: Path,
+    query: str,
+    chunkFunction: Callable[[DataFrame], Any],
+    dtype: dict[str, str] | None,
+    rowIDRange: Tuple[int, int],
+) -> Tuple[int, List[Any]]:
+    """
+    _scanRowIDRange Apply a function to every chunk of a query over a rowid range
+
+    Meant to be ran in a worker process; a read-only connection is opened per call
+
+    :param dbPath: Filepath to a SQLite3 database
+    :type dbPath: Path
+    :param query: A SQLite3 compatible query containing `rowid BETWEEN ? AND ?`
+    :type query: str
+    :param chunkFunction: A function to apply to every DataFrame chunk
+    :type chunkFunction: Callable[[DataFrame], Any]
+    :param dtype: Data types to read columns as
+    :type dtype: dict[str, str] | None
+    :param rowIDRange: The inclusive (low, high) rowid range to scan
+    :type rowIDRange: Tuple[int, int]
+    :return: The number of rows read and a list of the results of `chunkFunction`
+    :rtype: Tuple[int, List[Any]]
+    """
+    rows: int = 0
+    partials: List[Any] = []
+
+    db: Connection = connectToDB(dbPath=dbPath, readOnly=True)
+    dfs: Iterable[DataFrame] = _createDFGeneratorFromSQL(
+        db=db,
+        query=query,
+        params=rowIDRange,
+        dtype=dtype,
+    )
+
+    df: DataFrame
+    for df in dfs:
+        rows += df.shape[0]
+        partials.append(chunkFunction(df))
+
+    db.close()
+    return (rows, partials)
+
+
+def _scanTableInParallel(
+    db: Connection,
+    table: str,
+    query: str,
+    chunkFunction: Callable[[DataFrame], Any],
+    workers: int,
+    message: str,
+    dtype: dict[str, str] | None = None,
+) -> List[Any]:
+    """
+    _scanTableInParallel Split a table into rowid ranges and scan them in worker processes
+
+    Results are returned in rowid order, so merging them gives the same result as a sequential scan that is ordered by rowid
+
+    :param db: An sqlite3.Connection object
+    :type db: Connection
+    :param table: The name of the table that `query` reads from
+    :type table: str
+    :param query: A SQLite3 compatible query containing `rowid BETWEEN ? AND ?`, ordered by rowid
+    :type query: str
+    :param chunkFunction: A picklable function to apply to every DataFrame chunk
+    :type chunkFunction: Callable[[DataFrame], Any]
+    :param workers: The number of worker processes to use
+    :type workers: int
+    :param message: The progress bar message
+    :type message: str
+    :param dtype: Data types to read columns as, defaults to None
+    :type dtype: dict[str, str] | None, optional
+    :return: A list of the results of `chunkFunction` across all ranges
+    :rtype: List[Any]
+    """
+    partials: List[Any] = []
+
+    # More ranges than workers keeps the workers busy when the rows are skewed
+    rowIDRanges: List[Tuple[int, int]] = _createRowIDRanges(
+        db=db,
+        table=table,
+        partitions=workers * 4,
+    )
+    scanFunction: Callable[[Tuple[int, int]], Tuple[int, List[Any]]] = partial(
+        _scanRowIDRange,
+        getDBPath(db=db),
+        query,
+        chunkFunction,
+        dtype,
+    )
+
+    if len(rowIDRanges) == 0:
+        return partials
+
+    # The display follows the rowid ranges so that the ETA holds for queries
+    # that drop rows
+    minRowID: int = rowIDRanges[0][0]
+    totalRows: int = rowIDRanges[-1][1] - minRowID + 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        with trackRows(message=message, totalRows=totalRows) as bar:
+            rowIDRange: Tuple[int, int]
+            rangeRows: int
+            rangePartials: List[Any]
+            for rowIDRange, (rangeRows, rangePartials) in zip(
+                rowIDRanges,
+                executor.map(scanFunction, rowIDRanges),
+            ):
+                partials.extend(rangePartials)
+                bar.next(rangeRows, position=rowIDRange[1] - minRowID + 1)
+
+    return partials
+
+
+def _getValidDOIs(df: DataFrame) -> set[str]:
+    """
+    _getValidDOIs Return the DOIs of a chunk that are not the " " placeholder or NULL
+
+    :param df: A pandas.DataFrame with a `doi` column
+    :type df: DataFrame
+    :return: A set of DOIs
+    :rtype: set[str]
+    """
+    return set(df["doi"].replace(to_replace=" ", value=None).dropna())
+
+
+def _getDOIsInArXivURLs(df: DataFrame, arxivURLs: set[str]) -> set[str]:
+    """
+    _getDOIsInArXivURLs Return the DOIs of a chunk that match a PeaTMOSS arXiv DOI once standardized
+
+    :param df: A pandas.DataFrame with a `doi` column
+    :type df: DataFrame
+    :param arxivURLs: The arXiv DOIs of PeaTMOSS papers
+    :type arxivURLs: set[str]
+    :return: A set of the unstandardized DOIs that matched
+    :rtype: set[str]
+    """
+    return set(df["doi"][_standardizeTextSeries(text=df["doi"]).isin(arxivURLs)])
+
+
+def _filterWorksByTitle(df: DataFrame, titles: set[str]) -> DataFrame:
+    """
+    _filterWorksByTitle Return the works of a chunk whose standardized title is in `titles`
+
+    :param df: A pandas.DataFrame with a `title` column
+    :type df: DataFrame
+    :param titles: Standardized titles to keep
+    :type titles: set[str]
+    :return: The filtered chunk with standardized titles
+    :rtype: DataFrame
+    """
+    df["title"] = _standardizeTextSeries(text=df["title"])
+    return df[df["title"].isin(titles)]
+
+
+def _filterCitesByReference(df: DataFrame, oaIDs: set[str]) -> DataFrame:
+    """
+    _filterCitesByReference Return the citations of a chunk that reference one of `oaIDs`
+
+    :param df: A pandas.DataFrame with a `reference` column
+    :type df: DataFrame
+    :param oaIDs: OpenAlex IDs of the works to keep citations of
+    :type oaIDs: set[str]
+    :return: The filtered chunk
+    :rtype: DataFrame
+    """
+    return df[df["reference"].isin(oaIDs)]
+
+
+def connectToDB(dbPath: Path, readOnly: bool = False) -> Connection:
     """
     connectToDB Connect to a SQLite3 database and return the sqlite3.Connection object
 
+    The SQL functions of registerSQLFunctions are registered on the connection
+
     :param dbPath: Filepath to a SQLite3 database
     :type dbPath: Path
+    :param readOnly: Open the database in read-only mode, defaults to False
+    :type readOnly: bool, optional
     :return: The sqlite3.Connection object
     :rtype: Connection
     """
-    return Connection(database=dbPath)
+    db: Connection
+    if readOnly:
+        db = Connection(database=f"file:{dbPath}?mode=ro", uri=True)
+    else:
+        db = Connection(database=dbPath)
+
+    registerSQLFunctions(db=db)
+    return db
+
+
+def connectToOA(oaPath: Path, backend: str) -> Connection | ParquetDB:
+    """
+    connectToOA Open an OpenAlex dataset with one of the OA_BACKENDS
+
+    :param oaPath: Filepath to a SQLite3 database, or to a directory written by `prepare.py parquet`
+    :type oaPath: Path
+    :param backend: One of OA_BACKENDS
+    :type backend: str
+    :return: A sqlite3.Connection or ParquetDB object
+    :rtype: Connection | ParquetDB
+    """
+    if backend == "parquet":
+        assert isDirectory(path=oaPath)
+        return ParquetDB(directory=oaPath)
+
+    assert isFile(path=oaPath)
+    return connectToDB(dbPath=oaPath)
+
+
+@instrumented()
+def loadCitationGraph(graphPath: Path | None) -> CitationGraph | None:
+    """
+    loadCitationGraph Memory-map the citation graph written by `prepare.py graph` if a path is given
 
+    :param graphPath: Path to a citation graph directory, or None
+    :type graphPath: Path | None
+    :return: A CitationGraph object, or None if `graphPath` is None
+    :rtype: CitationGraph | None
+    """
+    if graphPath is None:
+        return None
+
+    absGraphPath: Path = resolvePath(path=graphPath)
+    assert isDirectory(path=absGraphPath)
+    return CitationGraph.load(directory=absGraphPath)
 
+
+@instrumented()
+@cached()
 def oa_CountPapersByDOI(
-    oaDB: Connection,
-    returnDefault: bool = True,
+    oaDB: Connection | ParquetDB,
+    workers: int = 1,
 ) -> int:
     """
     oa_CountPapersByDOI Count the number of papers within an OpenAlex dataset by the unique DOI
 
-    DOIs that contain a space are excluded from the count
+    DOIs that contain a space are excluded from the count. The value is read from the summary table if `prepare.py summary` stored an up to date value
 
-    :param oaDB: A sqlite3.Connection object to an OpenAlex dataset
-    :type oaDB: Connection
-    :param returnDefault: Skip computing the value and use the pre-computed value, defaults to True
-    :type returnDefault: bool, optional
+    :param oaDB: A sqlite3.Connection or ParquetDB object to an OpenAlex dataset
+    :type oaDB: Connection | ParquetDB
+    :param workers: The number of processes to scan the works table with, defaults to 1. Ignored by the Parquet backend
+    :type workers: int, optional
     :return: The number of papers in the dataset that have a unqiue DOI
     :rtype: int
     """
-    if returnDefault:
-        return OA_DOI_COUNT
+    if isinstance(oaDB, ParquetDB):
+        # Comparing against the placeholder also filters out NULL DOIs
+        works: pyarrow.Table = oaDB.dataset(table="works").to_table(
+            columns=["doi"],
+            filter=pc.field("doi") != " ",
+        )
+        return pc.count_distinct(works["doi"]).as_py()
+
+    summary: dict[str, int] = readSummaryStatistics(db=oaDB)
+
+    if "oa_doi_count" in summary:
+        return summary["oa_doi_count"]
+    elif workers > 1:
+        query: str = "SELECT DISTINCT doi FROM works WHERE rowid BETWEEN ? AND ?"
+        doiSets: List[set[str]] = _scanTableInParallel(
+            db=oaDB,
+            table="works",
+            query=query,
+            chunkFunction=_getValidDOIs,
+            workers=workers,
+            message="Counting number of papers in OpenAlex by DOI...",
+        )
+        return len(set().union(*doiSets))
     else:
         doiCount: int = 0
         query: str = "SELECT DISTINCT doi FROM works"
         dfs: Iterable[DataFrame] = _createDFGeneratorFromSQL(db=oaDB, query=query)
 
-        with Spinner(
+        with trackRows(
             message="Counting number of papers in OpenAlex by DOI...",
-        ) as spinner:
+            totalRows=getTableMaxRowID(db=oaDB, table="works"),
+        ) as bar:
             df: DataFrame
             for df in dfs:
+                bar.next(df.shape[0])
                 df["doi"] = df["doi"].replace(to_replace=" ", value=None)
                 df.dropna(inplace=True)
                 doiCount += df.shape[0]
-                spinner.next()
 
         return doiCount
 
 
+@instrumented()
+@cached()
 def oa_CountPapersByOAID(
-    oaDB: Connection,
-    returnDefault: bool = True,
+    oaDB: Connection | ParquetDB,
 ) -> int:
     """
     oa_CountPapersByOAID Count the number of papers within an OpenAlex dataset by the unique OpenAlex ID
 
-    :param oaDB: A sqlite3.Connection object to an OpenAlex dataset
-    :type oaDB: Connection
-    :param returnDefault: Skip computing the value and use the pre-computed value, defaults to True
-    :type returnDefault: bool, optional
+    The value is read from the summary table if `prepare.py summary` stored an up to date value
+
+    :param oaDB: A sqlite3.Connection or ParquetDB object to an OpenAlex dataset
+    :type oaDB: Connection | ParquetDB
     :return: The number of papers in the dataset that have a unqiue OpenAlex ID
     :rtype: int
     """
+    if isinstance(oaDB, ParquetDB):
+        works: pyarrow.Table = oaDB.dataset(table="works").to_table(columns=["oa_id"])
+        return pc.count_distinct(works["oa_id"]).as_py()
+
+    summary: dict[str, int] = readSummaryStatistics(db=oaDB)
+
+    if "oa_oaid_count" in summary:
+        return summary["oa_oaid_count"]
+
     query: str = "SELECT COUNT(DISTINCT oa_id) FROM works"
-    if returnDefault:
-        return OA_OAID_COUNT
-    else:
-        return runOneValueSQLQuery(db=oaDB, query=query)[0]
+    return runOneValueSQLQuery(db=oaDB, query=query)[0]
 
 
 def oa_ProportionOfValidPapers(oaIDCount: int, oaDOICount: int) -> float:
@@ -182,25 +582,32 @@ def oa_ProportionOfValidPapers(oaIDCount: int, oaDOICount: int) -> float:
     return oaDOICount / oaIDCount
 
 
+@instrumented()
+@cached()
 def oa_CountCitations(
-    oaDB: Connection,
-    returnDefault: bool = True,
+    oaDB: Connection | ParquetDB,
 ) -> int:
     """
     oa_CountCitations Return the number of citations in an OpenAlex database
 
-    :param oaDB: A  sqlite3.Connection object to an OpenAlex dataset
-    :type oaDB: Connection
-    :param returnDefault: Skip computing the value and use the pre-computed value, defaults to True
-    :type returnDefault: bool, optional
+    The value is read from the summary table if `prepare.py summary` stored an up to date value
+
+    :param oaDB: A  sqlite3.Connection or ParquetDB object to an OpenAlex dataset
+    :type oaDB: Connection | ParquetDB
     :return: The number of citations in the OpenAlex dataset
     :rtype: int
     """
+    if isinstance(oaDB, ParquetDB):
+        cites: pyarrow.Table = oaDB.dataset(table="cites").to_table(columns=["id"])
+        return pc.max(cites["id"]).as_py()
+
+    summary: dict[str, int] = readSummaryStatistics(db=oaDB)
+
+    if "oa_citation_count" in summary:
+        return summary["oa_citation_count"]
+
     query: str = "SELECT id FROM cites ORDER BY id DESC LIMIT 1"
-    if returnDefault:
-        return OA_CITATION_COUNT
-    else:
-        return runOneValueSQLQuery(db=oaDB, query=query)[0]
+    return runOneValueSQLQuery(db=oaDB, query=query)[0]
 
 
 def oapm_ProportionOfPMPapersInOA(
@@ -220,10 +627,12 @@ def oapm_ProportionOfPMPapersInOA(
     return pmPapers / oaPapers
 
 
+@instrumented()
+@cached()
 def oapm_CountPMArXivPapersInOA(
     pmDB: Connection,
-    oaDB: Connection,
-    returnDefault: bool = True,
+    oaDB: Connection | ParquetDB,
+    workers: int = 1,
 ) -> int:
     """
     oapm_CountPMArXivPapersInOA Count the number of PeaTMOSS arXiv papers in OpenAlex
@@ -232,94 +641,397 @@ def oapm_CountPMArXivPapersInOA(
 
     :param pmDB: A sqlite3.Connection object of a PeaTMOSS database
     :type pmDB: Connection
-    :param oaDB: A sqlite3.Connection object of an OpenAlex database
-    :type oaDB: Connection
-    :param returnDefault: Skip computing the value and use the pre-computed value, defaults to True
-    :type returnDefault: bool, optional
+    :param oaDB: A sqlite3.Connection or ParquetDB object of an OpenAlex database
+    :type oaDB: Connection | ParquetDB
+    :param workers: The number of processes to scan the works table with, defaults to 1. Ignored by the Parquet backend
+    :type workers: int, optional
     :return: The number of PeaTMOSS arXiv papers in OpenAlex
     :rtype: int
     """
-    if returnDefault:
-        return OAPM_ARXIV_PM_PAPERS_IN_OA
-
     count: int = 0
 
     oaQuery: str = "SELECT DISTINCT doi FROM works"
 
     arxivPMDF: DataFrame = pm_IdentifyPapersPublishedInArXiv(pmDB=pmDB)
+    arxivURLs: set[str] = set(arxivPMDF["url"])
+    message: str = "Counting the number of PeaTMOSS papers published in arXiv that are captured in OpenAlex..."
+
+    if isinstance(oaDB, ParquetDB):
+        # Parquet files are not deduplicated, so DOIs are merged across chunks
+        dois: set[str] = set()
+        oaDFs: Iterable[DataFrame] = createDFGeneratorFromParquet(
+            db=oaDB,
+            table="works",
+            columns=["doi"],
+        )
+
+        with trackRows(
+            message=message,
+            totalRows=oaDB.dataset(table="works").count_rows(),
+        ) as bar:
+            df: DataFrame
+            for df in oaDFs:
+                dois.update(_getDOIsInArXivURLs(df=df, arxivURLs=arxivURLs))
+                bar.next(df.shape[0])
+
+        return len(dois)
+    elif workers > 1:
+        doiSets: List[set[str]] = _scanTableInParallel(
+            db=oaDB,
+            table="works",
+            query=f"{oaQuery} WHERE rowid BETWEEN ? AND ?",
+            chunkFunction=partial(_getDOIsInArXivURLs, arxivURLs=arxivURLs),
+            workers=workers,
+            message=message,
+            dtype={"doi": PYARROW_STRING},
+        )
+        return len(set().union(*doiSets))
 
     oaDFs: Iterable[DataFrame] = _createDFGeneratorFromSQL(
         db=oaDB,
         query=oaQuery,
+        dtype={"doi": PYARROW_STRING},
     )
 
-    with Spinner(
-        message="Counting the number of PeaTMOSS papers published in arXiv that are captured in OpenAlex...",
-    ) as spinner:
+    with trackRows(
+        message=message,
+        totalRows=getTableMaxRowID(db=oaDB, table="works"),
+    ) as bar:
         df: DataFrame
         for df in oaDFs:
-            df["doi"] = df["doi"].apply(_standardizeText)
-            count += df[df["doi"].isin(arxivPMDF["url"])].shape[0]
-            spinner.next()
+            count += len(_getDOIsInArXivURLs(df=df, arxivURLs=arxivURLs))
+            bar.next(df.shape[0])
 
     return count
 
 
+def oa_MatchWorksByTitle(
+    oaDB: Connection | ParquetDB,
+    titles: set[str],
+    workers: int = 1,
+) -> DataFrame:
+    """
+    oa_MatchWorksByTitle Return the works of an OpenAlex dataset whose standardized title is in `titles`
+
+    :param oaDB: A sqlite3.Connection or ParquetDB of a OpenAlex database
+    :type oaDB: Connection | ParquetDB
+    :param titles: Standardized titles to match
+    :type titles: set[str]
+    :param workers: The number of processes to scan the works table with, defaults to 1. Ignored by the Parquet backend
+    :type workers: int, optional
+    :return: A pandas.DataFrame of the OpenAlex ID and standardized title of the matched works, in rowid order
+    :rtype: DataFrame
+    """
+    worksQuery: str = "SELECT oa_id, title FROM works"
+    worksMessage: str = "Identifying rows with relevant arXiv papers..."
+
+    relevantWorksDFs: List[DataFrame] = []
+
+    if isinstance(oaDB, ParquetDB):
+        oaWorksDFs: Iterable[DataFrame] = createDFGeneratorFromParquet(
+            db=oaDB,
+            table="works",
+            columns=["oa_id", "title"],
+        )
+
+        with trackRows(
+            message=worksMessage,
+            totalRows=oaDB.dataset(table="works").count_rows(),
+        ) as bar:
+            df: DataFrame
+            for df in oaWorksDFs:
+                relevantWorksDFs.append(_filterWorksByTitle(df=df, titles=titles))
+                bar.next(df.shape[0])
+    elif workers > 1:
+        relevantWorksDFs = _scanTableInParallel(
+            db=oaDB,
+            table="works",
+            query=f"{worksQuery} WHERE rowid BETWEEN ? AND ? ORDER BY rowid",
+            chunkFunction=partial(_filterWorksByTitle, titles=titles),
+            workers=workers,
+            message=worksMessage,
+            dtype={"title": PYARROW_STRING},
+        )
+    else:
+        oaWorksDFs: Iterable[DataFrame] = _createDFGeneratorFromSQL(
+            db=oaDB,
+            query=f"{worksQuery} ORDER BY rowid",
+            dtype={"title": PYARROW_STRING},
+        )
+
+        with trackRows(
+            message=worksMessage,
+            totalRows=getTableMaxRowID(db=oaDB, table="works"),
+        ) as bar:
+            df: DataFrame
+            for df in oaWorksDFs:
+                relevantWorksDFs.append(_filterWorksByTitle(df=df, titles=titles))
+                bar.next(df.shape[0])
+
+    return pandas.concat(
+        objs=relevantWorksDFs,
+        ignore_index=True,
+    )
+
+
+@instrumented()
+@cached()
 def oapm_CountCitationsOfArXivPMPapers(
     pmDB: Connection,
-    oaDB: Connection,
+    oaDB: Connection | ParquetDB,
+    workers: int = 1,
+    graph: CitationGraph | None = None,
 ) -> Series:
     """
     oapm_CountCitationsOfArXivPMPapers Count the number of OpenAlex papers that cite PeatMOSS arXiv papers
 
+    With the Parquet backend, only the citations of the matched works are read from the cites files. With a `graph`, the cites table is not read at all and citations are counted from the in-degree of the matched works. The works table is not read either if the graph was built with the titles of the PeaTMOSS arXiv papers matched to works
+
     :param pmDB: A sqlite3.Connection of a PeaTMOSS database
     :type pmDB: Connection
-    :param oaDB: A sqlite3.Connection of a OpenAlex database
-    :type oaDB: Connection
-    :return: A Series of the number of citations a PeaTMOSS arXiv paper recieved
+    :param oaDB: A sqlite3.Connection or ParquetDB of a OpenAlex database
+    :type oaDB: Connection | ParquetDB
+    :param workers: The number of processes to scan the works and cites tables with, defaults to 1. Ignored by the Parquet backend
+    :type workers: int, optional
+    :param graph: A CitationGraph of the OpenAlex database, defaults to None
+    :type graph: CitationGraph | None, optional
+    :return: A Series of the number of citations a PeaTMOSS arXiv paper recieved, ordered by sortCitationCounts
     :rtype: Series
     """
-    worksQuery: str = "SELECT oa_id, title FROM works"
     citesQuery: str = "SELECT reference FROM cites"
 
-    relevantWorksDFs: List[DataFrame] = []
     relevantCitesDFs: List[DataFrame] = []
 
     pmDF: DataFrame = pm_IdentifyPapersPublishedInArXiv(pmDB=pmDB)
-    pmDF["title"] = pmDF["title"].apply(_standardizeText)
+    pmTitles: set[str] = set(_standardizeTextSeries(text=pmDF["title"]))
 
-    oaWorksDFs: Iterable[DataFrame] = _createDFGeneratorFromSQL(
-        db=oaDB,
-        query=worksQuery,
-    )
-    oaCitesDFs: Iterable[DataFrame] = _createDFGeneratorFromSQL(
-        db=oaDB,
-        query=citesQuery,
+    citesMessage: str = "Identifying rows that cite arXiv papers..."
+
+    if graph is not None:
+        graphOAIDs: List[str] | None = graph.matchTitles(titles=pmTitles)
+        if graphOAIDs is not None:
+            return graph.countCitations(oaIDs=graphOAIDs)
+
+    oaWorksDF: DataFrame = oa_MatchWorksByTitle(
+        oaDB=oaDB,
+        titles=pmTitles,
+        workers=workers,
     )
+    oaIDs: set[str] = set(oaWorksDF["oa_id"])
 
-    with Spinner(message="Identifying rows with relevant arXiv papers...") as spinner:
-        df: DataFrame
-        for df in oaWorksDFs:
-            df["title"] = df["title"].apply(_standardizeText)
-            relevantWorksDFs.append(df[df["title"].isin(pmDF["title"])])
-            spinner.next()
+    if graph is not None:
+        return graph.countCitations(oaIDs=list(oaIDs))
 
-    oaWorksDF: DataFrame = pandas.concat(
-        objs=relevantWorksDFs,
-        ignore_index=True,
+    if isinstance(oaDB, ParquetDB):
+        oaCitesDFs: Iterable[DataFrame] = createDFGeneratorFromParquet(
+            db=oaDB,
+            table="cites",
+            columns=["reference"],
+            filter=pc.field("reference").isin(list(oaIDs)),
+        )
+
+        # Only the citations of the matched works are read, so their number is
+        # not known upfront
+        with trackRows(message=citesMessage) as bar:
+            df: DataFrame
+            for df in oaCitesDFs:
+                relevantCitesDFs.append(df)
+                bar.next(df.shape[0])
+    elif workers > 1:
+        relevantCitesDFs = _scanTableInParallel(
+            db=oaDB,
+            table="cites",
+            query=f"{citesQuery} WHERE rowid BETWEEN ? AND ? ORDER BY rowid",
+            chunkFunction=partial(_filterCitesByReference, oaIDs=oaIDs),
+            workers=workers,
+            message=citesMessage,
+        )
+    else:
+        # Without ORDER BY, SQLite reads the cites index in reference order
+        # rather than in the rowid order of the parallel scan
+        oaCitesDFs: Iterable[DataFrame] = _createDFGeneratorFromSQL(
+            db=oaDB,
+            query=f"{citesQuery} ORDER BY rowid",
+        )
+
+        with trackRows(
+            message=citesMessage,
+            totalRows=getTableMaxRowID(db=oaDB, table="cites"),
+        ) as bar:
+            df: DataFrame
+            for df in oaCitesDFs:
+                relevantCitesDFs.append(_filterCitesByReference(df=df, oaIDs=oaIDs))
+                bar.next(df.shape[0])
+
+    # object dtype keeps the index identical across backends
+    return sortCitationCounts(
+        counts=pandas.concat(objs=relevantCitesDFs, ignore_index=True)["reference"]
+        .astype(dtype=object)
+        .value_counts(sort=False)
     )
 
-    with Spinner(message="Identifying rows that cite arXiv papers...") as spinner:
-        df: DataFrame
-        for df in oaCitesDFs:
-            relevantCitesDFs.append(df[df["reference"].isin(oaWorksDF["oa_id"])])
-            spinner.next()
 
-    return pandas.concat(objs=relevantCitesDFs, ignore_index=True)[
-        "reference"
-    ].value_counts(sort=True)
+@instrumented()
+@cached()
+def oapm_CountCitationsOfArXivPMPapersInSQL(
+    pmDB: Connection,
+    oaDB: Connection,
+) -> Series:
+    """
+    oapm_CountCitationsOfArXivPMPapersInSQL Count the number of OpenAlex papers that cite PeatMOSS arXiv papers within SQLite
 
+    Equivalent to oapm_CountCitationsOfArXivPMPapers, but the standardized PeaTMOSS arXiv titles are loaded into a temporary table and the citations are counted with one indexed query against the standardized titles stored by `prepare.py indexes`. Without them, or if works were added since, every title of the works table is standardized instead, with the SQL function that connectToDB registers on `oaDB`
 
+    :param pmDB: A sqlite3.Connection of a PeaTMOSS database
+    :type pmDB: Connection
+    :param oaDB: A sqlite3.Connection of a OpenAlex database
+    :type oaDB: Connection
+    :return: A Series of the number of citations a PeaTMOSS arXiv paper recieved
+    :rtype: Series
+    """
+    worksQuery: str = f"""
+        SELECT oa_id FROM works WHERE rowid IN (
+            SELECT work FROM {STANDARDIZED_TITLES_TABLE}
+            WHERE title IN (SELECT title FROM temp.pm_arxiv_titles)
+        )
+    """
+    if not standardizedTitlesAreFresh(db=oaDB):
+        print(
+            f"{STANDARDIZED_TITLES_TABLE} is missing or out of date, run `prepare.py indexes` to match titles with an index"
+        )
+        worksQuery = f"""
+            SELECT oa_id FROM works WHERE {SQL_STANDARDIZED_TITLE} IN (
+                SELECT title FROM temp.pm_arxiv_titles
+            )
+        """
+
+    citesQuery: str = f"""
+        SELECT reference, COUNT(*) AS count FROM cites
+        WHERE reference IN ({worksQuery})
+        GROUP BY reference
+        ORDER BY {SQL_CITATION_COUNT_ORDER}
+    """
+
+    pmDF: DataFrame = pm_IdentifyPapersPublishedInArXiv(pmDB=pmDB)
+    titles: List[tuple[str]] = [
+        (title,) for title in _standardizeTextSeries(text=pmDF["title"]).unique()
+    ]
+
+    oaDB.execute("DROP TABLE IF EXISTS temp.pm_arxiv_titles")
+    oaDB.execute("CREATE TEMP TABLE pm_arxiv_titles (title TEXT PRIMARY KEY)")
+    oaDB.executemany("INSERT INTO temp.pm_arxiv_titles VALUES (?)", titles)
+
+    with Spinner(message="Counting citations of arXiv papers in SQLite...") as spinner:
+        df: DataFrame = _createDFFromSQL(db=oaDB, query=citesQuery)
+        spinner.next()
+
+    oaDB.execute("DROP TABLE temp.pm_arxiv_titles")
+
+    return df.set_index(keys="reference")["count"]
+
+
+@instrumented()
+@cached()
+def oapm_CountCitationsOfArXivPMPapersInFTS(
+    pmDB: Connection,
+    oaDB: Connection,
+) -> Series:
+    """
+    oapm_CountCitationsOfArXivPMPapersInFTS Count the number of OpenAlex papers that cite PeatMOSS arXiv papers with the full-text index of work titles
+
+    Equivalent to oapm_CountCitationsOfArXivPMPapersInSQL, but the candidate works of each standardized PeaTMOSS arXiv title are found with a phrase query against the FTS5 index before their titles are compared exactly. Run `prepare.py fts` first.
+
+    :param pmDB: A sqlite3.Connection of a PeaTMOSS database
+    :type pmDB: Connection
+    :param oaDB: A sqlite3.Connection of a OpenAlex database
+    :type oaDB: Connection
+    :return: A Series of the number of citations a PeaTMOSS arXiv paper recieved
+    :rtype: Series
+    """
+    worksQuery: str = f"""
+        SELECT oa_id FROM works
+        WHERE rowid IN (
+            SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?
+        ) AND {SQL_STANDARDIZED_TITLE} = ?
+    """
+    citesQuery: str = f"""
+        SELECT reference, COUNT(*) AS count FROM cites
+        WHERE reference IN (SELECT oa_id FROM temp.pm_arxiv_works)
+        GROUP BY reference
+        ORDER BY {SQL_CITATION_COUNT_ORDER}
+    """
+
+    pmDF: DataFrame = pm_IdentifyPapersPublishedInArXiv(pmDB=pmDB)
+    titles: List[str] = list(_standardizeTextSeries(text=pmDF["title"]).unique())
+
+    oaIDs: set[tuple[str]] = set()
+    with Bar(
+        "Matching arXiv paper titles in the full-text index...", max=len(titles)
+    ) as bar:
+        title: str
+        for title in titles:
+            bar.next()
+
+            # Titles without any tokens can not be phrase queried
+            if FTS_TOKEN_PATTERN.search(title) is None:
+                continue
+
+            phrase: str = '"' + title.replace('"', '""') + '"'
+            oaIDs.update(
+                oaDB.execute(worksQuery, (f"title : {phrase}", title)).fetchall()
+            )
+
+    oaDB.execute("DROP TABLE IF EXISTS temp.pm_arxiv_works")
+    oaDB.execute("CREATE TEMP TABLE pm_arxiv_works (oa_id TEXT PRIMARY KEY)")
+    oaDB.executemany("INSERT INTO temp.pm_arxiv_works VALUES (?)", oaIDs)
+
+    with Spinner(message="Counting citations of arXiv papers in SQLite...") as spinner:
+        df: DataFrame = _createDFFromSQL(db=oaDB, query=citesQuery)
+        spinner.next()
+
+    oaDB.execute("DROP TABLE temp.pm_arxiv_works")
+
+    return df.set_index(keys="reference")["count"]
+
+
+def oapm_CountCitationsOfArXivPMPapersWithMode(
+    pmDB: Connection,
+    oaDB: Connection | ParquetDB,
+    mode: str = "pandas",
+    workers: int = 1,
+    graph: CitationGraph | None = None,
+) -> Series:
+    """
+    oapm_CountCitationsOfArXivPMPapersWithMode Count the number of OpenAlex papers that cite PeatMOSS arXiv papers in one of CITATION_MODES
+
+    :param pmDB: A sqlite3.Connection of a PeaTMOSS database
+    :type pmDB: Connection
+    :param oaDB: A sqlite3.Connection or ParquetDB of a OpenAlex database
+    :type oaDB: Connection | ParquetDB
+    :param mode: Count in pandas, within SQLite, or with the full-text index of work titles, defaults to "pandas"
+    :type mode: str, optional
+    :param workers: The number of processes to scan the works and cites tables with in pandas, defaults to 1
+    :type workers: int, optional
+    :param graph: A CitationGraph to count citations with in pandas, defaults to None
+    :type graph: CitationGraph | None, optional
+    :return: A Series of the number of citations a PeaTMOSS arXiv paper recieved
+    :rtype: Series
+    """
+    if mode == "sql":
+        return oapm_CountCitationsOfArXivPMPapersInSQL(pmDB=pmDB, oaDB=oaDB)
+    elif mode == "fts":
+        return oapm_CountCitationsOfArXivPMPapersInFTS(pmDB=pmDB, oaDB=oaDB)
+
+    return oapm_CountCitationsOfArXivPMPapers(
+        pmDB=pmDB,
+        oaDB=oaDB,
+        workers=workers,
+        graph=graph,
+    )
+
+
+@instrumented()
+@cached()
 def pm_CountPapersByID(pmDB: Connection) -> int:
     """
     pm_CountPapersByID Count the number of PeaTMOSS papers by their paper ID
@@ -334,6 +1046,8 @@ def pm_CountPapersByID(pmDB: Connection) -> int:
     return runOneValueSQLQuery(db=pmDB, query=query)[0]
 
 
+@instrumented()
+@cached()
 def pm_CountPapersPerJournal(pmDB: Connection) -> Series:
     """
     pm_CountPapersPerJournal Count the number of papers per journal in PeaTMOSS
@@ -344,11 +1058,18 @@ def pm_CountPapersPerJournal(pmDB: Connection) -> Series:
     :rtype: Series[int]
     """
     query: str = "SELECT url FROM paper"
-    df: DataFrame = _createDFFromSQL(db=pmDB, query=query)
-    df["url"] = df["url"].apply(_extractNetLoc)
+    df: DataFrame = _createDFFromSQL(
+        db=pmDB,
+        query=query,
+        dtype={"url": PYARROW_STRING},
+    )
+    # object dtype keeps the returned counts and their order of ties identical to
+    # the scalar implementation
+    df["url"] = _extractNetLocSeries(urls=df["url"]).astype(dtype=object)
     return df["url"].value_counts(sort=True, dropna=False)
 
 
+@cached()
 def pm_IdentifyPapersPublishedInArXiv(pmDB: Connection) -> DataFrame:
     """
     pm_IdentifyPapersPublishedInArXiv Identify the papers in PeaTMOSS published in arXiv by DOI
@@ -360,32 +1081,115 @@ def pm_IdentifyPapersPublishedInArXiv(pmDB: Connection) -> DataFrame:
     """
     query: str = "SELECT title, url FROM paper"
 
-    pmDF: DataFrame = _createDFFromSQL(db=pmDB, query=query)
-    pmDF["url"] = pmDF["url"].apply(_convertToArXivDOI)
+    pmDF: DataFrame = _createDFFromSQL(
+        db=pmDB,
+        query=query,
+        dtype={"title": PYARROW_STRING, "url": PYARROW_STRING},
+    )
+    pmDF["url"] = _convertToArXivDOISeries(arxivURLs=pmDF["url"])
 
     return pmDF[pmDF["url"].str.contains("10.48550/arxiv.")]
 
 
+def oa_GetDOIsOfWorks(
+    oaDB: Connection | ParquetDB,
+    oaIDs: List[str],
+    batchSize: int = 999,
+) -> dict[str, str]:
+    """
+    oa_GetDOIsOfWorks Resolve OpenAlex IDs to DOIs in batches of bound parameters
+
+    The first DOI returned for an OpenAlex ID is kept. OpenAlex IDs that are not in the works table are not returned. The Parquet backend resolves every OpenAlex ID in one filtered scan
+
+    :param oaDB: A sqlite3.Connection or ParquetDB object to an OpenAlex dataset
+    :type oaDB: Connection | ParquetDB
+    :param oaIDs: The OpenAlex IDs to resolve
+    :type oaIDs: List[str]
+    :param batchSize: The number of OpenAlex IDs to resolve per query, defaults to 999
+    :type batchSize: int, optional
+    :return: A mapping of OpenAlex IDs to DOIs
+    :rtype: dict[str, str]
+    """
+    dois: dict[str, str] = {}
+
+    if isinstance(oaDB, ParquetDB):
+        works: pyarrow.Table = oaDB.dataset(table="works").to_table(
+            columns=["oa_id", "doi"],
+            filter=pc.field("oa_id").isin(oaIDs),
+        )
+
+        oaID: str
+        doi: str
+        for oaID, doi in zip(works["oa_id"].to_pylist(), works["doi"].to_pylist()):
+            dois.setdefault(oaID, doi)
+
+        return dois
+
+    idx: int
+    for idx in range(0, len(oaIDs), batchSize):
+        batch: List[str] = oaIDs[idx : idx + batchSize]
+        placeholders: str = ", ".join(["?"] * len(batch))
+        query: str = f"SELECT oa_id, doi FROM works WHERE oa_id IN ({placeholders})"
+
+        oaID: str
+        doi: str
+        for oaID, doi in oaDB.execute(query, batch).fetchall():
+            dois.setdefault(oaID, doi)
+
+    return dois
+
+
+def _selectMostCitedPTMs(pmCitationCounts: Series) -> dict[str, str]:
+    """
+    _selectMostCitedPTMs Return the OpenAlex IDs of the papers of the most cited PeaTMOSS models
+
+    :param pmCitationCounts: A pandas.Series of PeaTMOSS arXiv papers and their citations
+    :type pmCitationCounts: Series
+    :return: A mapping of model names to the OpenAlex IDs of their papers
+    :rtype: dict[str, str]
+    """
+    ptms: List[str] = ["ResNeXt", "Transformer-XL", "HRNet", "MAE"]
+
+    # Top 5 choosen because the 4th entry is a dataset and not a DNN
+    data: Series = pmCitationCounts[0:5]
+    data.drop(labels=data.index[3], inplace=True)
+
+    return dict(zip(ptms, data.index.to_list()))
+
+
+@instrumented()
 def oapm_GetDOIsOfOAWorksThatCitePM(
-    oaDB: Connection,
+    oaDB: Connection | ParquetDB,
     pmCitationCounts: Series,
     jsonOutputPath: Path,
-) -> dict[str, DataFrame]:
-    ptms: List[str] = ["ResNeXt", "Transformer-XL", "HRNet", "MAE"]
+    batchSize: int = 999,
+    graph: CitationGraph | None = None,
+) -> List[Path]:
+    """
+    oapm_GetDOIsOfOAWorksThatCitePM Save a sample of the DOIs of OpenAlex works that cite the most cited PeaTMOSS models to JSON
+
+    :param oaDB: A sqlite3.Connection or ParquetDB object to an OpenAlex dataset
+    :type oaDB: Connection | ParquetDB
+    :param pmCitationCounts: A pandas.Series of PeaTMOSS arXiv papers and their citations
+    :type pmCitationCounts: Series
+    :param jsonOutputPath: A directory to save the JSON files to
+    :type jsonOutputPath: Path
+    :param batchSize: The number of OpenAlex IDs to resolve to DOIs per query, defaults to 999
+    :type batchSize: int, optional
+    :param graph: A CitationGraph to read the citing works from instead of the cites table, defaults to None
+    :type graph: CitationGraph | None, optional
+    :return: The paths of the JSON files
+    :rtype: List[Path]
+    """
+    jsonFilePaths: List[Path] = []
+    ptmOAIDs: dict[str, str] = _selectMostCitedPTMs(pmCitationCounts=pmCitationCounts)
+    ptms: List[str] = list(ptmOAIDs.keys())
     dfsDict: dict[str, DataFrame] = {}
     dois: dict[str, List[str]] = {ptm: [] for ptm in ptms}
 
-    citeQueryTemplate: Template = Template(
-        template="SELECT work, reference FROM cites WHERE reference = '${oaID}'"
-    )
-    doiQueryTemplate: Template = Template(
-        template="SELECT oa_id, doi FROM works WHERE oa_id = '${oaID}'"
-    )
+    citeQuery: str = "SELECT work, reference FROM cites WHERE reference = ?"
 
-    # Top 5 choosen because the 4th entry is a dataset and not a DNN
-    data: Series = pmCitationCounts[0:5]
-    data.drop(labels=data.index[3], inplace=True)
-    oaIDs: List[str] = data.index.to_list()
+    oaIDs: List[str] = list(ptmOAIDs.values())
 
     with Bar(
         "Creating DataFrames of works that cite PeaTMOSS papers...", max=len(oaIDs)
@@ -393,8 +1197,26 @@ def oapm_GetDOIsOfOAWorksThatCitePM(
         ptmIDX: int = 0
         oaID: str
         for oaID in oaIDs:
-            query: str = citeQueryTemplate.substitute(oaID=oaID)
-            dfsDict[ptms[ptmIDX]] = _createDFFromSQL(db=oaDB, query=query)
+            if graph is not None:
+                dfsDict[ptms[ptmIDX]] = DataFrame(
+                    data={"work": graph.citedBy(oaID=oaID), "reference": oaID},
+                    columns=["work", "reference"],
+                )
+            elif isinstance(oaDB, ParquetDB):
+                dfsDict[ptms[ptmIDX]] = (
+                    oaDB.dataset(table="cites")
+                    .to_table(
+                        columns=["work", "reference"],
+                        filter=pc.field("reference") == oaID,
+                    )
+                    .to_pandas()
+                )
+            else:
+                dfsDict[ptms[ptmIDX]] = _createDFFromSQL(
+                    db=oaDB,
+                    query=citeQuery,
+                    params=(oaID,),
+                )
             ptmIDX += 1
             bar.next()
 
@@ -403,16 +1225,19 @@ def oapm_GetDOIsOfOAWorksThatCitePM(
         df: DataFrame = dfsDict[ptm]
         workOAIDs: List[str] = df["work"].unique().tolist()
 
-        with Bar(
-            f"Identifying DOIs per work that cites {ptm}...", max=len(workOAIDs)
-        ) as bar:
-            oaID: str
-            for oaID in workOAIDs:
-                query: str = doiQueryTemplate.substitute(oaID=oaID)
-                dois[ptm].append(
-                    f"https://doi.org/{runOneValueSQLQuery(db=oaDB, query=query)[1]}"
-                )
-                bar.next()
+        with Spinner(f"Identifying DOIs per work that cites {ptm}...") as spinner:
+            workDOIs: dict[str, str] = oa_GetDOIsOfWorks(
+                oaDB=oaDB,
+                oaIDs=workOAIDs,
+                batchSize=batchSize,
+            )
+            spinner.next()
+
+        dois[ptm] = [
+            f"https://doi.org/{workDOIs[oaID]}"
+            for oaID in workOAIDs
+            if oaID in workDOIs
+        ]
 
     for items in dois.items():
         jsonFilePath: Path = Path(jsonOutputPath, f"{items[0]}.json")
@@ -432,6 +1257,277 @@ def oapm_GetDOIsOfOAWorksThatCitePM(
             )
         )
         print(f"Saved file to: {jsonFilePath}")
+        jsonFilePaths.append(jsonFilePath)
+
+    return jsonFilePaths
+
+
+@instrumented()
+def oapm_CountTransitiveCitationsOfPM(
+    graph: CitationGraph,
+    pmCitationCounts: Series,
+    jsonOutputPath: Path,
+    hops: int = 3,
+) -> Path:
+    """
+    oapm_CountTransitiveCitationsOfPM Save the number of works within `hops` citations of the most cited PeaTMOSS models to JSON
+
+    Hop 1 counts the works that cite a model's paper, hop 2 the works that cite those works, and so on. A work is only counted at the first hop it is reached
+
+    :param graph: A CitationGraph of the OpenAlex database
+    :type graph: CitationGraph
+    :param pmCitationCounts: A pandas.Series of PeaTMOSS arXiv papers and their citations
+    :type pmCitationCounts: Series
+    :param jsonOutputPath: A directory to save the JSON file to
+    :type jsonOutputPath: Path
+    :param hops: The number of citation hops to follow, defaults to 3
+    :type hops: int, optional
+    :return: The path of the JSON file
+    :rtype: Path
+    """
+    ptmOAIDs: dict[str, str] = _selectMostCitedPTMs(pmCitationCounts=pmCitationCounts)
+    hopCounts: dict[str, dict[str, int]] = {}
+
+    with Bar("Following citations of PeaTMOSS papers...", max=len(ptmOAIDs)) as bar:
+        ptm: str
+        oaID: str
+        for ptm, oaID in ptmOAIDs.items():
+            levels: List[numpy.ndarray] = graph.expandCitations(oaID=oaID, hops=hops)
+            hopCounts[ptm] = {
+                str(hop): level.shape[0] for hop, level in enumerate(levels, start=1)
+            }
+            bar.next()
+
+    jsonFilePath: Path = Path(jsonOutputPath, "transitive_citations.json")
+    DataFrame(data=hopCounts).to_json(path_or_buf=jsonFilePath, indent=4)
+    print(f"Saved file to: {jsonFilePath}")
+    return jsonFilePath
+
+
+# The stages of the stats pipeline. Inputs name a stage, a resource of
+# createResourceOpeners(), or a source of main()
+STATS_STAGES: List[Stage] = [
+    Stage(
+        name="oaPaperCountByDOI",
+        function=oa_CountPapersByDOI,
+        inputs={"oaDB": "oaDB", "workers": "workers"},
+    ),
+    Stage(
+        name="oaPaperCountByOAID",
+        function=oa_CountPapersByOAID,
+        inputs={"oaDB": "oaDB"},
+    ),
+    Stage(
+        name="oaCitationCount",
+        function=oa_CountCitations,
+        inputs={"oaDB": "oaDB"},
+    ),
+    Stage(
+        name="oaProportionOfPapersWithDOIs",
+        function=oa_ProportionOfValidPapers,
+        inputs={
+            "oaIDCount": "oaPaperCountByOAID",
+            "oaDOICount": "oaPaperCountByDOI",
+        },
+    ),
+    Stage(
+        name="pmPaperCountByID",
+        function=pm_CountPapersByID,
+        inputs={"pmDB": "pmDB"},
+    ),
+    Stage(
+        name="pmArxivPapersInOA",
+        function=oapm_CountPMArXivPapersInOA,
+        inputs={"pmDB": "pmDB", "oaDB": "oaDB", "workers": "workers"},
+    ),
+    Stage(
+        name="pmPapersPerJournal",
+        function=pm_CountPapersPerJournal,
+        inputs={"pmDB": "pmDB"},
+    ),
+    Stage(
+        name="pmCitationCounts",
+        function=oapm_CountCitationsOfArXivPMPapersWithMode,
+        inputs={
+            "pmDB": "pmDB",
+            "oaDB": "oaDB",
+            "mode": "mode",
+            "workers": "workers",
+            "graph": "graph",
+        },
+    ),
+    Stage(
+        name="citingWorkDOIs",
+        function=oapm_GetDOIsOfOAWorksThatCitePM,
+        inputs={
+            "oaDB": "oaDB",
+            "pmCitationCounts": "pmCitationCounts",
+            "jsonOutputPath": "jsonOutputPath",
+            "batchSize": "batchSize",
+            "graph": "graph",
+        },
+        outputs=("jsonOutputPath",),
+        ignore=("batchSize",),
+    ),
+    Stage(
+        name="transitiveCitations",
+        function=oapm_CountTransitiveCitationsOfPM,
+        inputs={
+            "graph": "graph",
+            "pmCitationCounts": "pmCitationCounts",
+            "jsonOutputPath": "jsonOutputPath",
+            "hops": "hops",
+        },
+        outputs=("jsonOutputPath",),
+    ),
+]
+
+
+def statsTargets(graphPath: Path | None) -> List[str]:
+    """
+    statsTargets Return the names of the STATS_STAGES to compute
+
+    :param graphPath: Path to a citation graph, without which transitive citations are not counted
+    :type graphPath: Path | None
+    :return: The names of the stages
+    :rtype: List[str]
+    """
+    return [
+        stage.name
+        for stage in STATS_STAGES
+        if graphPath is not None or stage.name != "transitiveCitations"
+    ]
+
+
+def createResourceOpeners(
+    pmPath: Path,
+    oaPath: Path,
+    backend: str,
+    graphPath: Path | None,
+) -> dict[str, Callable[[], Any]]:
+    """
+    createResourceOpeners Return picklable functions that open the databases and citation graph that the stages read
+
+    :param pmPath: Filepath to a PeaTMOSS database
+    :type pmPath: Path
+    :param oaPath: Filepath to an OpenAlex database, or to a directory written by `prepare.py parquet`
+    :type oaPath: Path
+    :param backend: One of OA_BACKENDS
+    :type backend: str
+    :param graphPath: Path to a citation graph written by `prepare.py graph`
+    :type graphPath: Path | None
+    :return: A mapping of the pmDB, oaDB, and graph resources to functions that open them
+    :rtype: dict[str, Callable[[], Any]]
+    """
+    return {
+        "pmDB": partial(connectToDB, dbPath=pmPath),
+        "oaDB": partial(connectToOA, oaPath=oaPath, backend=backend),
+        "graph": partial(loadCitationGraph, graphPath=graphPath),
+    }
+
+
+def printStatistics(results: dict[str, Any]) -> None:
+    """
+    printStatistics Print the artifacts of the STATS_STAGES
+
+    :param results: A mapping of stage names to their artifacts
+    :type results: dict[str, Any]
+    """
+    print(
+        "Number of papers with DOIs in OpenAlex:",
+        intcomma(value=results["oaPaperCountByDOI"]),
+    )
+    print(
+        "Number of papers with OAIDs in OpenAlex:",
+        intcomma(value=results["oaPaperCountByOAID"]),
+    )
+    print(
+        "Number of citations captured in OpenAlex:",
+        intcomma(value=results["oaCitationCount"]),
+    )
+    print(
+        "Proportion of papers with DOIs in OpenAlex:",
+        f"{results['oaProportionOfPapersWithDOIs'] * 100}%",
+    )
+    print(
+        "Number of papers captured in PeaTMOSS:",
+        intcomma(value=results["pmPaperCountByID"]),
+    )
+    print(
+        "Number of PeaTMOSS papers captured in OpenAlex that were published in arXiv:",
+        intcomma(value=results["pmArxivPapersInOA"]),
+    )
+    print(
+        "Number of papers per journal in PeaTMOSS:\n",
+        results["pmPapersPerJournal"],
+    )
+    print(
+        "Number of citations per PeaTMOSS published in arXiv:\n",
+        results["pmCitationCounts"],
+    )
+
+
+def configureRun(
+    backend: str,
+    mode: str,
+    noCache: bool,
+    cacheDirectory: Path,
+    cacheSize: int,
+    tracePath: Path | None = None,
+    profiler: str = "none",
+    profileDirectory: Path | None = None,
+) -> None:
+    """
+    configureRun Check the options shared by the stats scripts and enable the cache and trace
+
+    :param backend: One of OA_BACKENDS
+    :type backend: str
+    :param mode: One of CITATION_MODES
+    :type mode: str
+    :param noCache: Do not cache results
+    :type noCache: bool
+    :param cacheDirectory: Path to cache computed results in
+    :type cacheDirectory: Path
+    :param cacheSize: Maximum size of the cache in MB
+    :type cacheSize: int
+    :param tracePath: Path to write a JSON trace to, defaults to None
+    :type tracePath: Path | None, optional
+    :param profiler: One of PROFILERS, defaults to "none"
+    :type profiler: str, optional
+    :param profileDirectory: Path to save profiles to, defaults to None
+    :type profileDirectory: Path | None, optional
+    :raises click.BadParameter: If the options conflict
+    """
+    if backend == "parquet" and mode != "pandas":
+        raise click.BadParameter(
+            message="sql and fts modes require the sqlite backend",
+            param_hint="--mode",
+        )
+
+    if profiler != "none" and tracePath is None:
+        raise click.BadParameter(
+            message="profiling requires a --trace path",
+            param_hint="--profiler",
+        )
+
+    if profiler == "pyinstrument" and find_spec(name="pyinstrument") is None:
+        raise click.BadParameter(
+            message="pyinstrument is not installed",
+            param_hint="--profiler",
+        )
+
+    if tracePath is not None:
+        configureInstrumentation(
+            tracePath=resolvePath(path=tracePath),
+            profiler=profiler,
+            profileDirectory=resolvePath(path=profileDirectory),
+        )
+
+    if not noCache:
+        configureCache(
+            directory=resolvePath(path=cacheDirectory),
+            maxBytes=cacheSize * 1024**2,
+        )
 
 
 @click.command()
@@ -448,17 +1544,35 @@ def oapm_GetDOIsOfOAWorksThatCitePM(
     "--openalex",
     "oaPath",
     type=Path,
-    help="Path to OpenAlex database",
+    help="Path to OpenAlex database, or to its Parquet directory with --backend parquet",
     required=True,
 )
 @click.option(
-    "-a",
-    "--peatmoss-arxiv-citation-count",
-    "pmArxivCitationCount",
+    "--backend",
+    "backend",
+    type=click.Choice(choices=OA_BACKENDS),
+    help="Read the OpenAlex dataset from SQLite or from the files written by prepare.py parquet",
+    required=False,
+    default="sqlite",
+    show_default=True,
+)
+@click.option(
+    "-g",
+    "--graph",
+    "graphPath",
     type=Path,
-    help="Path to pickled PeaTMOSS arXiv Citation Count",
+    help="Path to a citation graph written by prepare.py graph to count and resolve citations with",
     required=False,
-    default=Path("../../data/pickle/pmArXivCitations.pickle"),
+    default=None,
+)
+@click.option(
+    "-k",
+    "--hops",
+    "hops",
+    type=click.IntRange(min=1),
+    help="Number of citation hops to follow from the most cited PeaTMOSS papers with --graph",
+    required=False,
+    default=3,
     show_default=True,
 )
 @click.option(
@@ -471,92 +1585,166 @@ def oapm_GetDOIsOfOAWorksThatCitePM(
     default=Path("../../data/json"),
     show_default=True,
 )
+@click.option(
+    "-m",
+    "--mode",
+    "mode",
+    type=click.Choice(choices=CITATION_MODES),
+    help="Compute the PeaTMOSS arXiv citation counts in pandas, within SQLite, or with the full-text index of work titles",
+    required=False,
+    default="pandas",
+    show_default=True,
+)
+@click.option(
+    "-b",
+    "--batch-size",
+    "batchSize",
+    type=click.IntRange(min=1),
+    help="Number of OpenAlex IDs to resolve to DOIs per query",
+    required=False,
+    default=999,
+    show_default=True,
+)
+@click.option(
+    "-w",
+    "--workers",
+    "workers",
+    type=click.IntRange(min=1),
+    help="Number of processes to scan the OpenAlex tables with",
+    required=False,
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "-c",
+    "--cache-dir",
+    "cacheDirectory",
+    type=Path,
+    help="Path to cache computed results in",
+    required=False,
+    default=Path("../../data/cache"),
+    show_default=True,
+)
+@click.option(
+    "-s",
+    "--cache-size",
+    "cacheSize",
+    type=click.IntRange(min=1),
+    help="Maximum size of the cache in MB",
+    required=False,
+    default=1024,
+    show_default=True,
+)
+@click.option(
+    "--no-cache",
+    "noCache",
+    is_flag=True,
+    help="Recompute every result instead of reading from the cache and the stage artifacts",
+)
+@click.option(
+    "-t",
+    "--trace",
+    "tracePath",
+    type=Path,
+    help="Path to write a JSON trace of the wall time, rows processed, rows/sec, and peak RSS of every stage to",
+    required=False,
+    default=None,
+)
+@click.option(
+    "--profiler",
+    "profiler",
+    type=click.Choice(choices=PROFILERS),
+    help="Profile every stage of a --trace run with cProfile or pyinstrument",
+    required=False,
+    default="none",
+    show_default=True,
+)
+@click.option(
+    "--profile-dir",
+    "profileDirectory",
+    type=Path,
+    help="Path to save the profiles of --profiler to",
+    required=False,
+    default=Path("../../data/profiles"),
+    show_default=True,
+)
+@click.option(
+    "--artifact-dir",
+    "artifactDirectory",
+    type=Path,
+    help="Path to save the result of every stage to, so that only stages whose inputs changed are recomputed",
+    required=False,
+    default=Path("../../data/artifacts"),
+    show_default=True,
+)
+@click.option(
+    "--jobs",
+    "jobs",
+    type=click.IntRange(min=1),
+    help="Number of independent stages to run at once",
+    required=False,
+    default=1,
+    show_default=True,
+)
 def main(
     pmPath: Path,
     oaPath: Path,
-    pmArxivCitationCount: Path,
+    backend: str,
+    graphPath: Path | None,
+    hops: int,
     jsonOutput: Path,
+    mode: str,
+    batchSize: int,
+    workers: int,
+    cacheDirectory: Path,
+    cacheSize: int,
+    noCache: bool,
+    tracePath: Path | None,
+    profiler: str,
+    profileDirectory: Path,
+    artifactDirectory: Path,
+    jobs: int,
 ) -> None:
     absPMPath: Path = resolvePath(path=pmPath)
     absOAPath: Path = resolvePath(path=oaPath)
-    absPMACCPath: Path = resolvePath(path=pmArxivCitationCount)
     absJOPath: Path = resolvePath(path=jsonOutput)
 
     assert isFile(path=absPMPath)
-    assert isFile(path=absOAPath)
-    assert isFile(path=absPMACCPath)
     assert isDirectory(path=absJOPath)
 
-    pmDB: Connection = connectToDB(dbPath=absPMPath)
-    oaDB: Connection = connectToDB(dbPath=absOAPath)
-
-    oaPaperCountByDOI: int = oa_CountPapersByDOI(oaDB=oaDB)
-    print(
-        "Number of papers with DOIs in OpenAlex:",
-        intcomma(value=oaPaperCountByDOI),
-    )
-
-    oaPaperCountByOAID: int = oa_CountPapersByOAID(oaDB=oaDB)
-    print(
-        "Number of papers with OAIDs in OpenAlex:",
-        intcomma(value=oaPaperCountByOAID),
-    )
-
-    oaCitationCount: int = oa_CountCitations(oaDB=oaDB)
-    print(
-        "Number of citations captured in OpenAlex:",
-        intcomma(value=oaCitationCount),
-    )
-
-    oaProportionOfPapersWithDOIs: float = oa_ProportionOfValidPapers(
-        oaIDCount=oaPaperCountByOAID,
-        oaDOICount=oaPaperCountByDOI,
-    )
-    print(
-        "Proportion of papers with DOIs in OpenAlex:",
-        f"{oaProportionOfPapersWithDOIs * 100}%",
-    )
-
-    pmPaperCountByID: int = pm_CountPapersByID(pmDB=pmDB)
-    print(
-        "Number of papers captured in PeaTMOSS:",
-        intcomma(value=pmPaperCountByID),
-    )
-
-    pmArxivPapersInOA: int = oapm_CountPMArXivPapersInOA(
-        pmDB=pmDB,
-        oaDB=oaDB,
-    )
-    print(
-        "Number of PeaTMOSS papers captured in OpenAlex that were published in arXiv:",
-        intcomma(value=pmArxivPapersInOA),
-    )
-
-    pmPapersPerJournal: Series = pm_CountPapersPerJournal(pmDB=pmDB)
-    print(
-        "Number of papers per journal in PeaTMOSS:\n",
-        pmPapersPerJournal,
+    configureRun(
+        backend=backend,
+        mode=mode,
+        noCache=noCache,
+        cacheDirectory=cacheDirectory,
+        cacheSize=cacheSize,
+        tracePath=tracePath,
+        profiler=profiler,
+        profileDirectory=profileDirectory,
     )
 
-    oapm_arXivPMPapers: Series
-    try:
-        oapm_arXivPMPapers = pandas.read_pickle(filepath_or_buffer=absPMACCPath)
-    except FileExistsError:
-        oapm_arXivPMPapers = oapm_CountCitationsOfArXivPMPapers(
-            pmDB=pmDB,
-            oaDB=oaDB,
-        )
-        oapm_arXivPMPapers.to_pickle(path=absPMACCPath)
-    print(
-        "Number of citations per PeaTMOSS published in arXiv:\n",
-        oapm_arXivPMPapers,
+    results: dict[str, Any] = runStages(
+        stages=STATS_STAGES,
+        targets=statsTargets(graphPath=graphPath),
+        sources={
+            "workers": workers,
+            "mode": mode,
+            "jsonOutputPath": absJOPath,
+            "batchSize": batchSize,
+            "hops": hops,
+        },
+        resources=createResourceOpeners(
+            pmPath=absPMPath,
+            oaPath=absOAPath,
+            backend=backend,
+            graphPath=None if graphPath is None else resolvePath(path=graphPath),
+        ),
+        artifactDirectory=resolvePath(path=artifactDirectory),
+        jobs=jobs,
+        refresh=noCache,
     )
 
-    oapm_GetDOIsOfOAWorksThatCitePM(
-        oaDB=oaDB,
-        pmCitationCounts=oapm_arXivPMPapers,
-        jsonOutputPath=absJOPath,
-    )
+    printStatistics(results=results)
 
 
 if __name__ == "__main__":
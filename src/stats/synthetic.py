@@ -0,0 +1,589 @@
+from math import ceil
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Iterable, List, Tuple
+
+import click
+import numpy
+from humanize import intcomma, naturalsize
+from progress.bar import Bar
+from pyfs import resolvePath
+
+from src.stats.stats import connectToDB
+
+OA_SCHEMA: List[str] = [
+    "CREATE TABLE works (id INTEGER PRIMARY KEY, oa_id TEXT, doi TEXT, title TEXT)",
+    "CREATE TABLE cites (id INTEGER PRIMARY KEY, work TEXT, reference TEXT)",
+]
+
+PM_SCHEMA: List[str] = [
+    "CREATE TABLE paper (id INTEGER PRIMARY KEY, title TEXT, url TEXT)",
+    "CREATE TABLE model_to_paper (id INTEGER PRIMARY KEY, model_id INT, paper_id INT)",
+]
+
+# Bulk loading pragmas; a half written synthetic database is regenerated, not recovered
+LOAD_PRAGMAS: List[str] = [
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+]
+
+TITLE_WORDS: List[str] = (
+    "a an of for the with on in via towards learning deep neural network networks "
+    "model models language vision image images video graph graphs transformer "
+    "transformers attention self supervised unsupervised contrastive representation "
+    "representations pre training fine tuning generative adversarial diffusion "
+    "reinforcement policy optimization efficient scalable robust sparse dense "
+    "segmentation detection classification retrieval generation translation speech "
+    "recognition benchmark dataset large small zero few shot multi modal masked "
+    "autoencoders residual convolutional recurrent knowledge distillation pruning "
+    "quantization federated continual transfer domain adaptation semantic object "
+    "pose estimation depth point cloud 3d text question answering reasoning"
+).split()
+
+# Venues of the PeaTMOSS papers that are not on arXiv, with their relative weights
+PM_VENUE_URLS: List[Tuple[str, float]] = [
+    ("https://openaccess.thecvf.com/content/paper", 0.35),
+    ("https://aclanthology.org/paper", 0.25),
+    ("https://proceedings.neurips.cc/paper", 0.15),
+    ("https://openreview.net/forum", 0.1),
+    ("https://github.com/organization/repository", 0.1),
+    ("https://www.biorxiv.org/content/paper", 0.05),
+]
+
+ARXIV_URL_PREFIX: str = "https://arxiv.org/abs/"
+ARXIV_DOI_PREFIX: str = "10.48550/arXiv."
+
+# Rows per executemany() call
+CHUNK_SIZE: int = 100000
+
+
+def _arxivID(paperID: int) -> str:
+    """
+    _arxivID Return a unique arXiv identifier such as "1501.00042" for a paper
+
+    :param paperID: The id of a PeaTMOSS paper
+    :type paperID: int
+    :return: An arXiv identifier
+    :rtype: str
+    """
+    return f"{1501 + paperID // 100000}.{paperID % 100000:05d}"
+
+
+def _titles(generator: numpy.random.Generator, count: int) -> List[str]:
+    """
+    _titles Return random titles of 4 to 14 words from TITLE_WORDS
+
+    :param generator: A numpy random Generator
+    :type generator: numpy.random.Generator
+    :param count: The number of titles
+    :type count: int
+    :return: A list of capitalized titles
+    :rtype: List[str]
+    """
+    lengths: numpy.ndarray = generator.integers(low=4, high=15, size=count)
+    words: numpy.ndarray = generator.integers(
+        low=0, high=len(TITLE_WORDS), size=int(lengths.sum())
+    )
+
+    titles: List[str] = []
+    start: int = 0
+    length: int
+    for length in lengths.tolist():
+        titles.append(
+            " ".join([TITLE_WORDS[word] for word in words[start : start + length]])
+        )
+        start += length
+
+    return [title.capitalize() for title in titles]
+
+
+def _scrambleRanks(ranks: numpy.ndarray, workCount: int) -> numpy.ndarray:
+    """
+    _scrambleRanks Map citation popularity ranks to work indexes with an affine permutation
+
+    The most cited works end up spread across the works table instead of at its start, without holding a permutation of every work in memory
+
+    :param ranks: An int64 numpy array of ranks in [0, workCount)
+    :type ranks: numpy.ndarray
+    :param workCount: The number of works
+    :type workCount: int
+    :return: An int64 numpy array of work indexes in [0, workCount)
+    :rtype: numpy.ndarray
+    """
+    multiplier: int = 2654435761 % workCount or 1
+    while numpy.gcd(multiplier, workCount) != 1:
+        multiplier += 1
+
+    return (ranks * multiplier + workCount // 3) % workCount
+
+
+def _drawRanks(
+    generator: numpy.random.Generator,
+    size: int,
+    workCount: int,
+    citationExponent: float,
+) -> numpy.ndarray:
+    """
+    _drawRanks Draw the popularity ranks of cited works
+
+    A power law of citations per work with exponent a is a rank-frequency law where the work of rank r is cited in proportion to r^(-1 / (a - 1)), which is sampled by inverting its continuous CDF
+
+    :param generator: A numpy random Generator
+    :type generator: numpy.random.Generator
+    :param size: The number of ranks to draw
+    :type size: int
+    :param workCount: The number of works
+    :type workCount: int
+    :param citationExponent: The exponent of the power law of citations per work, greater than 2
+    :type citationExponent: float
+    :return: An int64 numpy array of ranks in [0, workCount)
+    :rtype: numpy.ndarray
+    """
+    rankExponent: float = 1 / (citationExponent - 1)
+    ranks: numpy.ndarray = workCount * generator.random(size=size) ** (
+        1 / (1 - rankExponent)
+    )
+    return numpy.minimum(ranks.astype(numpy.int64), workCount - 1)
+
+
+def defaultPaperCount(workCount: int) -> int:
+    """
+    defaultPaperCount Return the number of PeaTMOSS papers to generate for a number of works
+
+    :param workCount: The number of OpenAlex works
+    :type workCount: int
+    :return: 1 paper per 1,000 works, and at least 100
+    :rtype: int
+    """
+    return max(100, workCount // 1000)
+
+
+def generatePeaTMOSS(
+    db: Connection,
+    generator: numpy.random.Generator,
+    paperCount: int,
+    arxivShare: float,
+) -> List[Tuple[int, str, str]]:
+    """
+    generatePeaTMOSS Fill the paper and model_to_paper tables of an empty PeaTMOSS database
+
+    Papers are on arXiv with probability `arxivShare`, and otherwise on one of PM_VENUE_URLS. Every paper is linked to at least one model, with a heavy tail of papers linked to many
+
+    :param db: An sqlite3.Connection object of an empty database
+    :type db: Connection
+    :param generator: A numpy random Generator
+    :type generator: numpy.random.Generator
+    :param paperCount: The number of papers
+    :type paperCount: int
+    :param arxivShare: The fraction of papers on arXiv
+    :type arxivShare: float
+    :return: A list of the (id, title, arXiv identifier) of the arXiv papers
+    :rtype: List[Tuple[int, str, str]]
+    """
+    statement: str
+    for statement in PM_SCHEMA:
+        db.execute(statement)
+
+    titles: List[str] = _titles(generator=generator, count=paperCount)
+    onArXiv: numpy.ndarray = generator.random(size=paperCount) < arxivShare
+    venues: numpy.ndarray = generator.choice(
+        a=len(PM_VENUE_URLS),
+        size=paperCount,
+        p=[weight for _, weight in PM_VENUE_URLS],
+    )
+
+    papers: List[Tuple[int, str, str]] = []
+    arxivPapers: List[Tuple[int, str, str]] = []
+
+    paperID: int
+    for paperID in range(paperCount):
+        if onArXiv[paperID]:
+            arxivID: str = _arxivID(paperID=paperID)
+            papers.append((paperID, titles[paperID], f"{ARXIV_URL_PREFIX}{arxivID}"))
+            arxivPapers.append((paperID, titles[paperID], arxivID))
+        else:
+            url: str = PM_VENUE_URLS[venues[paperID]][0]
+            papers.append((paperID, titles[paperID], f"{url}/{paperID}"))
+
+    db.executemany("INSERT INTO paper VALUES (?, ?, ?)", papers)
+
+    modelCounts: numpy.ndarray = numpy.minimum(
+        generator.zipf(a=2.5, size=paperCount), 1000
+    )
+    paperIDs: numpy.ndarray = numpy.repeat(numpy.arange(paperCount), modelCounts)
+    db.executemany(
+        "INSERT INTO model_to_paper VALUES (?, ?, ?)",
+        zip(
+            range(paperIDs.size),
+            range(paperIDs.size),
+            paperIDs.tolist(),
+        ),
+    )
+
+    db.commit()
+    return arxivPapers
+
+
+def _workRows(
+    generator: numpy.random.Generator,
+    start: int,
+    stop: int,
+    pmWorks: dict[int, Tuple[str, str]],
+    blankDOIShare: float,
+) -> Iterable[Tuple[int, str, str | None, str]]:
+    """
+    _workRows Generate the rows of the works table from index `start` up to `stop`
+
+    :param generator: A numpy random Generator
+    :type generator: numpy.random.Generator
+    :param start: The index of the first work
+    :type start: int
+    :param stop: The index after the last work
+    :type stop: int
+    :param pmWorks: A mapping of work indexes to the (title, arXiv identifier) of the PeaTMOSS paper they are
+    :type pmWorks: dict[int, Tuple[str, str]]
+    :param blankDOIShare: The fraction of works without a DOI
+    :type blankDOIShare: float
+    :return: A generator of works rows
+    :rtype: Iterable[Tuple[int, str, str | None, str]]
+    """
+    titles: List[str] = _titles(generator=generator, count=stop - start)
+    blankDOIs: numpy.ndarray = generator.random(size=stop - start) < blankDOIShare
+    # Blank DOIs are either NULL or the " " placeholder of the OpenAlex conversion
+    nullDOIs: numpy.ndarray = generator.random(size=stop - start) < 0.5
+    # PeaTMOSS titles are only equal once standardized
+    titleVariants: numpy.ndarray = generator.integers(low=0, high=3, size=stop - start)
+
+    index: int
+    for index in range(start, stop):
+        offset: int = index - start
+        doi: str | None = f"10.{5000 + index % 3000}/synthetic.{index}"
+        title: str = titles[offset]
+
+        if index in pmWorks:
+            title, arxivID = pmWorks[index]
+            doi = f"{ARXIV_DOI_PREFIX}{arxivID}"
+            if titleVariants[offset] == 1:
+                title = title.lower()
+            elif titleVariants[offset] == 2:
+                title = f"{title} "
+        elif blankDOIs[offset]:
+            doi = None if nullDOIs[offset] else " "
+
+        yield (index + 1, f"W{index + 1}", doi, title)
+
+
+def generateOpenAlex(
+    db: Connection,
+    generator: numpy.random.Generator,
+    workCount: int,
+    citationsPerWork: float,
+    arxivPapers: List[Tuple[int, str, str]],
+    pmInOAShare: float,
+    blankDOIShare: float,
+    citationExponent: float,
+) -> None:
+    """
+    generateOpenAlex Fill the works and cites tables of an empty OpenAlex database
+
+    Cited works are drawn by popularity rank so that the number of citations per work follows a power law. The PeaTMOSS arXiv papers that are in OpenAlex take every other of the most popular ranks, as the papers of widely reused models are highly cited
+
+    :param db: An sqlite3.Connection object of an empty database
+    :type db: Connection
+    :param generator: A numpy random Generator
+    :type generator: numpy.random.Generator
+    :param workCount: The number of works
+    :type workCount: int
+    :param citationsPerWork: The mean number of works that a work cites
+    :type citationsPerWork: float
+    :param arxivPapers: The (id, title, arXiv identifier) of the PeaTMOSS arXiv papers
+    :type arxivPapers: List[Tuple[int, str, str]]
+    :param pmInOAShare: The fraction of PeaTMOSS arXiv papers that are works
+    :type pmInOAShare: float
+    :param blankDOIShare: The fraction of works without a DOI
+    :type blankDOIShare: float
+    :param citationExponent: The exponent of the power law of citations per work, greater than 2
+    :type citationExponent: float
+    """
+    statement: str
+    for statement in OA_SCHEMA:
+        db.execute(statement)
+
+    pmPaperCount: int = min(int(len(arxivPapers) * pmInOAShare), workCount // 2)
+    pmPaperIndexes: numpy.ndarray = generator.choice(
+        a=len(arxivPapers), size=pmPaperCount, replace=False
+    )
+    pmWorkIndexes: numpy.ndarray = _scrambleRanks(
+        ranks=numpy.arange(0, 2 * pmPaperCount, 2),
+        workCount=workCount,
+    )
+    pmWorks: dict[int, Tuple[str, str]] = {
+        workIndex: arxivPapers[paperIndex][1:3]
+        for workIndex, paperIndex in zip(
+            pmWorkIndexes.tolist(), pmPaperIndexes.tolist()
+        )
+    }
+
+    citeCount: int = int(workCount * citationsPerWork)
+
+    with Bar("Generating works...", max=ceil(workCount / CHUNK_SIZE)) as bar:
+        start: int
+        for start in range(0, workCount, CHUNK_SIZE):
+            db.executemany(
+                "INSERT INTO works VALUES (?, ?, ?, ?)",
+                _workRows(
+                    generator=generator,
+                    start=start,
+                    stop=min(start + CHUNK_SIZE, workCount),
+                    pmWorks=pmWorks,
+                    blankDOIShare=blankDOIShare,
+                ),
+            )
+            bar.next()
+
+    with Bar("Generating cites...", max=ceil(citeCount / CHUNK_SIZE)) as bar:
+        start: int
+        for start in range(0, citeCount, CHUNK_SIZE):
+            size: int = min(CHUNK_SIZE, citeCount - start)
+            works: numpy.ndarray = generator.integers(low=0, high=workCount, size=size)
+            references: numpy.ndarray = _scrambleRanks(
+                ranks=_drawRanks(
+                    generator=generator,
+                    size=size,
+                    workCount=workCount,
+                    citationExponent=citationExponent,
+                ),
+                workCount=workCount,
+            )
+            db.executemany(
+                "INSERT INTO cites VALUES (?, ?, ?)",
+                zip(
+                    range(start + 1, start + size + 1),
+                    [f"W{work + 1}" for work in works.tolist()],
+                    [f"W{reference + 1}" for reference in references.tolist()],
+                ),
+            )
+            bar.next()
+
+    db.commit()
+
+
+def generateDatabases(
+    pmPath: Path,
+    oaPath: Path,
+    workCount: int,
+    paperCount: int,
+    citationsPerWork: float = 10.0,
+    arxivShare: float = 0.7,
+    pmInOAShare: float = 0.5,
+    blankDOIShare: float = 0.1,
+    citationExponent: float = 3.0,
+    seed: int = 42,
+) -> None:
+    """
+    generateDatabases Write a synthetic PeaTMOSS and OpenAlex database with the tables and columns that the stats scripts read
+
+    The same arguments always generate the same databases
+
+    :param pmPath: Path to write the PeaTMOSS database to; must not exist
+    :type pmPath: Path
+    :param oaPath: Path to write the OpenAlex database to; must not exist
+    :type oaPath: Path
+    :param workCount: The number of works
+    :type workCount: int
+    :param paperCount: The number of PeaTMOSS papers
+    :type paperCount: int
+    :param citationsPerWork: The mean number of works that a work cites, defaults to 10.0
+    :type citationsPerWork: float, optional
+    :param arxivShare: The fraction of PeaTMOSS papers on arXiv, defaults to 0.7
+    :type arxivShare: float, optional
+    :param pmInOAShare: The fraction of PeaTMOSS arXiv papers that are works, defaults to 0.5
+    :type pmInOAShare: float, optional
+    :param blankDOIShare: The fraction of works without a DOI, defaults to 0.1
+    :type blankDOIShare: float, optional
+    :param citationExponent: The exponent of the power law of citations per work, defaults to 3.0
+    :type citationExponent: float, optional
+    :param seed: The seed of the random generator, defaults to 42
+    :type seed: int, optional
+    """
+    assert not pmPath.exists()
+    assert not oaPath.exists()
+
+    pmPath.parent.mkdir(parents=True, exist_ok=True)
+    oaPath.parent.mkdir(parents=True, exist_ok=True)
+
+    generator: numpy.random.Generator = numpy.random.default_rng(seed=seed)
+
+    pmDB: Connection = connectToDB(dbPath=pmPath)
+    oaDB: Connection = connectToDB(dbPath=oaPath)
+
+    pragma: str
+    for pragma in LOAD_PRAGMAS:
+        pmDB.execute(pragma)
+        oaDB.execute(pragma)
+
+    arxivPapers: List[Tuple[int, str, str]] = generatePeaTMOSS(
+        db=pmDB,
+        generator=generator,
+        paperCount=paperCount,
+        arxivShare=arxivShare,
+    )
+    generateOpenAlex(
+        db=oaDB,
+        generator=generator,
+        workCount=workCount,
+        citationsPerWork=citationsPerWork,
+        arxivPapers=arxivPapers,
+        pmInOAShare=pmInOAShare,
+        blankDOIShare=blankDOIShare,
+        citationExponent=citationExponent,
+    )
+
+    pmDB.close()
+    oaDB.close()
+
+
+@click.command()
+@click.option(
+    "-p",
+    "--peatmoss",
+    "pmPath",
+    type=Path,
+    help="Path to write the PeaTMOSS database to",
+    required=False,
+    default=Path("../../data/synthetic/peatmoss.db"),
+    show_default=True,
+)
+@click.option(
+    "-o",
+    "--openalex",
+    "oaPath",
+    type=Path,
+    help="Path to write the OpenAlex database to",
+    required=False,
+    default=Path("../../data/synthetic/openalex.db"),
+    show_default=True,
+)
+@click.option(
+    "-n",
+    "--works",
+    "workCount",
+    type=click.IntRange(min=100),
+    help="Number of OpenAlex works",
+    required=False,
+    default=10000,
+    show_default=True,
+)
+@click.option(
+    "--papers",
+    "paperCount",
+    type=click.IntRange(min=10),
+    help="Number of PeaTMOSS papers; 1 per 1,000 works, and at least 100, if not given",
+    required=False,
+    default=None,
+)
+@click.option(
+    "-c",
+    "--citations-per-work",
+    "citationsPerWork",
+    type=click.FloatRange(min=0),
+    help="Mean number of works that a work cites",
+    required=False,
+    default=10.0,
+    show_default=True,
+)
+@click.option(
+    "--arxiv-share",
+    "arxivShare",
+    type=click.FloatRange(min=0, max=1),
+    help="Fraction of PeaTMOSS papers on arXiv",
+    required=False,
+    default=0.7,
+    show_default=True,
+)
+@click.option(
+    "--pm-in-oa-share",
+    "pmInOAShare",
+    type=click.FloatRange(min=0, max=1),
+    help="Fraction of PeaTMOSS arXiv papers that are OpenAlex works",
+    required=False,
+    default=0.5,
+    show_default=True,
+)
+@click.option(
+    "--blank-doi-share",
+    "blankDOIShare",
+    type=click.FloatRange(min=0, max=1),
+    help="Fraction of OpenAlex works without a DOI",
+    required=False,
+    default=0.1,
+    show_default=True,
+)
+@click.option(
+    "--citation-exponent",
+    "citationExponent",
+    type=click.FloatRange(min=2, min_open=True),
+    help="Exponent of the power law of citations per work",
+    required=False,
+    default=3.0,
+    show_default=True,
+)
+@click.option(
+    "-s",
+    "--seed",
+    "seed",
+    type=int,
+    help="Seed of the random generator",
+    required=False,
+    default=42,
+    show_default=True,
+)
+def main(
+    pmPath: Path,
+    oaPath: Path,
+    workCount: int,
+    paperCount: int | None,
+    citationsPerWork: float,
+    arxivShare: float,
+    pmInOAShare: float,
+    blankDOIShare: float,
+    citationExponent: float,
+    seed: int,
+) -> None:
+    """
+    Generate synthetic PeaTMOSS and OpenAlex databases to benchmark the stats scripts with
+    """
+    absPMPath: Path = resolvePath(path=pmPath)
+    absOAPath: Path = resolvePath(path=oaPath)
+
+    if absPMPath.exists() or absOAPath.exists():
+        raise click.BadParameter(
+            message="the databases must not exist",
+            param_hint="--peatmoss / --openalex",
+        )
+
+    generateDatabases(
+        pmPath=absPMPath,
+        oaPath=absOAPath,
+        workCount=workCount,
+        paperCount=paperCount or defaultPaperCount(workCount=workCount),
+        citationsPerWork=citationsPerWork,
+        arxivShare=arxivShare,
+        pmInOAShare=pmInOAShare,
+        blankDOIShare=blankDOIShare,
+        citationExponent=citationExponent,
+        seed=seed,
+    )
+
+    path: Path
+    for path in [absPMPath, absOAPath]:
+        print(f"Wrote {naturalsize(value=path.stat().st_size)} to {path}")
+
+    print(
+        f"{intcomma(value=workCount)} works,",
+        f"{intcomma(value=int(workCount * citationsPerWork))} cites",
+    )
+
+
+if __name__ == "__main__":
+    main()
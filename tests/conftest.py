@@ -0,0 +1,85 @@
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Any, List
+
+import pytest
+from click.testing import CliRunner, Result
+
+from src.stats import prepare, synthetic
+from src.stats.parquet import ParquetDB
+from src.stats.stats import connectToDB
+
+
+def _invoke(command: Any, args: List[str]) -> None:
+    """
+    _invoke Run a click command and fail the test if it fails
+
+    :param command: A click command
+    :type command: Any
+    :param args: The command line arguments
+    :type args: List[str]
+    """
+    result: Result = CliRunner().invoke(command, args=args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+
+
+@pytest.fixture(scope="session")
+def databases(tmp_path_factory: pytest.TempPathFactory) -> dict[str, Path]:
+    """
+    databases Generate a small synthetic PeaTMOSS and OpenAlex database, index them, build the full-text index of the OpenAlex database, and export it to Parquet
+
+    The indexes are built so that SQLite may answer queries from them, as it does on the real databases
+    """
+    directory: Path = tmp_path_factory.mktemp(basename="backends")
+    paths: dict[str, Path] = {
+        "pm": Path(directory, "peatmoss.db"),
+        "oa": Path(directory, "openalex.db"),
+        "parquet": Path(directory, "parquet"),
+    }
+
+    _invoke(
+        command=synthetic.main,
+        args=["-p", str(paths["pm"]), "-o", str(paths["oa"]), "-n", "5000"],
+    )
+    _invoke(
+        command=prepare.cli,
+        args=["indexes", "-p", str(paths["pm"]), "-o", str(paths["oa"])],
+    )
+    _invoke(command=prepare.cli, args=["fts", "-o", str(paths["oa"])])
+    # Several files per table so that results are merged across files
+    _invoke(
+        command=prepare.cli,
+        args=["parquet", "-o", str(paths["oa"]), "-d", str(paths["parquet"])]
+        + ["-n", "7000"],
+    )
+
+    return paths
+
+
+@pytest.fixture(scope="session")
+def pmDB(databases: dict[str, Path]) -> Connection:
+    return connectToDB(dbPath=databases["pm"])
+
+
+@pytest.fixture(scope="session")
+def sqliteDB(databases: dict[str, Path]) -> Connection:
+    return connectToDB(dbPath=databases["oa"])
+
+
+@pytest.fixture(scope="session")
+def parquetDB(databases: dict[str, Path]) -> ParquetDB:
+    return ParquetDB(directory=databases["parquet"])
+
+
+@pytest.fixture(scope="session")
+def graphDirectory(databases: dict[str, Path]) -> Path:
+    """
+    graphDirectory Build the citation graph of the synthetic OpenAlex database with the PeaTMOSS arXiv paper titles matched to works
+    """
+    directory: Path = Path(databases["oa"].parent, "graph")
+    _invoke(
+        command=prepare.cli,
+        args=["graph", "-o", str(databases["oa"]), "-g", str(directory)]
+        + ["-p", str(databases["pm"])],
+    )
+    return directory
@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+from typing import Any, List
+
+from src.stats.ai import writeClassificationTable
+
+
+def test_classificationTableHasNullsForMissingLines(tmp_path: Path) -> None:
+    records: List[dict[str, Any]] = [
+        {"ptm": "bert", "line": 0, "classification": "Physics"},
+        {"ptm": "bert", "line": 1, "classification": "Ecology"},
+        {"ptm": "albert", "line": 0, "classification": "Chemistry"},
+        {"ptm": "albert", "line": 1, "classification": "Physics"},
+        {"ptm": "albert", "line": 2, "classification": "Hydrology"},
+        {"ptm": "gpt", "line": 0, "classification": "Optics and photonics"},
+    ]
+    recordsPath: Path = Path(tmp_path, "ai_nature_classes.jsonl")
+    recordsPath.write_text(
+        data="".join(f"{json.dumps(record)}\n" for record in records)
+    )
+    jsonPath: Path = Path(tmp_path, "ai_nature_classes.json")
+
+    writeClassificationTable(recordsPath=recordsPath, jsonPath=jsonPath)
+
+    table: dict[str, dict[str, str | None]] = json.loads(jsonPath.read_text())
+    assert table == {
+        "0": {"bert": "Physics", "albert": "Chemistry", "gpt": "Optics and photonics"},
+        "1": {"bert": "Ecology", "albert": "Physics", "gpt": None},
+        "2": {"bert": None, "albert": "Hydrology", "gpt": None},
+    }
+    assert [list(row) for row in table.values()] == [["bert", "albert", "gpt"]] * 3
+
+
+def test_emptyRecordsWriteNoTable(tmp_path: Path) -> None:
+    recordsPath: Path = Path(tmp_path, "ai_nature_classes.jsonl")
+    recordsPath.write_text(data="")
+    jsonPath: Path = Path(tmp_path, "ai_nature_classes.json")
+
+    writeClassificationTable(recordsPath=recordsPath, jsonPath=jsonPath)
+
+    assert not jsonPath.exists()
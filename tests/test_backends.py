@@ -0,0 +1,127 @@
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Any, Callable, List
+
+import pytest
+from pandas import Series
+
+from src.stats.parquet import ParquetDB
+from src.stats.stats import (
+    connectToDB,
+    oa_CountCitations,
+    oa_CountPapersByDOI,
+    oa_CountPapersByOAID,
+    oa_GetDOIsOfWorks,
+    oapm_CountCitationsOfArXivPMPapers,
+    oapm_CountCitationsOfArXivPMPapersWithMode,
+    oapm_CountPMArXivPapersInOA,
+    oapm_GetDOIsOfOAWorksThatCitePM,
+)
+
+STATS_FUNCTIONS: List[Callable[..., Any]] = [
+    oa_CountPapersByDOI,
+    oa_CountPapersByOAID,
+    oa_CountCitations,
+    oapm_CountPMArXivPapersInOA,
+    oapm_CountCitationsOfArXivPMPapers,
+]
+
+
+def _call(function: Callable[..., Any], pmDB: Connection, oaDB: Any) -> Any:
+    if function.__name__.startswith("oapm_"):
+        return function(pmDB=pmDB, oaDB=oaDB)
+
+    return function(oaDB=oaDB)
+
+
+@pytest.mark.parametrize(
+    argnames="function",
+    argvalues=STATS_FUNCTIONS,
+    ids=[function.__name__ for function in STATS_FUNCTIONS],
+)
+def test_backendsGiveIdenticalResults(
+    function: Callable[..., Any],
+    pmDB: Connection,
+    sqliteDB: Connection,
+    parquetDB: ParquetDB,
+) -> None:
+    """
+    test_backendsGiveIdenticalResults Every stats function returns exactly the same result, including the order of Series, from SQLite and Parquet
+    """
+    sqliteResult: Any = _call(function=function, pmDB=pmDB, oaDB=sqliteDB)
+    parquetResult: Any = _call(function=function, pmDB=pmDB, oaDB=parquetDB)
+
+    if isinstance(sqliteResult, Series):
+        assert sqliteResult.shape[0] > 0
+        assert sqliteResult.equals(other=parquetResult)
+    else:
+        assert sqliteResult == parquetResult
+
+
+@pytest.mark.parametrize(argnames="mode", argvalues=["sql", "fts"])
+def test_modesGiveIdenticalCounts(
+    mode: str,
+    pmDB: Connection,
+    sqliteDB: Connection,
+) -> None:
+    """
+    test_modesGiveIdenticalCounts The citation counts of PeaTMOSS arXiv papers are counted and ordered within SQLite exactly as with pandas, ties included
+    """
+    pandasResult: Series = oapm_CountCitationsOfArXivPMPapers(pmDB=pmDB, oaDB=sqliteDB)
+    modeResult: Series = oapm_CountCitationsOfArXivPMPapersWithMode(
+        pmDB=pmDB,
+        oaDB=sqliteDB,
+        mode=mode,
+    )
+
+    assert pandasResult.duplicated().any()
+    assert modeResult.equals(other=pandasResult)
+
+
+def test_backendsResolveIdenticalDOIs(
+    pmDB: Connection,
+    sqliteDB: Connection,
+    parquetDB: ParquetDB,
+) -> None:
+    """
+    test_backendsResolveIdenticalDOIs Works are resolved to the same DOIs from SQLite and Parquet
+    """
+    oaIDs: List[str] = [f"W{number}" for number in range(1, 5000, 7)] + ["W0"]
+
+    assert oa_GetDOIsOfWorks(oaDB=sqliteDB, oaIDs=oaIDs, batchSize=100) == (
+        oa_GetDOIsOfWorks(oaDB=parquetDB, oaIDs=oaIDs)
+    )
+
+
+def test_backendsWriteIdenticalJSON(
+    tmp_path: Path,
+    pmDB: Connection,
+    sqliteDB: Connection,
+    parquetDB: ParquetDB,
+) -> None:
+    """
+    test_backendsWriteIdenticalJSON The DOIs of the works that cite the most cited PeaTMOSS papers are written identically from SQLite and Parquet
+    """
+    citationCounts: Series = oapm_CountCitationsOfArXivPMPapers(
+        pmDB=pmDB,
+        oaDB=sqliteDB,
+    )
+
+    jsonFiles: dict[str, List[str]] = {}
+
+    backend: str
+    oaDB: Connection | ParquetDB
+    for backend, oaDB in [("sqlite", sqliteDB), ("parquet", parquetDB)]:
+        directory: Path = Path(tmp_path, backend)
+        directory.mkdir()
+
+        jsonFiles[backend] = [
+            filepath.read_text()
+            for filepath in oapm_GetDOIsOfOAWorksThatCitePM(
+                oaDB=oaDB,
+                pmCitationCounts=citationCounts,
+                jsonOutputPath=directory,
+            )
+        ]
+
+    assert jsonFiles["sqlite"] == jsonFiles["parquet"]
@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pytest
+
+from src.stats import cache
+from src.stats.cache import cached, configureCache, fingerprintFunction
+
+
+def _define(source: str, name: str = "count") -> Callable[..., Any]:
+    """
+    _define Define the functions of `source` in a module of this project and return one of them
+    """
+    namespace: dict[str, Any] = {"__name__": "src.stats.example"}
+    exec(compile(source, "example.py", "exec"), namespace)
+    return namespace[name]
+
+
+COUNT: str = """
+def _offset():
+    return 1
+
+def count(value):
+    return value + _offset()
+"""
+
+
+@pytest.fixture
+def cacheDirectory(tmp_path: Path) -> Iterator[Path]:
+    configureCache(directory=tmp_path, maxBytes=1024**2)
+    yield tmp_path
+    cache._CACHE = None
+
+
+def test_changedCodeChangesTheFingerprint() -> None:
+    fingerprint: str = fingerprintFunction(function=_define(source=COUNT))
+
+    assert fingerprint == fingerprintFunction(function=_define(source=COUNT))
+    assert fingerprint == fingerprintFunction(
+        function=_define(source="\n\n" + COUNT),
+    )
+    assert fingerprint != fingerprintFunction(
+        function=_define(source=COUNT.replace("value + ", "value - ")),
+    )
+    # A change of a function of this project that it calls
+    assert fingerprint != fingerprintFunction(
+        function=_define(source=COUNT.replace("return 1", "return 2")),
+    )
+
+
+def test_changedCodeIsNotServedFromTheCache(cacheDirectory: Path) -> None:
+    count: Callable[..., Any] = cached()(_define(source=COUNT))
+    changedCount: Callable[..., Any] = cached()(
+        _define(source=COUNT.replace("return 1", "return 2"))
+    )
+
+    assert count(value=1) == 2
+    assert changedCount(value=1) == 3
+    assert count(value=1) == 2
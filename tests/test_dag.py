@@ -0,0 +1,112 @@
+import json
+from os import getpid
+from pathlib import Path
+from typing import Any, Iterator, List
+
+import pytest
+
+from src.stats.dag import Stage, runStages
+from src.stats.instrument import (
+    configureInstrumentation,
+    instrumented,
+    resetInstrumentation,
+)
+
+
+@instrumented()
+def _double(value: int) -> int:
+    return value * 2
+
+
+@instrumented()
+def _add(left: int, right: int) -> int:
+    return left + right
+
+
+STAGES: List[Stage] = [
+    Stage(name="left", function=_double, inputs={"value": "value"}),
+    Stage(name="right", function=_double, inputs={"value": "value"}),
+    Stage(name="total", function=_add, inputs={"left": "left", "right": "right"}),
+]
+
+
+@pytest.fixture
+def tracePath(tmp_path: Path) -> Iterator[Path]:
+    path: Path = Path(tmp_path, "trace.json")
+    configureInstrumentation(tracePath=path)
+    yield path
+    resetInstrumentation()
+
+
+def _run(artifactDirectory: Path, jobs: int) -> dict[str, Any]:
+    return runStages(
+        stages=STAGES,
+        targets=["total"],
+        sources={"value": 3},
+        resources={},
+        artifactDirectory=artifactDirectory,
+        jobs=jobs,
+    )
+
+
+def _readStages(tracePath: Path) -> List[dict[str, Any]]:
+    return json.loads(tracePath.read_text())["stages"]
+
+
+def test_parallelStagesAreTraced(tracePath: Path, tmp_path: Path) -> None:
+    assert _run(artifactDirectory=Path(tmp_path, "artifacts"), jobs=2) == {"total": 12}
+
+    records: List[dict[str, Any]] = _readStages(tracePath=tracePath)
+    stages: dict[str, dict[str, Any]] = {
+        record["name"]: record for record in records if record["parent"] is None
+    }
+
+    assert set(stages) == {"left", "right", "total"}
+    assert all(record["status"] == "computed" for record in records)
+    assert all(record["pid"] != getpid() for record in records)
+    assert sorted(
+        record["parent"] for record in records if record["parent"] is not None
+    ) == ["left", "right", "total"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_reusedStagesAreTraced(tracePath: Path, tmp_path: Path, jobs: int) -> None:
+    artifactDirectory: Path = Path(tmp_path, "artifacts")
+    _run(artifactDirectory=artifactDirectory, jobs=jobs)
+
+    configureInstrumentation(tracePath=tracePath)
+    assert _run(artifactDirectory=artifactDirectory, jobs=jobs) == {"total": 12}
+
+    records: List[dict[str, Any]] = _readStages(tracePath=tracePath)
+
+    assert sorted(record["name"] for record in records) == ["left", "right", "total"]
+    assert all(record["status"] == "reused" for record in records)
+    assert all(record["computedSeconds"] >= 0 for record in records)
+
+
+def test_changedStagesAreRecomputed(tmp_path: Path) -> None:
+    artifactDirectory: Path = Path(tmp_path, "artifacts")
+
+    source: str
+    total: int
+    for source, total in [("value * 2", 12), ("value * 3", 18)]:
+        # Functions of the same name and module whose code differs
+        namespace: dict[str, Any] = {"__name__": __name__}
+        exec(f"def _double(value):\n    return {source}\n", namespace)
+
+        results: dict[str, Any] = runStages(
+            stages=[
+                Stage(
+                    name=stage.name, function=namespace["_double"], inputs=stage.inputs
+                )
+                if stage.function is _double
+                else stage
+                for stage in STAGES
+            ],
+            targets=["total"],
+            sources={"value": 3},
+            resources={},
+            artifactDirectory=artifactDirectory,
+        )
+
+        assert results == {"total": total}
@@ -0,0 +1,30 @@
+import json
+from pathlib import Path
+from typing import Any, List
+
+from click.testing import CliRunner, Result
+
+from src.stats import fuzzy
+
+
+def test_savedMatchesAreTheMatches(databases: dict[str, Path], tmp_path: Path) -> None:
+    savePath: Path = Path(tmp_path, "matches.json")
+
+    # The brute force recall sample is read after matching, and must not
+    # replace the matches that are saved
+    result: Result = CliRunner().invoke(
+        fuzzy.main,
+        args=["-p", str(databases["pm"]), "-o", str(databases["oa"])]
+        + ["--brute-force-sample", "100", "-s", str(savePath)],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+
+    records: List[dict[str, Any]] = json.loads(savePath.read_text())
+
+    assert len(records) > 0
+    assert all(
+        {"pm_title", "oa_id", "similarity", "exact", "fuzzy"} <= set(record)
+        for record in records
+    )
+    assert all(record["exact"] or record["fuzzy"] for record in records)
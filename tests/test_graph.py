@@ -0,0 +1,60 @@
+from pathlib import Path
+from sqlite3 import Connection
+
+import pytest
+from pandas import DataFrame, Series
+
+from src.stats import stats
+from src.stats.graph import CitationGraph
+from src.stats.stats import oapm_CountCitationsOfArXivPMPapers
+
+
+def _failToMatch(*args, **kwargs) -> DataFrame:
+    raise AssertionError("The works table was scanned")
+
+
+def test_graphWithTitlesMatchesTables(
+    pmDB: Connection,
+    sqliteDB: Connection,
+    graphDirectory: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    expected: Series = oapm_CountCitationsOfArXivPMPapers(pmDB=pmDB, oaDB=sqliteDB)
+
+    graph: CitationGraph = CitationGraph.load(directory=graphDirectory)
+    assert graph.titles is not None
+
+    # The stored title matches stand in for the works table
+    monkeypatch.setattr(stats, "oa_MatchWorksByTitle", _failToMatch)
+    actual: Series = oapm_CountCitationsOfArXivPMPapers(
+        pmDB=pmDB,
+        oaDB=sqliteDB,
+        graph=graph,
+    )
+
+    assert len(expected) > 0
+    assert actual.equals(other=expected)
+
+
+def test_graphWithoutTitlesMatchesTables(
+    pmDB: Connection,
+    sqliteDB: Connection,
+    graphDirectory: Path,
+) -> None:
+    expected: Series = oapm_CountCitationsOfArXivPMPapers(pmDB=pmDB, oaDB=sqliteDB)
+
+    graph: CitationGraph = CitationGraph.load(directory=graphDirectory)
+    graph.titles = None
+    actual: Series = oapm_CountCitationsOfArXivPMPapers(
+        pmDB=pmDB,
+        oaDB=sqliteDB,
+        graph=graph,
+    )
+
+    assert actual.equals(other=expected)
+
+
+def test_staleTitlesAreNotMatched(graphDirectory: Path) -> None:
+    graph: CitationGraph = CitationGraph.load(directory=graphDirectory)
+
+    assert graph.matchTitles(titles={"a title that was never matched"}) is None
@@ -0,0 +1,85 @@
+import shutil
+import sqlite3
+from pathlib import Path
+from sqlite3 import Connection
+from typing import List
+
+from click.testing import CliRunner, Result
+from pandas import Series
+
+from src.stats import prepare, readSummaryStatistics, standardizedTitlesAreFresh
+from src.stats.stats import (
+    connectToDB,
+    oa_CountCitations,
+    oapm_CountCitationsOfArXivPMPapers,
+    oapm_CountCitationsOfArXivPMPapersInSQL,
+    pm_IdentifyPapersPublishedInArXiv,
+)
+
+
+def test_schemaNeedsNoSQLFunctions(databases: dict[str, Path], tmp_path: Path) -> None:
+    oaPath: Path = Path(tmp_path, "openalex.db")
+    shutil.copy(src=databases["oa"], dst=oaPath)
+
+    # A connection that did not register the functions of registerSQLFunctions,
+    # like the sqlite3 shell or the loader that appends works
+    db: Connection = sqlite3.connect(database=oaPath)
+    assert db.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    db.execute("INSERT INTO works (oa_id, doi, title) VALUES ('W0', NULL, 'Title')")
+    db.commit()
+    db.execute("VACUUM")
+    db.close()
+
+
+def test_staleStandardizedTitlesAreNotUsed(
+    databases: dict[str, Path],
+    pmDB: Connection,
+    tmp_path: Path,
+) -> None:
+    oaPath: Path = Path(tmp_path, "openalex.db")
+    shutil.copy(src=databases["oa"], dst=oaPath)
+    oaDB: Connection = connectToDB(dbPath=oaPath)
+
+    assert standardizedTitlesAreFresh(db=oaDB)
+
+    # Add a work titled as a PeaTMOSS arXiv paper, and a citation of it
+    title: str = pm_IdentifyPapersPublishedInArXiv(pmDB=pmDB)["title"].iloc[0]
+    oaDB.execute(
+        "INSERT INTO works (oa_id, doi, title) VALUES ('W0', NULL, ?)", (title,)
+    )
+    oaDB.execute("INSERT INTO cites (work, reference) VALUES ('W1', 'W0')")
+    oaDB.commit()
+
+    assert not standardizedTitlesAreFresh(db=oaDB)
+
+    expected: Series = oapm_CountCitationsOfArXivPMPapers(pmDB=pmDB, oaDB=oaDB)
+    actual: Series = oapm_CountCitationsOfArXivPMPapersInSQL(pmDB=pmDB, oaDB=oaDB)
+
+    assert "W0" in expected.index
+    assert actual.equals(other=expected)
+
+
+def test_summaryStatisticsGoStaleWhenRowsAreAdded(
+    databases: dict[str, Path],
+    tmp_path: Path,
+) -> None:
+    oaPath: Path = Path(tmp_path, "openalex.db")
+    shutil.copy(src=databases["oa"], dst=oaPath)
+    args: List[str] = ["summary", "-p", str(databases["pm"]), "-o", str(oaPath)]
+
+    result: Result = CliRunner().invoke(prepare.cli, args=args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+
+    oaDB: Connection = connectToDB(dbPath=oaPath)
+    summary: dict[str, int] = readSummaryStatistics(db=oaDB)
+    assert summary["oa_citation_count"] == oa_CountCitations(oaDB=oaDB)
+
+    oaDB.execute("INSERT INTO cites (work, reference) VALUES ('W1', 'W2')")
+    oaDB.commit()
+    assert readSummaryStatistics(db=oaDB) == {}
+
+    result = CliRunner().invoke(prepare.cli, args=args, catch_exceptions=False)
+    assert result.exit_code == 0, result.output
+    assert readSummaryStatistics(db=oaDB)["oa_citation_count"] == (
+        summary["oa_citation_count"] + 1
+    )
@@ -0,0 +1,32 @@
+from sqlite3 import Connection
+from typing import Any, Callable
+
+import pytest
+from pandas import Series
+
+from src.stats.stats import (
+    oapm_CountCitationsOfArXivPMPapers,
+    oapm_CountPMArXivPapersInOA,
+)
+
+
+@pytest.mark.parametrize(
+    argnames="function",
+    argvalues=[oapm_CountPMArXivPapersInOA, oapm_CountCitationsOfArXivPMPapers],
+    ids=["oapm_CountPMArXivPapersInOA", "oapm_CountCitationsOfArXivPMPapers"],
+)
+def test_parallelScansGiveIdenticalResults(
+    function: Callable[..., Any],
+    pmDB: Connection,
+    sqliteDB: Connection,
+) -> None:
+    """
+    test_parallelScansGiveIdenticalResults Scanning the indexed SQLite tables in worker processes returns exactly the same result as a sequential scan
+    """
+    sequentialResult: Any = function(pmDB=pmDB, oaDB=sqliteDB, workers=1)
+    parallelResult: Any = function(pmDB=pmDB, oaDB=sqliteDB, workers=3)
+
+    if isinstance(sequentialResult, Series):
+        assert sequentialResult.equals(other=parallelResult)
+    else:
+        assert sequentialResult == parallelResult